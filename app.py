@@ -1,3 +1,6 @@
+from core.startup_profiler import startup_profiler
+startup_profiler.start()  # APG_STARTUP_PROFILE=1: medir importaciones desde aquí
+
 import dash_mantine_components as dmc
 import dash
 from dash import Dash, _dash_renderer, html, dcc
@@ -9,6 +12,12 @@ from dash.dependencies import Input, Output, State
 import os
 from datetime import datetime
 from flask import send_from_directory, request, jsonify
+from core.compression import init_compression
+from core.page_registry import page_registry, lazy_pages_enabled, preload_mode
+from core.serving import init_readiness
+from core.exports import init_exports
+from core.artifacts import init_artifacts
+from core.snapshots import dataset_snapshots
 #from core.bd import dataOut
 #_dash_renderer._set_react_version("18.2.0")
 
@@ -23,10 +32,14 @@ scripts = [
     "https://cdnjs.cloudflare.com/ajax/libs/dayjs/1.10.8/dayjs.min.js",      # dayjs  
     "https://cdnjs.cloudflare.com/ajax/libs/dayjs/1.10.8/locale/fr.min.js",  # french locale
 ]
+# Carga diferida opcional (APG_LAZY_PAGES=1): Dash no importa la carpeta pages/ (ver core/page_registry.py)
+LAZY_PAGES = lazy_pages_enabled()
+
 app = Dash(
     __name__,
     suppress_callback_exceptions=True,
     use_pages=True,
+    pages_folder="" if LAZY_PAGES else "pages",
     external_stylesheets=dmc.styles.ALL,
     external_scripts=scripts,
     update_title=False,
@@ -34,6 +47,30 @@ app = Dash(
     title="Packing Tools"
 )
 
+# Con suppress_callback_exceptions el router async de Dash 3.1 busca
+# page_container en validation_layout sin haberlo asignado (500 en la
+# primera petición)
+if app.validation_layout is None:
+    app.validation_layout = dash.page_container
+
+# Comprimir respuestas JSON de Dash (gzip/brotli)
+init_compression(app.server)
+
+# Registrar rutas de páginas ahora; módulos en la primera visita / precarga
+if LAZY_PAGES:
+    page_registry.init_app(app)
+
+# /ready para healthchecks; en modo wsgi los snapshots se cargan en wsgi.py
+init_readiness(app.server)
+if not preload_mode():
+    dataset_snapshots.mark_ready()
+
+# /export/<dataset>.<formato>: descargas CSV/Parquet en streaming
+init_exports(app.server)
+
+# /artifacts/<token>: PDFs generados servidos por URL temporal (previsualización y descarga)
+init_artifacts(app.server)
+
 # Configurar ruta específica para el favicon
 @app.server.route('/favicon.ico')
 def favicon():
@@ -311,7 +348,11 @@ def check_redis_connection():
         print(f"Redis health check failed: {e}")
         return False
 """
+startup_profiler.mark("app lista")
+startup_profiler.report()
+
 if __name__ == "__main__":
+    from constants import PORT, MODE_DEBUG
     app.run(
         host='0.0.0.0',  # Permite conexiones desde cualquier IP
         port=PORT,       # Puerto personalizable
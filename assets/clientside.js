@@ -3,9 +3,289 @@ if (!window.dash_clientside) {
     window.dash_clientside = {};
 }
 
+// Decodificador del formato columnar (core/payload.py)
+window.dash_payload = (function() {
+    var FORMAT = "columnar-v1";
+
+    function fromBase64(data, ArrayType) {
+        var binary = atob(data);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return new ArrayType(bytes.buffer);
+    }
+
+    function toBase64(typed) {
+        var bytes = new Uint8Array(typed.buffer, typed.byteOffset, typed.byteLength);
+        var binary = "";
+        // Por bloques: String.fromCharCode no acepta arrays muy grandes
+        for (var i = 0; i < bytes.length; i += 0x8000) {
+            binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+        }
+        return btoa(binary);
+    }
+
+    var TYPED_ARRAYS = {bool: Uint8Array, i4: Int32Array, f8: Float64Array, dt: Float64Array, dict: Int32Array};
+
+    function decodeColumn(column) {
+        switch (column.t) {
+            case "bool":
+                return Array.from(fromBase64(column.v, Uint8Array), function(v) { return v === 1; });
+            case "i4":
+                return fromBase64(column.v, Int32Array);
+            case "f8":
+                return Array.from(fromBase64(column.v, Float64Array), function(v) { return isNaN(v) ? null : v; });
+            case "dt":
+                return Array.from(fromBase64(column.v, Float64Array), function(v) {
+                    return isNaN(v) ? null : new Date(v).toISOString().slice(0, 19);
+                });
+            case "dict":
+                var keys = column.k;
+                return Array.from(fromBase64(column.v, Int32Array), function(code) {
+                    return code < 0 ? null : keys[code];
+                });
+            default:
+                return column.v;
+        }
+    }
+
+    function isColumnar(payload) {
+        return !!payload && payload.format === FORMAT;
+    }
+
+    // Retorna {columna: array}
+    function decodeColumns(payload) {
+        var result = {};
+        payload.columns.forEach(function(name, idx) {
+            result[name] = decodeColumn(payload.data[idx]);
+        });
+        return result;
+    }
+
+    // Retorna una lista de registros (equivalente a to_dict('records'))
+    function decodeRecords(payload) {
+        if (!payload) {
+            return [];
+        }
+        if (!isColumnar(payload)) {
+            return payload;
+        }
+        var columns = decodeColumns(payload);
+        var names = payload.columns;
+        var records = new Array(payload.n);
+        for (var row = 0; row < payload.n; row++) {
+            var record = {};
+            for (var c = 0; c < names.length; c++) {
+                record[names[c]] = columns[names[c]][row];
+            }
+            records[row] = record;
+        }
+        return records;
+    }
+
+    // Valores crudos de una columna (códigos del diccionario sin resolver)
+    function rawColumn(column) {
+        var ArrayType = TYPED_ARRAYS[column.t];
+        return ArrayType ? fromBase64(column.v, ArrayType) : column.v;
+    }
+
+    // Subconjunto de filas de un payload, en el mismo formato columnar
+    function take(payload, indices) {
+        var data = payload.data.map(function(column) {
+            var ArrayType = TYPED_ARRAYS[column.t];
+            var values = rawColumn(column);
+            var taken = ArrayType ? new ArrayType(indices.length) : new Array(indices.length);
+            for (var i = 0; i < indices.length; i++) {
+                taken[i] = values[indices[i]];
+            }
+            var encoded = Object.assign({}, column);
+            encoded.v = ArrayType ? toBase64(taken) : taken;
+            return encoded;
+        });
+        return {format: FORMAT, n: indices.length, columns: payload.columns, data: data};
+    }
+
+    return {
+        isColumnar: isColumnar,
+        decodeColumns: decodeColumns,
+        decodeRecords: decodeRecords,
+        take: take
+    };
+})();
+
+// Filtros dependientes y filtrado local (árbol de helpers.generate_date_options_tree)
+window.dash_clientside.filters = (function() {
+    function asList(value) {
+        if (value === null || value === undefined || value === "") {
+            return [];
+        }
+        return Array.isArray(value) ? value : [value];
+    }
+
+    function yearOptions(tree) {
+        return (tree && tree.years) || [];
+    }
+
+    function monthOptions(year, tree) {
+        if (!tree || !year) {
+            return [];
+        }
+        return (tree.months && tree.months[String(year)]) || [];
+    }
+
+    function weekOptions(year, month, tree) {
+        if (!tree || !year || !tree.weeks) {
+            return [];
+        }
+        var byMonth = tree.weeks[String(year)] || {};
+        var months = asList(month);
+        if (months.length === 0) {
+            return byMonth.all || [];
+        }
+        // Unión de semanas de los meses seleccionados, sin duplicados
+        var seen = {};
+        var result = [];
+        months.forEach(function(m) {
+            (byMonth[String(m)] || []).forEach(function(option) {
+                if (!seen[option.value]) {
+                    seen[option.value] = true;
+                    result.push(option);
+                }
+            });
+        });
+        return result.sort(function(a, b) { return Number(a.value) - Number(b.value); });
+    }
+
+    function rowCount(payload) {
+        if (window.dash_payload.isColumnar(payload)) {
+            return payload.n;
+        }
+        return (payload || []).length;
+    }
+
+    function matches(yearValue, monthValue, year, months) {
+        if (Number(yearValue) !== year) {
+            return false;
+        }
+        return months.length === 0 || months.indexOf(Number(monthValue)) !== -1;
+    }
+
+    function filterRecords(records, yearColumn, monthColumn, year, months) {
+        return records.filter(function(record) {
+            return matches(record[yearColumn], record[monthColumn], year, months);
+        });
+    }
+
+    // Filtra un payload columnar leyendo sólo las columnas de año y mes; el
+    // resultado sigue en formato columnar para los callbacks del servidor
+    function filterPayload(payload, yearColumn, monthColumn, year, months) {
+        var index = {};
+        payload.columns.forEach(function(name, idx) { index[name] = idx; });
+        if (index[yearColumn] === undefined) {
+            return window.dash_payload.take(payload, []);
+        }
+        var decode = function(name) {
+            return index[name] === undefined ? [] : window.dash_payload.decodeColumns(
+                {columns: [name], data: [payload.data[index[name]]]}
+            )[name];
+        };
+        var years = decode(yearColumn);
+        var monthValues = decode(monthColumn);
+        var indices = [];
+        for (var row = 0; row < payload.n; row++) {
+            if (matches(years[row], monthValues[row], year, months)) {
+                indices.push(row);
+            }
+        }
+        return window.dash_payload.take(payload, indices);
+    }
+
+    return {
+        year_options: yearOptions,
+
+        year_options_default: function(tree) {
+            return [yearOptions(tree), (tree && tree.default_year) || null];
+        },
+
+        month_options: monthOptions,
+
+        month_options_reset: function(year, tree) {
+            return [monthOptions(year, tree), null];
+        },
+
+        week_options: weekOptions,
+
+        week_options_reset: function(year, month, tree) {
+            return [weekOptions(year, month, tree), null];
+        },
+
+        // Filtra por año/mes en el navegador; si los datos superan max_rows
+        // delega en el servidor escribiendo en el store de solicitud
+        filter_period: function(year, month, rawData, config) {
+            var noUpdate = window.dash_clientside.no_update;
+            config = config || {};
+            if (!rawData || Object.keys(rawData).length === 0) {
+                return [{}, noUpdate];
+            }
+
+            var keys = config.keys || Object.keys(rawData);
+            var total = 0;
+            keys.forEach(function(key) { total += rowCount(rawData[key]); });
+            if (total > (config.max_rows || 50000)) {
+                return [noUpdate, {year: year, month: month, ts: Date.now()}];
+            }
+
+            var yearColumn = config.year_column || "Año";
+            var monthColumn = config.month_column || "Mes";
+            var yearInt = year ? Number(year) : null;
+            var months = asList(month).map(Number);
+
+            var result = {};
+            keys.forEach(function(key) {
+                var payload = rawData[key];
+                if (yearInt === null) {
+                    result[key] = payload;
+                } else if (window.dash_payload.isColumnar(payload)) {
+                    result[key] = filterPayload(payload, yearColumn, monthColumn, yearInt, months);
+                } else {
+                    result[key] = filterRecords(payload || [], yearColumn, monthColumn, yearInt, months);
+                }
+            });
+            // Descriptor de vista (versión + filtros) usado como clave de la caché de figuras
+            if (rawData.__version__) {
+                result.__view__ = Object.assign({}, rawData.__version__, {
+                    year: year ? String(year) : null,
+                    month: asList(month).map(String).sort()
+                });
+            }
+            return [result, noUpdate];
+        }
+    };
+})();
+
 window.dash_clientside.clientside = {
     update_ag_grid_theme: function(switch_on) {
         // Return the appropriate theme class based on the toggle state
         return switch_on ? "ag-theme-alpine-dark" : "ag-theme-alpine";
+    },
+
+    decode_store_records: function(payload) {
+        // Convierte un payload columnar de dcc.Store en registros para AgGrid
+        return window.dash_payload.decodeRecords(payload);
+    },
+
+    download_url: function(url) {
+        // Descarga un artefacto (/artifacts/<token>?download=1) sin salir de la página
+        if (!url) {
+            return window.dash_clientside.no_update;
+        }
+        var link = document.createElement("a");
+        link.href = url;
+        link.download = "";
+        document.body.appendChild(link);
+        link.click();
+        link.remove();
+        return true;
     }
 };
@@ -4,11 +4,11 @@ Registra callbacks con IDs únicos y maneja la lógica async
 """
 import asyncio
 from typing import Dict, Any, List, Callable
-from dash import Input, Output, State, callback, no_update
+from dash import Input, Output, State, callback, clientside_callback, ClientsideFunction, no_update
 import plotly.express as px
 import plotly.graph_objects as go
 from data.data_manager import data_manager
-from helpers.helpers import generate_list_month
+from helpers.helpers import generate_date_options_tree
 
 
 class CallbackManager:
@@ -25,48 +25,47 @@ class CallbackManager:
     
     def register_data_loader(self, page_id: str, data_sources: List[str]):
         """
-        Registra callback para cargar datos al iniciar la página
+        Registra la carga de datos al iniciar la página (un callback por fuente)
+        
+        Cada store se llena en cuanto termina su fuente: el navegador lanza
+        las peticiones en paralelo y los gráficos que dependen de una fuente
+        se pintan sin esperar a la más lenta
         
         Args:
             page_id: ID único de la página
             data_sources: Lista de fuentes de datos a cargar
         """
         
-        # IDs para los stores de datos
-        data_store_ids = [self.generate_id(page_id, "data-store", source) for source in data_sources]
         url_store_id = self.generate_id(page_id, "url-store")
+        for source in data_sources:
+            self._register_source_loader(page_id, source, url_store_id)
+    
+    def _register_source_loader(self, page_id: str, source: str, url_store_id: str):
+        """Registra el callback de carga de una fuente de datos"""
+        
+        data_store_id = self.generate_id(page_id, "data-store", source)
         
         @callback(
-            [Output(store_id, "data") for store_id in data_store_ids],
+            Output(data_store_id, "data"),
             Input(url_store_id, "data"),
             prevent_initial_call=False
         )
-        async def load_initial_data(url_data):
-            """Carga inicial de datos de forma asíncrona"""
+        async def load_source_data(url_data):
+            """Carga inicial de una fuente de forma asíncrona"""
             try:
-                print(f"🚀 Iniciando carga de datos para {page_id}")
-                
-                # Cargar todos los datos de forma paralela
-                tasks = [data_manager.get_data(source) for source in data_sources]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
+                print(f"🚀 Iniciando carga de {source} para {page_id}")
+                result = await data_manager.get_data(source)
                 
-                # Procesar resultados
-                processed_results = []
-                for i, (source, result) in enumerate(zip(data_sources, results)):
-                    if isinstance(result, Exception):
-                        print(f"❌ Error cargando {source}: {result}")
-                        processed_results.append(None)
-                    elif result is not None and not result.empty:
-                        processed_results.append(result.to_dict('records'))
-                        print(f"✅ {source}: {len(result)} registros cargados")
-                    else:
-                        processed_results.append(None)
-                
-                return processed_results
+                if result is not None and not result.empty:
+                    print(f"✅ {source}: {len(result)} registros cargados")
+                    return result.to_dict('records')
+                return None
                 
             except Exception as e:
-                print(f"❌ Error en carga inicial: {e}")
-                return [None] * len(data_sources)
+                print(f"❌ Error cargando {source}: {e}")
+                return None
+        
+        self.registered_callbacks[data_store_id] = load_source_data
     
     def register_filter_updater(self, page_id: str, data_source: str, filter_configs: List[Dict]):
         """
@@ -121,7 +120,10 @@ class CallbackManager:
     
     def register_dependent_filters(self, page_id: str, start_year: int = 2024, start_month: int = 1):
         """
-        Registra callbacks para filtros dependientes usando generate_list_month
+        Registra filtros dependientes año -> mes -> semana
+        
+        El árbol de opciones se genera una sola vez en el servidor y las
+        cascadas se resuelven en el navegador (assets/clientside.js)
         
         Args:
             page_id: ID único de la página
@@ -134,129 +136,50 @@ class CallbackManager:
         month_filter_id = self.generate_id(page_id, "filter", "month")
         week_filter_id = self.generate_id(page_id, "filter", "week")
         
-        # Store para los datos de fechas generados
+        # Store para el árbol de opciones de fechas
         dates_store_id = self.generate_id(page_id, "dates-store")
         
-        # 1. Callback para cargar datos iniciales de fechas
+        # 1. Callback para generar el árbol de opciones (única llamada al servidor)
         @callback(
             Output(dates_store_id, "data"),
             Input(year_filter_id, "id"),  # Trigger inicial
             prevent_initial_call=False
         )
         async def load_dates_data(_):
-            """Carga datos de fechas usando generate_list_month"""
+            """Genera el árbol de opciones usando generate_list_month"""
             try:
                 print(f"🗓️ Generando opciones de fechas desde {start_year}/{start_month}")
-                
-                # Generar DataFrame de fechas de forma asíncrona
-                df_dates = await asyncio.to_thread(generate_list_month, start_year, start_month)
-                
-                if df_dates is not None and not df_dates.empty:
-                    return df_dates.to_dict('records')
-                return []
+                return await asyncio.to_thread(generate_date_options_tree, start_year, start_month)
                 
             except Exception as e:
                 print(f"❌ Error generando datos de fechas: {e}")
-                return []
+                return {}
         
-        # 2. Callback para actualizar opciones de año
-        @callback(
+        # 2. Opciones de año (clientside)
+        clientside_callback(
+            ClientsideFunction(namespace="filters", function_name="year_options"),
             Output(year_filter_id, "data"),
             Input(dates_store_id, "data"),
             prevent_initial_call=False
         )
-        async def update_year_options(dates_data):
-            """Actualiza opciones de año"""
-            if not dates_data:
-                return []
-            
-            try:
-                # Extraer años únicos
-                years = list(set([record['YEAR'] for record in dates_data]))
-                years.sort(reverse=True)  # Más recientes primero
-                
-                return [{'label': str(year), 'value': str(year)} for year in years]
-                
-            except Exception as e:
-                print(f"❌ Error actualizando años: {e}")
-                return []
         
-        # 3. Callback para actualizar opciones de mes (dependiente del año)
-        @callback(
+        # 3. Opciones de mes dependientes del año (clientside)
+        clientside_callback(
+            ClientsideFunction(namespace="filters", function_name="month_options"),
             Output(month_filter_id, "data"),
             Input(year_filter_id, "value"),
             State(dates_store_id, "data"),
             prevent_initial_call=False
         )
-        async def update_month_options(selected_year, dates_data):
-            """Actualiza opciones de mes basado en el año seleccionado"""
-            if not dates_data or selected_year is None:
-                return []
-            
-            try:
-                # Filtrar meses para el año seleccionado
-                months_for_year = [
-                    record for record in dates_data 
-                    if record['YEAR'] == selected_year
-                ]
-                
-                # Crear diccionario para evitar duplicados y mantener orden
-                month_dict = {}
-                for record in months_for_year:
-                    month_num = record['MES']
-                    month_text = record['MES_TEXT']
-                    month_dict[month_num] = month_text
-                
-                # Ordenar por número de mes
-                sorted_months = sorted(month_dict.items())
-                
-                return [
-                    {'label': month_text, 'value': str(month_num)}
-                    for month_num, month_text in sorted_months
-                ]
-                
-            except Exception as e:
-                print(f"❌ Error actualizando meses: {e}")
-                return []
         
-        # 4. Callback para actualizar opciones de semana (dependiente del año y mes)
-        @callback(
+        # 4. Opciones de semana dependientes de año y mes (clientside)
+        clientside_callback(
+            ClientsideFunction(namespace="filters", function_name="week_options"),
             Output(week_filter_id, "data"),
             [Input(year_filter_id, "value"), Input(month_filter_id, "value")],
             State(dates_store_id, "data"),
             prevent_initial_call=False
         )
-        async def update_week_options(selected_year, selected_month, dates_data):
-            """Actualiza opciones de semana basado en año y mes seleccionados"""
-            if not dates_data or selected_year is None:
-                return []
-            
-            try:
-                # Filtrar por año
-                filtered_data = [
-                    record for record in dates_data 
-                    if record['YEAR'] == selected_year
-                ]
-                
-                # Si hay mes seleccionado, filtrar también por mes
-                if selected_month is not None:
-                    filtered_data = [
-                        record for record in filtered_data
-                        if record['MES'] == selected_month
-                    ]
-                
-                # Extraer semanas únicas
-                weeks = list(set([record['SEMANA'] for record in filtered_data]))
-                weeks.sort()
-                
-                return [
-                    {'label': f'Semana {week}', 'value': str(week)}
-                    for week in weeks
-                ]
-                
-            except Exception as e:
-                print(f"❌ Error actualizando semanas: {e}")
-                return []
     
     def register_chart_updater(self, page_id: str, data_source: str, chart_configs: List[Dict], 
                              filter_configs: List[Dict], metrics_configs: List[Dict] = None):
@@ -293,17 +216,17 @@ class CallbackManager:
         # Store de datos
         data_store_id = self.generate_id(page_id, "data-store", data_source)
         
+        # El store es Input: los gráficos se pintan en cuanto llega su fuente
         @callback(
             chart_outputs + metrics_outputs,
-            filter_inputs,
-            State(data_store_id, "data"),
+            filter_inputs + [Input(data_store_id, "data")],
             prevent_initial_call=False
         )
         async def update_charts_and_metrics(*args):
             """Actualiza gráficos y métricas basado en filtros"""
             try:
                 # Separar argumentos
-                filter_values = args[:-1]  # Todos menos el último (state)
+                filter_values = args[:-1]  # Todos menos el último (store)
                 data = args[-1]  # Último argumento (data del store)
                 
                 if not data:
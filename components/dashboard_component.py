@@ -7,7 +7,7 @@ import pandas as pd
 import dash_mantine_components as dmc
 import plotly.express as px
 import asyncio
-from dash import html, dcc, Input, Output, callback
+from dash import html, dcc, Input, Output, State, callback, clientside_callback, ClientsideFunction
 from components.grid import Row, Column
 from helpers.get_token import get_access_token
 from helpers.get_api import listar_archivos_en_carpeta_compartida
@@ -117,88 +117,45 @@ class DashboardComponent:
         Registra todos los callbacks para esta instancia del dashboard
         """
         
-        # Callback para opciones de año
+        # Árbol de opciones de fecha (única llamada al servidor)
         @callback(
-            [Output(self.ids['year_select'], 'data'),
-             Output(self.ids['year_select'], 'value')],
+            Output(self.ids['date_options_store'], 'data'),
             Input(self.ids['year_select'], 'id')
         )
-        async def populate_year_options(_):
-            """Pobla las opciones de año de forma asíncrona"""
+        async def load_date_options_tree(_):
+            """Genera el árbol de opciones año -> mes -> semana"""
             try:
-                print(f"📅 [{self.page_id}] Generando opciones de año...")
-                
-                df = await asyncio.to_thread(generate_list_month, 2024, 8)
-                years = sorted(df['YEAR'].unique())
-                year_options = [{'value': str(year), 'label': str(year)} for year in years]
-                default_year = str(years[-1]) if years else None
-                
-                print(f"✅ [{self.page_id}] Opciones de año generadas: {years}")
-                return year_options, default_year
+                print(f"📅 [{self.page_id}] Generando árbol de opciones de fecha...")
+                return await asyncio.to_thread(generate_date_options_tree, 2024, 8, "{}")
                 
             except Exception as e:
-                print(f"❌ [{self.page_id}] Error generando opciones de año: {e}")
-                return [], None
+                print(f"❌ [{self.page_id}] Error generando opciones de fecha: {e}")
+                return {}
         
-        # Callback para opciones de mes
-        @callback(
+        # Cascada año -> mes -> semana resuelta en el navegador (assets/clientside.js)
+        clientside_callback(
+            ClientsideFunction(namespace="filters", function_name="year_options_default"),
+            [Output(self.ids['year_select'], 'data'),
+             Output(self.ids['year_select'], 'value')],
+            Input(self.ids['date_options_store'], 'data')
+        )
+        
+        clientside_callback(
+            ClientsideFunction(namespace="filters", function_name="month_options_reset"),
             [Output(self.ids['month_select'], 'data'),
              Output(self.ids['month_select'], 'value')],
-            Input(self.ids['year_select'], 'value')
+            Input(self.ids['year_select'], 'value'),
+            State(self.ids['date_options_store'], 'data')
         )
-        def populate_month_options(selected_year):
-            """Pobla las opciones de mes basado en el año seleccionado"""
-            if not selected_year:
-                return [], None
-            
-            try:
-                year = int(selected_year)
-                df = generate_list_month(2024, 8)
-                df_year = df[df['YEAR'] == year]
-                months_data = df_year[['MES', 'MES_TEXT']].drop_duplicates().sort_values('MES')
-                
-                month_options = [
-                    {'value': str(row['MES']), 'label': row['MES_TEXT']} 
-                    for _, row in months_data.iterrows()
-                ]
-                
-                return month_options, None
-                
-            except (ValueError, TypeError):
-                return [], None
         
-        # Callback para opciones de semana
-        @callback(
+        clientside_callback(
+            ClientsideFunction(namespace="filters", function_name="week_options_reset"),
             [Output(self.ids['week_select'], 'data'),
              Output(self.ids['week_select'], 'value')],
             [Input(self.ids['year_select'], 'value'),
-             Input(self.ids['month_select'], 'value')]
+             Input(self.ids['month_select'], 'value')],
+            State(self.ids['date_options_store'], 'data')
         )
-        def populate_week_options(selected_year, selected_month):
-            """Pobla las opciones de semana basado en año y mes seleccionados"""
-            if not selected_year:
-                return [], None
-            
-            try:
-                year = int(selected_year)
-                df = generate_list_month(2024, 8)
-                
-                if not selected_month:
-                    df_filtered = df[df['YEAR'] == year]
-                else:
-                    month = int(selected_month)
-                    df_filtered = df[(df['YEAR'] == year) & (df['MES'] == month)]
-                
-                weeks = sorted(df_filtered['SEMANA'].unique())
-                week_options = [
-                    {'value': str(week), 'label': f'{week}'} 
-                    for week in weeks
-                ]
-                
-                return week_options, None
-                
-            except (ValueError, TypeError):
-                return [], None
         
         # Callback para cargar datos de API
         @callback(
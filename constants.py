@@ -1,10 +1,6 @@
-import yaml
+from helpers.config import config
 
-# Cargar configuración desde config.yaml
-with open("config.yaml", "r") as f:
-    config = yaml.safe_load(f)
-
-# Exportar config para otros módulos que lo necesiten
+# config.yaml se lee en el primer acceso (ver helpers/config.py)
 
 #CONEXION BD
 #USER_BD = config['database']['user']
@@ -15,9 +11,7 @@ with open("config.yaml", "r") as f:
 
 
 
-#CONFIG APP
-PORT = config['app']['port']
-MODE_DEBUG = config['app']['debug']
+#CONFIG APP (PORT y MODE_DEBUG se resuelven al usarse, ver __getattr__)
 NAME_EMPRESA = "Empresa"
 NAME_USER = "Usuario"
 LOGO = "logo.png"
@@ -38,4 +32,13 @@ MICROSOFT_GRAPH_CLIENT_SECRET = ""
 
 #MICROSOFT_GRAPH_TENANT_ID_PACKING = config.get('microsoft_graph_packing', {}).get('tenant_id')
 #MICROSOFT_GRAPH_CLIENT_ID_PACKING = config.get('microsoft_graph_packing', {}).get('client_id')
-#MICROSOFT_GRAPH_CLIENT_SECRET_PACKING = config.get('microsoft_graph_packing', {}).get('client_secret')
\ No newline at end of file
+#MICROSOFT_GRAPH_CLIENT_SECRET_PACKING = config.get('microsoft_graph_packing', {}).get('client_secret')
+
+
+def __getattr__(name):
+    """Constantes que dependen de config.yaml, resueltas de forma diferida"""
+    if name == "PORT":
+        return config['app']['port']
+    if name == "MODE_DEBUG":
+        return config['app']['debug']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,255 @@
+"""
+Artifacts - Caché de archivos exportados (PDF, Excel, CSV, Parquet)
+Cada artefacto se guarda en disco con clave = hash de (tipo de exportación,
+versión del dataset, filtros normalizados, versión de plantilla). La caché
+tiene tamaño máximo con desalojo LRU y las peticiones idénticas simultáneas
+esperan a la primera en lugar de generar el archivo otra vez.
+/artifacts/<token> sirve un artefacto por URL temporal (con soporte de
+rangos HTTP) para previsualizaciones y descargas sin pasar por callbacks
+"""
+import io
+import os
+import json
+import hashlib
+import secrets
+import tempfile
+import diskcache
+from flask import Flask, abort, request, send_file
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional
+
+from core.background import background_jobs
+from core.figure_cache import FigureCache
+
+STREAM_CHUNK = 64 * 1024
+SPOOL_MAX_SIZE = 32 * 1024 * 1024
+TOKEN_TTL = 900  # Segundos de validez de una URL temporal
+
+
+def artifact_key(kind: str, version: Any = None, filters: Any = None, template: str = "1") -> str:
+    """
+    Clave de un artefacto
+
+    Args:
+        kind: Tipo de exportación (p. ej. "costos-pdf")
+        version: Versión del dataset de origen
+        filters: Filtros o datos de entrada (se normalizan; listas grandes se reducen a hash)
+        template: Versión de la plantilla del archivo (cambiarla invalida la caché)
+    """
+    payload = json.dumps({
+        "version": FigureCache._normalize(version),
+        "filters": FigureCache._normalize(filters),
+        "template": template,
+    }, sort_keys=True, default=str)
+    return f"artifact:{kind}:{hashlib.sha1(payload.encode()).hexdigest()}"
+
+
+class ArtifactStore:
+    """
+    Caché de artefactos en disco con tamaño acotado (LRU)
+
+    Args:
+        directory: Directorio de la caché (APG_ARTIFACT_DIR)
+        size_limit: Tamaño máximo en bytes (APG_ARTIFACT_SIZE_MB)
+        expire: Segundos de vida de cada artefacto (APG_ARTIFACT_TTL)
+    """
+
+    def __init__(self, directory: Optional[str] = None, size_limit: Optional[int] = None,
+                 expire: Optional[int] = None):
+        self.directory = directory or os.environ.get("APG_ARTIFACT_DIR", os.path.join("data", "artifacts"))
+        self.size_limit = size_limit or int(os.environ.get("APG_ARTIFACT_SIZE_MB", "512")) * 1024 * 1024
+        self.expire = expire or int(os.environ.get("APG_ARTIFACT_TTL", "3600"))
+        self._cache = None
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    @property
+    def cache(self) -> diskcache.Cache:
+        if self._cache is None:
+            self._cache = diskcache.Cache(
+                self.directory,
+                size_limit=self.size_limit,
+                eviction_policy="least-recently-used",
+            )
+        return self._cache
+
+    # ------------------------------------------------------------------
+    # Lectura y escritura
+    # ------------------------------------------------------------------
+    def get(self, key: str) -> Optional[bytes]:
+        """Contenido de un artefacto (None si no está en caché)"""
+        return self.cache.get(key)
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """Archivo de un artefacto para leerlo por partes (None si no está en caché)"""
+        value = self.cache.get(key, read=True)
+        if isinstance(value, bytes):
+            # Artefactos pequeños se guardan dentro de la base de diskcache
+            return io.BytesIO(value)
+        return value
+
+    def put(self, key: str, data: Any, expire: Optional[int] = None):
+        """Guarda bytes o el contenido de un archivo binario abierto"""
+        if hasattr(data, "read"):
+            self.cache.set(key, data, read=True, expire=expire or self.expire)
+        else:
+            self.cache.set(key, bytes(data), expire=expire or self.expire)
+
+    # ------------------------------------------------------------------
+    # Generación con coalescencia
+    # ------------------------------------------------------------------
+    def get_or_build(self, key: str, builder: Callable[..., bytes], *args,
+                     expire: Optional[int] = None, **kwargs) -> bytes:
+        """
+        Devuelve el artefacto en caché o lo genera una sola vez
+
+        Las peticiones simultáneas con la misma clave (en cualquier proceso)
+        esperan a la primera y reutilizan su resultado
+
+        Args:
+            key: Clave del artefacto (ver artifact_key)
+            builder: Función que genera los bytes
+            *args, **kwargs: Argumentos de builder
+            expire: Segundos de vida (por defecto expire del store)
+        """
+        data = self.get(key)
+        if data is not None:
+            self.stats["hits"] += 1
+            print(f"♻️ Artefacto '{key}' servido desde caché")
+            return data
+
+        with background_jobs.job_lock(key):
+            data = self.get(key)
+            if data is not None:
+                self.stats["coalesced"] += 1
+                print(f"♻️ Artefacto '{key}' generado por otra petición")
+                return data
+
+            self.stats["misses"] += 1
+            data = builder(*args, **kwargs)
+            self.put(key, data, expire)
+            return data
+
+    def open_or_build(self, key: str, writer: Callable[[BinaryIO], None],
+                      expire: Optional[int] = None) -> BinaryIO:
+        """
+        Como get_or_build, para artefactos grandes que se escriben a un archivo
+
+        Args:
+            key: Clave del artefacto
+            writer: Función que escribe el artefacto en el archivo recibido
+            expire: Segundos de vida
+
+        Returns:
+            Archivo binario abierto al inicio del artefacto
+        """
+        handle = self.open(key)
+        if handle is not None:
+            self.stats["hits"] += 1
+            return handle
+
+        with background_jobs.job_lock(key):
+            handle = self.open(key)
+            if handle is not None:
+                self.stats["coalesced"] += 1
+                return handle
+
+            self.stats["misses"] += 1
+            buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+            writer(buffer)
+            buffer.seek(0)
+            self.put(key, buffer, expire)
+            handle = self.open(key)
+
+        if handle is None:
+            # Artefacto mayor que la caché (desalojado al guardarlo): se sirve el temporal
+            buffer.seek(0)
+            return buffer
+        buffer.close()
+        return handle
+
+    @staticmethod
+    def stream(handle: BinaryIO, chunk_size: int = STREAM_CHUNK) -> Iterator[bytes]:
+        """Lee un artefacto abierto por fragmentos y lo cierra al terminar"""
+        with handle:
+            while True:
+                chunk = handle.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    # ------------------------------------------------------------------
+    # URLs temporales
+    # ------------------------------------------------------------------
+    def share(self, key: str, filename: str, mimetype: str, ttl: int = TOKEN_TTL) -> str:
+        """
+        URL temporal de un artefacto ya guardado
+
+        Args:
+            key: Clave del artefacto
+            filename: Nombre del archivo al descargar
+            mimetype: Tipo MIME
+            ttl: Segundos de validez de la URL
+
+        Returns:
+            Ruta /artifacts/<token> (agregar ?download=1 para descargar)
+        """
+        token = secrets.token_urlsafe(16)
+        self.cache.set(f"token:{token}", {"key": key, "filename": filename, "mimetype": mimetype}, expire=ttl)
+        return f"/artifacts/{token}"
+
+    def resolve(self, token: str) -> Optional[Dict[str, Any]]:
+        """Datos de una URL temporal (None si expiró o el artefacto fue desalojado)"""
+        entry = self.cache.get(f"token:{token}")
+        if entry is None or entry["key"] not in self.cache:
+            return None
+        return entry
+
+    def clear(self):
+        """Elimina todos los artefactos"""
+        self.cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de la caché de artefactos"""
+        return {
+            **self.stats,
+            "entries": len(self.cache),
+            "size_bytes": self.cache.volume(),
+            "size_limit": self.size_limit,
+        }
+
+
+# Instancia global de artefactos exportados
+artifact_store = ArtifactStore()
+
+
+def init_artifacts(server: Flask):
+    """
+    Registra /artifacts/<token>
+
+    Responde con soporte de Range/If-Modified-Since (visor PDF del navegador)
+
+    Args:
+        server: Servidor Flask (app.server)
+    """
+    @server.route('/artifacts/<token>', methods=['GET'])
+    def serve_artifact(token):
+        entry = artifact_store.resolve(token)
+        handle = artifact_store.open(entry["key"]) if entry else None
+        if handle is None:
+            abort(404)
+
+        # Artefactos en archivo propio: send_file por ruta (tamaño conocido para rangos)
+        source = handle
+        if isinstance(getattr(handle, "name", None), str) and os.path.exists(handle.name):
+            source = handle.name
+            handle.close()
+
+        return send_file(
+            source,
+            mimetype=entry["mimetype"],
+            as_attachment=request.args.get("download") == "1",
+            download_name=entry["filename"],
+            conditional=True,
+            max_age=0,
+        )
+
+    return server
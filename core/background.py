@@ -0,0 +1,202 @@
+"""
+Background - Callbacks en segundo plano (Dash background callbacks)
+Las cargas largas y la generación de PDFs corren en procesos del
+DiskcacheManager y no ocupan los workers web. Incluye progreso por etapas
+y deduplicación de trabajos idénticos entre usuarios (single flight)
+"""
+import os
+import time
+import pickle
+import asyncio
+import hashlib
+import inspect
+import threading
+import diskcache
+import psutil
+from contextlib import contextmanager
+from dash import DiskcacheManager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Etapas de la carga de datos: (porcentaje, texto)
+LOAD_STAGES: Dict[str, Tuple[int, str]] = {
+    "token": (10, "Obteniendo token de acceso..."),
+    "listing": (25, "Listando archivos..."),
+    "download": (45, "Descargando archivos..."),
+    "parse": (70, "Leyendo datos..."),
+    "transform": (85, "Transformando datos..."),
+    "done": (100, "Datos listos"),
+}
+
+_MISSING = object()
+
+
+def stage_progress(set_progress: Optional[Callable], stages: Dict[str, Tuple[int, str]] = LOAD_STAGES) -> Callable[[str], None]:
+    """
+    Crea un reportador de etapas sobre set_progress
+
+    Args:
+        set_progress: Función de progreso del background callback (None fuera de él)
+        stages: {etapa: (porcentaje, texto)}
+
+    Returns:
+        Función progress(etapa) que envía (porcentaje, texto) al navegador
+    """
+    def progress(stage: str):
+        print(f"⏳ Etapa: {stage}")
+        if set_progress is not None and stage in stages:
+            set_progress(stages[stage])
+    return progress
+
+
+def job_key(name: str, *args) -> str:
+    """Clave estable de un trabajo a partir de su nombre y argumentos"""
+    digest = hashlib.sha1(pickle.dumps(args, protocol=4)).hexdigest()[:16]
+    return f"{name}:{digest}"
+
+
+class BackgroundJobs:
+    """
+    Manager de background callbacks con deduplicación de trabajos
+
+    Args:
+        directory: Directorio de diskcache (APG_BACKGROUND_DIR)
+        expire: Segundos que se conservan los resultados de trabajos
+        lock_expire: Segundos de vida de un lock sin renovar; el dueño lo
+                     renueva mientras el trabajo corre (APG_BACKGROUND_LOCK_EXPIRE)
+    """
+
+    def __init__(self, directory: Optional[str] = None, expire: Optional[int] = None,
+                 lock_expire: Optional[int] = None):
+        self.directory = directory or os.environ.get("APG_BACKGROUND_DIR", os.path.join("data", "background"))
+        self.expire = expire or int(os.environ.get("APG_BACKGROUND_EXPIRE", "600"))
+        self.lock_expire = lock_expire or int(os.environ.get("APG_BACKGROUND_LOCK_EXPIRE", "60"))
+        self.cache = diskcache.Cache(self.directory)
+        self.manager = DiskcacheManager(self.cache, expire=self.expire)
+
+    # ------------------------------------------------------------------
+    # Lock entre procesos (libre si el proceso dueño murió o fue cancelado)
+    # ------------------------------------------------------------------
+    def _acquire(self, lock_key: str, poll: float = 0.25, on_wait: Optional[Callable[[], None]] = None):
+        while not self.cache.add(lock_key, os.getpid(), expire=self.lock_expire):
+            owner = self.cache.get(lock_key)
+            if owner is not None and not psutil.pid_exists(owner):
+                print(f"🔓 Lock '{lock_key}' de un trabajo cancelado, liberando")
+                self.cache.delete(lock_key)
+                continue
+            if on_wait is not None:
+                on_wait()
+            time.sleep(poll)
+
+    def _release(self, lock_key: str):
+        if self.cache.get(lock_key) == os.getpid():
+            self.cache.delete(lock_key)
+
+    def _heartbeat(self, lock_key: str, stop: threading.Event):
+        """Renueva el lock mientras el trabajo sigue corriendo"""
+        while not stop.wait(self.lock_expire / 3):
+            if self.cache.get(lock_key) == os.getpid():
+                self.cache.touch(lock_key, expire=self.lock_expire)
+
+    @contextmanager
+    def job_lock(self, key: str, on_wait: Optional[Callable[[], None]] = None):
+        """
+        Lock entre procesos para un trabajo (p. ej. generar un artefacto)
+
+        Args:
+            key: Clave del trabajo
+            on_wait: Se llama en cada sondeo mientras otro proceso tiene el lock
+        """
+        lock_key = f"lock:{key}"
+        self._acquire(lock_key, on_wait=on_wait)
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(lock_key, stop), daemon=True)
+        heartbeat.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            heartbeat.join()
+            self._release(lock_key)
+
+    def _progress_relay(self, key: str, set_progress: Optional[Callable]) -> Tuple[Optional[Callable], Callable[[], None]]:
+        """
+        Comparte el progreso de un trabajo con los procesos que lo esperan
+
+        Returns:
+            (set_progress del dueño que además publica el progreso,
+             función que reenvía a este proceso el último progreso publicado)
+        """
+        progress_key = f"progress:{key}"
+        last = {"value": None}
+
+        def publish(value):
+            self.cache.set(progress_key, value, expire=self.expire)
+            set_progress(value)
+
+        def follow():
+            value = self.cache.get(progress_key)
+            if value is not None and value != last["value"]:
+                last["value"] = value
+                set_progress(value)
+
+        if set_progress is None:
+            return None, lambda: None
+        return publish, follow
+
+    def single_flight(self, key: str, func: Callable, *args, ttl: Optional[int] = None,
+                      should_cache: Callable[[Any], bool] = lambda result: True,
+                      set_progress: Optional[Callable] = None, **kwargs) -> Any:
+        """
+        Ejecuta func una sola vez para trabajos idénticos
+
+        Los trabajos con la misma clave esperan al primero y reutilizan su
+        resultado durante ttl segundos. Acepta funciones síncronas o async.
+        El resultado se guarda serializado en diskcache: debe ser pequeño
+        (p. ej. la versión de un dataset publicado, no el dataset)
+
+        Args:
+            key: Clave del trabajo (ver job_key)
+            func: Función a ejecutar
+            *args, **kwargs: Argumentos de func
+            ttl: Segundos que se reutiliza el resultado (por defecto expire)
+            should_cache: Indica si un resultado puede reutilizarse (p. ej. no errores)
+            set_progress: Progreso del background callback; se pasa a func y
+                          los procesos que esperan reciben el mismo progreso
+
+        Returns:
+            Resultado de func o el de un trabajo idéntico
+        """
+        result_key = f"result:{key}"
+        result = self.cache.get(result_key, default=_MISSING)
+        if result is not _MISSING:
+            print(f"♻️ Trabajo '{key}' reutilizado")
+            return result
+
+        publish, follow = self._progress_relay(key, set_progress)
+        with self.job_lock(key, on_wait=follow):
+            result = self.cache.get(result_key, default=_MISSING)
+            if result is not _MISSING:
+                print(f"♻️ Trabajo '{key}' resuelto por otro proceso")
+                return result
+
+            if publish is not None:
+                kwargs["set_progress"] = publish
+            result = func(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = asyncio.run(result)
+            if should_cache(result):
+                self.cache.set(result_key, result, expire=ttl or self.expire)
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado del directorio de trabajos"""
+        return {
+            "directory": self.directory,
+            "entries": len(self.cache),
+            "size_bytes": self.cache.volume(),
+        }
+
+
+# Instancia global de trabajos en segundo plano
+background_jobs = BackgroundJobs()
+background_manager = background_jobs.manager
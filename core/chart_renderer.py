@@ -0,0 +1,325 @@
+"""
+ChartRenderer - Servicio de rasterización de gráficos para reportes PDF
+Un proceso dedicado mantiene abierto kaleido (navegador y pestañas) y
+renderiza lotes de figuras; los workers y los background callbacks le
+envían las figuras por un socket Unix en un directorio privado (0700) con
+mensajes JSON y bytes crudos: nada se deserializa con pickle. Las imágenes
+se guardan en una caché en disco (compartida entre procesos) con clave =
+hash del JSON de la figura + formato y tamaño
+
+    python -m core.chart_renderer   # servidor (se inicia solo en el primer uso)
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import stat
+import hashlib
+import tempfile
+import threading
+import subprocess
+import diskcache
+import plotly.io as pio
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional, Sequence
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_OPTS = {"format": "png", "width": 600, "height": 400, "scale": 2}
+
+
+def _render_address() -> str:
+    """
+    Socket Unix del servidor (APG_CHART_RENDER_SOCKET)
+
+    El directorio se crea con permisos 0700 y debe pertenecer al usuario
+    actual: sólo sus procesos pueden conectarse
+    """
+    path = os.environ.get("APG_CHART_RENDER_SOCKET") or os.path.join(
+        tempfile.gettempdir(), f"apg-charts-{os.getuid()}", "render.sock"
+    )
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise PermissionError(f"Directorio del socket de gráficos no privado: {directory}")
+    return path
+
+
+def _send_json(conn, message: Dict[str, Any]):
+    conn.send_bytes(json.dumps(message).encode())
+
+
+def _recv_json(conn) -> Dict[str, Any]:
+    return json.loads(conn.recv_bytes().decode())
+
+
+def figure_json(fig: Any) -> str:
+    """JSON de una figura (go.Figure o dict)"""
+    return pio.to_json(fig, validate=False)
+
+
+def image_key(fig_json: str, opts: Dict[str, Any]) -> str:
+    """Clave de caché: hash del JSON de la figura + formato y tamaño"""
+    digest = hashlib.sha1(fig_json.encode())
+    digest.update(json.dumps(opts, sort_keys=True).encode())
+    return f"chart:{digest.hexdigest()}"
+
+
+class ChartRenderer:
+    """
+    Cliente del servicio de rasterización con caché de imágenes
+
+    Args:
+        directory: Directorio de la caché de imágenes (APG_CHART_CACHE_DIR)
+        size_limit: Tamaño máximo de la caché en bytes
+        connect_timeout: Segundos de espera al iniciar el servidor
+        render_timeout: Segundos máximos de espera de un lote (APG_CHART_RENDER_TIMEOUT);
+                        al vencer se renderiza en este proceso
+    """
+
+    def __init__(self, directory: Optional[str] = None, size_limit: int = 256 * 1024 * 1024,
+                 connect_timeout: float = 20.0, render_timeout: Optional[float] = None):
+        self.directory = directory or os.environ.get("APG_CHART_CACHE_DIR", os.path.join("data", "charts"))
+        self.size_limit = size_limit
+        self.connect_timeout = connect_timeout
+        self.render_timeout = render_timeout or float(os.environ.get("APG_CHART_RENDER_TIMEOUT", "60"))
+        self.enabled = os.environ.get("APG_CHART_RENDERER", "1") != "0"
+        self._cache = None
+        self._spawn_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "remote": 0, "local": 0, "timeouts": 0}
+
+    @property
+    def cache(self) -> diskcache.Cache:
+        if self._cache is None:
+            self._cache = diskcache.Cache(self.directory, size_limit=self.size_limit)
+        return self._cache
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def render(self, fig: Any, **opts) -> bytes:
+        """Renderiza una figura (ver render_many)"""
+        return self.render_many([fig], **opts)[0]
+
+    def render_many(self, figs: Sequence[Any], **opts) -> List[bytes]:
+        """
+        Renderiza varias figuras en un solo lote
+
+        Args:
+            figs: Figuras Plotly (go.Figure o dict)
+            **opts: format, width, height, scale (por defecto DEFAULT_OPTS)
+
+        Returns:
+            Bytes de cada imagen, en el mismo orden que figs
+        """
+        opts = {**DEFAULT_OPTS, **opts}
+        payloads = [figure_json(fig) for fig in figs]
+        keys = [image_key(payload, opts) for payload in payloads]
+
+        images: List[Optional[bytes]] = [self.cache.get(key) for key in keys]
+        missing = [i for i, image in enumerate(images) if image is None]
+        self.stats["hits"] += len(figs) - len(missing)
+        self.stats["misses"] += len(missing)
+        if not missing:
+            return images
+
+        rendered = self._render_batch([payloads[i] for i in missing], opts)
+        for i, image in zip(missing, rendered):
+            images[i] = image
+            self.cache.set(keys[i], image)
+        return images
+
+    def warm_up(self):
+        """Inicia el servidor de renderizado en segundo plano (sin esperar)"""
+        def connect():
+            conn = self._connect()
+            if conn is not None:
+                conn.close()
+
+        if self.enabled:
+            threading.Thread(target=connect, daemon=True, name="chart-renderer-warmup").start()
+
+    # ------------------------------------------------------------------
+    # Servidor
+    # ------------------------------------------------------------------
+    def _connect(self, spawn: bool = True):
+        """Conexión al servidor; lo inicia si no está corriendo"""
+        address = _render_address()
+        try:
+            return Client(address, family="AF_UNIX")
+        except OSError:
+            if not spawn:
+                return None
+
+        with self._spawn_lock:
+            try:
+                return Client(address, family="AF_UNIX")
+            except OSError:
+                pass
+            print("🖼️ Iniciando servidor de renderizado de gráficos...")
+            subprocess.Popen(
+                [sys.executable, "-m", "core.chart_renderer"],
+                cwd=PROJECT_ROOT,
+                start_new_session=True,
+            )
+            deadline = time.monotonic() + self.connect_timeout
+            while time.monotonic() < deadline:
+                try:
+                    return Client(address, family="AF_UNIX")
+                except OSError:
+                    time.sleep(0.2)
+        return None
+
+    def _receive(self, conn, count: int) -> List[bytes]:
+        """Lee count imágenes respetando render_timeout"""
+        deadline = time.monotonic() + self.render_timeout
+        images = []
+        for _ in range(count):
+            if not conn.poll(max(deadline - time.monotonic(), 0)):
+                raise TimeoutError(f"sin respuesta en {self.render_timeout:.0f}s")
+            images.append(conn.recv_bytes())
+        return images
+
+    def _render_batch(self, payloads: List[str], opts: Dict[str, Any]) -> List[bytes]:
+        """Envía un lote al servidor; sin servidor renderiza en este proceso"""
+        if self.enabled:
+            try:
+                conn = self._connect()
+                if conn is not None:
+                    with conn:
+                        _send_json(conn, {"figures": payloads, "opts": opts})
+                        if not conn.poll(self.render_timeout):
+                            raise TimeoutError(f"sin respuesta en {self.render_timeout:.0f}s")
+                        response = _recv_json(conn)
+                        if "error" not in response:
+                            images = self._receive(conn, response["count"])
+                            self.stats["remote"] += len(payloads)
+                            return images
+                    print(f"⚠️ Error del servidor de gráficos: {response['error']}")
+            except TimeoutError as e:
+                self.stats["timeouts"] += 1
+                print(f"⚠️ Servidor de gráficos lento, renderizando localmente: {e}")
+            except (EOFError, OSError, ValueError) as e:
+                print(f"⚠️ Servidor de gráficos no disponible: {e}")
+
+        self.stats["local"] += len(payloads)
+        return [pio.to_image(json.loads(payload), **opts) for payload in payloads]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de la caché de imágenes"""
+        return {
+            **self.stats,
+            "entries": len(self.cache),
+            "size_bytes": self.cache.volume(),
+        }
+
+
+class RenderServer:
+    """
+    Proceso de renderizado con kaleido abierto
+
+    Args:
+        tabs: Pestañas del navegador (renders concurrentes)
+        idle_timeout: Segundos sin peticiones antes de cerrarse
+    """
+
+    def __init__(self, tabs: int = 4, idle_timeout: int = 900):
+        self.tabs = tabs
+        self.idle_timeout = idle_timeout
+        self.last_request = time.monotonic()
+        self._loop = asyncio.new_event_loop()
+        self._kaleido = None
+        self._ready = threading.Event()
+        self._stop: Optional[asyncio.Event] = None
+
+    async def _hold_kaleido(self):
+        """Mantiene kaleido abierto hasta que se detenga el servidor"""
+        self._stop = asyncio.Event()
+        try:
+            import kaleido
+            async with kaleido.Kaleido(n=self.tabs) as k:
+                self._kaleido = k
+                self._ready.set()
+                await self._stop.wait()
+        except Exception as e:
+            print(f"⚠️ kaleido no disponible, se usará pio.to_image: {e}")
+            self._ready.set()
+            await self._stop.wait()
+
+    async def _render(self, payloads: List[str], opts: Dict[str, Any]) -> List[bytes]:
+        if self._kaleido is None:
+            return [pio.to_image(json.loads(payload), **opts) for payload in payloads]
+        return await asyncio.gather(*(self._kaleido.calc_fig(json.loads(payload), opts=opts) for payload in payloads))
+
+    def _handle(self, conn):
+        with conn:
+            try:
+                request = _recv_json(conn)
+                self.last_request = time.monotonic()
+                future = asyncio.run_coroutine_threadsafe(self._render(request["figures"], request["opts"]), self._loop)
+                images = future.result()
+                _send_json(conn, {"count": len(images)})
+                for image in images:
+                    conn.send_bytes(image)
+            except Exception as e:
+                try:
+                    _send_json(conn, {"error": str(e)})
+                except OSError:
+                    pass
+
+    def _watch_idle(self):
+        while time.monotonic() - self.last_request < self.idle_timeout:
+            time.sleep(10)
+        print("🖼️ Servidor de gráficos inactivo, cerrando")
+        self._loop.call_soon_threadsafe(self._stop.set)
+
+    def serve(self):
+        """Acepta lotes hasta quedar inactivo"""
+        address = _render_address()
+        try:
+            Client(address, family="AF_UNIX").close()
+            print(f"🖼️ Servidor de gráficos ya en ejecución en {address}")
+            return
+        except OSError:
+            # Sin servidor: el socket que quede es de un proceso terminado
+            if os.path.exists(address):
+                os.remove(address)
+        try:
+            listener = Listener(address, family="AF_UNIX")
+        except OSError as e:
+            print(f"🖼️ Servidor de gráficos ya en ejecución: {e}")
+            return
+
+        loop_thread = threading.Thread(
+            target=self._loop.run_until_complete, args=(self._hold_kaleido(),), daemon=True
+        )
+        loop_thread.start()
+        self._ready.wait()
+        print(f"✅ Servidor de gráficos listo en {_render_address()}")
+
+        def accept_loop():
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception:
+                    # Conexión cortada
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+        threading.Thread(target=accept_loop, daemon=True).start()
+        threading.Thread(target=self._watch_idle, daemon=True).start()
+        loop_thread.join()
+        listener.close()
+
+
+# Instancia global del servicio de gráficos
+chart_renderer = ChartRenderer()
+
+
+if __name__ == "__main__":
+    RenderServer(
+        tabs=int(os.environ.get("APG_CHART_RENDER_TABS", "4")),
+        idle_timeout=int(os.environ.get("APG_CHART_RENDER_IDLE", "900")),
+    ).serve()
@@ -8,6 +8,8 @@ from dash import dcc, html, Input, Output, callback
 from components.grid import Row, Column
 from typing import Dict, List, Any, Optional, Callable
 
+from .downsample import series_downsampler
+
 
 class FilterComponent:
     """Componente reutilizable para filtros"""
@@ -62,6 +64,9 @@ class FilterComponent:
 class ChartComponent:
     """Componente reutilizable para gráficos"""
     
+    # Tipos con series que se reducen (LTTB/min-max) y re-muestrean al hacer zoom
+    DOWNSAMPLED_TYPES = ('line', 'scatter')
+    
     def __init__(self, dashboard_id: str, chart_config: Dict):
         self.dashboard_id = dashboard_id
         self.chart_config = chart_config
@@ -128,6 +133,14 @@ class ChartComponent:
             else:
                 fig = self._create_empty_figure(f"Tipo de gráfico '{chart_type}' no soportado")
             
+            # Series largas: reducción por ancho y WebGL
+            if chart_type in self.DOWNSAMPLED_TYPES:
+                fig = series_downsampler.downsample_figure(
+                    fig,
+                    width=self.chart_config.get('width'),
+                    method=self.chart_config.get('downsample', 'lttb')
+                )
+            
             return fig
             
         except Exception as e:
@@ -0,0 +1,78 @@
+"""
+Compression - Compresión gzip/brotli de respuestas Flask (JSON de Dash)
+"""
+import gzip
+from typing import Iterable
+from flask import Flask, request
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "application/javascript",
+    "text/javascript",
+)
+
+
+def _accepted_encoding(accept_encoding: str) -> str:
+    """Selecciona la mejor codificación aceptada por el cliente"""
+    accept_encoding = accept_encoding.lower()
+    if brotli is not None and "br" in accept_encoding:
+        return "br"
+    if "gzip" in accept_encoding:
+        return "gzip"
+    return ""
+
+
+def init_compression(server: Flask, min_size: int = 1024, level: int = 6,
+                     mimetypes: Iterable[str] = COMPRESSIBLE_MIMETYPES):
+    """
+    Registra un after_request que comprime respuestas grandes
+
+    Args:
+        server: Servidor Flask (app.server)
+        min_size: Tamaño mínimo en bytes para comprimir
+        level: Nivel de compresión gzip (brotli usa quality 5)
+        mimetypes: Tipos MIME comprimibles
+    """
+    mimetypes = tuple(mimetypes)
+
+    @server.after_request
+    def compress_response(response):
+        if (
+            response.direct_passthrough
+            or response.status_code < 200
+            or response.status_code >= 300
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in mimetypes
+        ):
+            return response
+
+        encoding = _accepted_encoding(request.headers.get("Accept-Encoding", ""))
+        if not encoding:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=5)
+        else:
+            compressed = gzip.compress(data, compresslevel=level)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        response.headers["Content-Length"] = str(len(compressed))
+        vary = response.headers.get("Vary")
+        response.headers["Vary"] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+        return response
+
+    print(f"✅ Compresión de respuestas activa ({'br, ' if brotli else ''}gzip)")
+    return server
@@ -9,6 +9,7 @@ from components.grid import Row, Column
 
 from .data_manager import data_manager
 from .components import FilterComponent, ChartComponent, HeaderComponent, MetricsComponent
+from .downsample import series_downsampler
 
 
 class DashboardConfig:
@@ -201,6 +202,13 @@ class DashboardFactory:
                 # Crear gráfico
                 aggregation_config = chart_cfg.get('aggregation', {})
                 return chart_comp.create_figure(df, aggregation_config)
+            
+            # Zoom: resolución completa del rango visible
+            if chart_config.get('type', 'line') in ChartComponent.DOWNSAMPLED_TYPES:
+                series_downsampler.register_relayout_callback(
+                    chart_component.get_chart_id(),
+                    width=chart_config.get('width')
+                )
         
         # 4. Callbacks para métricas (si existen)
         if metrics_component:
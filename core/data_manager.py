@@ -10,6 +10,7 @@ from helpers.get_token import get_access_token
 from helpers.get_api import listar_archivos_en_carpeta_compartida
 from helpers.helpers import get_download_url_by_name, generate_list_month, dataframe_filtro
 from constants import DRIVE_ID_CARPETA_STORAGE, FOLDER_ID_CARPETA_STORAGE
+from core.dtypes import read_parquet, to_records
 
 
 class DataSource:
@@ -102,9 +103,9 @@ class DataManager:
                 if not url:
                     raise Exception(f"No se encontró el archivo: {source.file_name}")
                 
-                df = await asyncio.to_thread(pd.read_parquet, url)
+                df = await asyncio.to_thread(read_parquet, url)
                 df = source.processor(df)
-                data = df.to_dict('records')
+                data = to_records(df)
             
             print(f"✅ Fuente '{source.name}' cargada exitosamente")
             return {"success": True, "data": data, "error": None}
@@ -0,0 +1,339 @@
+"""
+DatasetStore - Datasets compartidos entre procesos como archivos Arrow IPC
+La ingesta publica cada versión en un directorio propio y cambia el puntero
+CURRENT con un rename atómico; los workers abren los archivos con memory
+mapping (lectura sin copia, páginas compartidas por el sistema operativo).
+Cada proceso deja un archivo de lease por versión abierta para que las
+versiones antiguas sólo se borren cuando nadie las referencia
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+import pandas as pd
+import pyarrow as pa
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from core.dtypes import arrow_mode_enabled
+
+CURRENT_FILE = "CURRENT"
+META_FILE = "meta.json"
+LEASE_PREFIX = ".lease-"
+
+
+def _pid_alive(pid: int) -> bool:
+    """Indica si un proceso sigue vivo"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_zero_copy(column: pa.ChunkedArray) -> bool:
+    """Columna que pandas puede usar como vista NumPy del mmap (numérica, sin nulos, un bloque)"""
+    numeric = pa.types.is_integer(column.type) or pa.types.is_floating(column.type)
+    return numeric and column.null_count == 0 and column.num_chunks <= 1
+
+
+def _mapped_frame(table: pa.Table) -> pd.DataFrame:
+    """
+    DataFrame cuyas columnas siguen respaldadas por el mmap
+
+    Las numéricas sin nulos quedan como vistas NumPy; el resto (texto,
+    nulos, fechas, booleanos) como ArrowDtype, porque convertirlas a NumPy
+    crearía objetos Python por worker. Los consumidores que necesitan NumPy
+    convierten con core.dtypes.to_numpy_frame
+    """
+    zero_copy = [name for name, column in zip(table.column_names, table.columns) if _is_zero_copy(column)]
+    frame = table.select(zero_copy).to_pandas(split_blocks=True)
+    # insert no consolida bloques: las vistas NumPy no se copian
+    for position, (name, column) in enumerate(zip(table.column_names, table.columns)):
+        if name not in zero_copy:
+            frame.insert(position, name, pd.arrays.ArrowExtensionArray(column))
+    return frame
+
+
+def _atomic_write(path: str, content: str):
+    """Escribe un archivo pequeño de forma atómica (tmp + rename)"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SharedDatasetStore:
+    """
+    Almacén de datasets Arrow con versiones, mmap y conteo de referencias
+
+    Args:
+        root: Directorio del volumen local (APG_DATASET_DIR)
+        keep_versions: Versiones antiguas sin referencias que se conservan
+    """
+
+    def __init__(self, root: Optional[str] = None, keep_versions: int = 1):
+        self.root = root or os.environ.get("APG_DATASET_DIR", os.path.join("data", "datasets"))
+        self.keep_versions = keep_versions
+        self._mapped: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Rutas
+    # ------------------------------------------------------------------
+    def _dataset_dir(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _version_dir(self, name: str, version: str) -> str:
+        return os.path.join(self._dataset_dir(name), version)
+
+    def current_version(self, name: str) -> Optional[str]:
+        """Versión apuntada por CURRENT (None si no hay datos publicados)"""
+        try:
+            with open(os.path.join(self._dataset_dir(name), CURRENT_FILE), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def get_meta(self, name: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Metadatos de una versión (fecha de publicación, frames, filas)"""
+        version = version or self.current_version(name)
+        if not version:
+            return None
+        try:
+            with open(os.path.join(self._version_dir(name, version), META_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    # ------------------------------------------------------------------
+    # Publicación (ingesta)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _to_table(df: pd.DataFrame) -> pa.Table:
+        """DataFrame a tabla Arrow (columnas object mixtas como texto)"""
+        df = df.reset_index(drop=True)
+        try:
+            return pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            mixed = {col: "string" for col in df.columns if df[col].dtype == object}
+            return pa.Table.from_pandas(df.astype(mixed), preserve_index=False)
+
+    def publish(self, name: str, frames: Dict[str, pd.DataFrame],
+                meta: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Publica una nueva versión de un dataset
+
+        Args:
+            name: Nombre del dataset (DATA_SOURCE de la página)
+            frames: {nombre_frame: DataFrame}
+            meta: Metadatos adicionales (p. ej. versión de contenido)
+
+        Returns:
+            Identificador de la versión publicada
+        """
+        version = f"v{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        dataset_dir = self._dataset_dir(name)
+        tmp_dir = os.path.join(dataset_dir, f".tmp-{version}")
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        try:
+            rows = {}
+            for index, (frame_name, df) in enumerate(frames.items()):
+                table = self._to_table(df)
+                # Sin compresión: los buffers se leen directo desde el mmap
+                with pa.OSFile(os.path.join(tmp_dir, f"{index}.arrow"), "wb") as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                rows[frame_name] = table.num_rows
+
+            meta = {
+                **(meta or {}),
+                "version": version,
+                "published_at": time.time(),
+                "frames": list(frames.keys()),
+                "rows": rows,
+            }
+            _atomic_write(os.path.join(tmp_dir, META_FILE), json.dumps(meta))
+
+            # Directorio completo -> nombre definitivo -> puntero CURRENT
+            os.rename(tmp_dir, self._version_dir(name, version))
+            _atomic_write(os.path.join(dataset_dir, CURRENT_FILE), version)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        print(f"📦 Dataset '{name}' publicado ({version}, {sum(rows.values())} filas)")
+        self.collect(name)
+        return version
+
+    # ------------------------------------------------------------------
+    # Lectura (workers)
+    # ------------------------------------------------------------------
+    def _lease_path(self, name: str, version: str) -> str:
+        return os.path.join(self._version_dir(name, version), f"{LEASE_PREFIX}{os.getpid()}")
+
+    def _map_version(self, name: str, version: str) -> Dict[str, pd.DataFrame]:
+        """Abre los archivos de una versión con memory mapping"""
+        meta = self.get_meta(name, version)
+        if meta is None:
+            raise FileNotFoundError(f"Versión {version} de '{name}' incompleta")
+
+        frames = {}
+        for index, frame_name in enumerate(meta["frames"]):
+            source = pa.memory_map(os.path.join(self._version_dir(name, version), f"{index}.arrow"), "r")
+            table = pa.ipc.open_file(source).read_all()
+            if arrow_mode_enabled():
+                frames[frame_name] = table.to_pandas(types_mapper=pd.ArrowDtype)
+            else:
+                frames[frame_name] = _mapped_frame(table)
+        return frames
+
+    def acquire(self, name: str) -> Tuple[Optional[str], Optional[Dict[str, pd.DataFrame]]]:
+        """
+        Obtiene la versión actual y suma una referencia
+
+        Returns:
+            (versión, {frame: DataFrame}) o (None, None) si no hay datos
+        """
+        with self._lock:
+            version = self.current_version(name)
+            if version is None:
+                return None, None
+
+            entry = self._mapped.get(name)
+            if entry is None or entry["version"] != version:
+                frames = self._map_version(name, version)
+                open(self._lease_path(name, version), "w").close()
+                if entry is not None:
+                    entry["stale"] = True
+                    self._mapped[f"{name}@{entry['version']}"] = entry
+                entry = {"name": name, "version": version, "frames": frames, "refs": 0, "stale": False}
+                self._mapped[name] = entry
+
+            entry["refs"] += 1
+            self._release_stale(name)
+            return version, entry["frames"]
+
+    def release(self, name: str, version: str):
+        """Resta una referencia; una versión antigua sin referencias se libera"""
+        with self._lock:
+            for key in (name, f"{name}@{version}"):
+                entry = self._mapped.get(key)
+                if entry is not None and entry["version"] == version:
+                    entry["refs"] = max(entry["refs"] - 1, 0)
+            self._release_stale(name)
+
+    def _release_stale(self, name: str):
+        """Cierra mapeos de versiones reemplazadas que ya no tienen referencias"""
+        for key in [k for k in self._mapped if k.startswith(f"{name}@")]:
+            entry = self._mapped[key]
+            if entry["refs"] == 0:
+                del self._mapped[key]
+                try:
+                    os.remove(self._lease_path(name, entry["version"]))
+                except FileNotFoundError:
+                    pass
+                self.collect(name)
+
+    def open(self, name: str) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        Lee la versión actual sin retener referencia (uso puntual)
+
+        Para mantener los DataFrames vivos a través de un cambio de versión
+        usar acquire()/release()
+        """
+        version, frames = self.acquire(name)
+        if version is not None:
+            self.release(name, version)
+        return frames
+
+    @contextmanager
+    def reading(self, name: str) -> Iterator[Tuple[Optional[str], Optional[Dict[str, pd.DataFrame]]]]:
+        """
+        Retiene la versión actual mientras dura el bloque
+
+        Los DataFrames respaldados por el mmap son la única copia en el
+        servidor: los payloads se construyen dentro del bloque y no se guardan
+
+        Yields:
+            (versión, {frame: DataFrame}) o (None, None) si no hay datos
+        """
+        version, frames = self.acquire(name)
+        try:
+            yield version, frames
+        finally:
+            if version is not None:
+                self.release(name, version)
+
+    def fresh_version(self, name: str, max_age: float) -> Optional[str]:
+        """Versión actual si tiene menos de max_age segundos (None si expiró o no hay datos)"""
+        meta = self.get_meta(name)
+        if meta is None or time.time() - meta.get("published_at", 0) > max_age:
+            return None
+        return meta["version"]
+
+    def open_fresh(self, name: str, max_age: float) -> Optional[Dict[str, pd.DataFrame]]:
+        """Como open(), pero sólo si la versión actual tiene menos de max_age segundos"""
+        if self.fresh_version(name, max_age) is None:
+            return None
+        try:
+            return self.open(name)
+        except (FileNotFoundError, OSError, pa.ArrowInvalid) as e:
+            print(f"⚠️ No se pudo abrir el dataset compartido '{name}': {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Limpieza
+    # ------------------------------------------------------------------
+    def collect(self, name: str) -> int:
+        """
+        Elimina versiones antiguas sin leases de procesos vivos
+
+        Returns:
+            Número de versiones eliminadas
+        """
+        dataset_dir = self._dataset_dir(name)
+        current = self.current_version(name)
+        if not os.path.isdir(dataset_dir):
+            return 0
+
+        versions = sorted(
+            (d for d in os.listdir(dataset_dir)
+             if d != current and not d.startswith(".") and os.path.isdir(os.path.join(dataset_dir, d))),
+            reverse=True
+        )
+        removed = 0
+        for version in versions[self.keep_versions:]:
+            version_dir = os.path.join(dataset_dir, version)
+            alive = False
+            for lease in (f for f in os.listdir(version_dir) if f.startswith(LEASE_PREFIX)):
+                pid = int(lease[len(LEASE_PREFIX):])
+                if pid != os.getpid() and _pid_alive(pid):
+                    alive = True
+                elif pid != os.getpid():
+                    os.remove(os.path.join(version_dir, lease))  # lease de un proceso muerto
+                elif f"{name}@{version}" in self._mapped or self._mapped.get(name, {}).get("version") == version:
+                    alive = True
+            if not alive:
+                shutil.rmtree(version_dir, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado de los mapeos del proceso"""
+        with self._lock:
+            return {
+                "root": self.root,
+                "mapped": {key: {"version": e["version"], "refs": e["refs"]} for key, e in self._mapped.items()},
+            }
+
+
+# Instancia global del almacén compartido
+dataset_store = SharedDatasetStore()
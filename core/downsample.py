@@ -0,0 +1,330 @@
+"""
+Downsample - Reducción de series largas para gráficos Plotly
+LTTB (Largest-Triangle-Three-Buckets) o min/max por bucket de píxel según el
+ancho del gráfico; las series largas pasan a Scattergl (WebGL) y el zoom pide
+la resolución completa del rango visible mediante un callback de relayout.
+Las series completas se guardan en una caché de disco compartida
+(APG_SERIES_DIR): el relayout puede atenderlo cualquier worker, también
+cuando la figura salió de la caché de figuras
+"""
+import os
+import hashlib
+import threading
+import diskcache
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from dash import callback, Input, Output, State, Patch, no_update
+
+# Propiedades por punto que deben recortarse junto con x/y
+POINT_PROPS = ("customdata", "text", "hovertext")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Índices seleccionados por Largest-Triangle-Three-Buckets
+
+    Args:
+        x: Valores numéricos del eje x (ordenados)
+        y: Valores del eje y
+        n_out: Número de puntos a conservar
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        xs, ys = x[start:end], y[start:end]
+        area = np.abs((x[a] - avg_x) * (ys - y[a]) - (x[a] - xs) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def minmax_indices(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Índices del mínimo y máximo de cada bucket (conserva picos)"""
+    n = len(y)
+    if n_buckets * 2 >= n:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    selected = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        bucket = y[start:end]
+        selected.append(start + int(np.argmin(bucket)))
+        selected.append(start + int(np.argmax(bucket)))
+    return np.unique(selected)
+
+
+def _numeric_x(x: np.ndarray) -> Tuple[np.ndarray, str]:
+    """Convierte x a float para el cálculo; retorna también el tipo de eje"""
+    if np.issubdtype(x.dtype, np.number):
+        return x.astype(np.float64), "number"
+    converted = pd.to_datetime(pd.Series(x), errors="coerce")
+    if len(converted) and converted.notna().all():
+        return converted.astype("int64").to_numpy(dtype=np.float64), "date"
+    # Ejes categóricos: posición de cada punto
+    return np.arange(len(x), dtype=np.float64), "category"
+
+
+def _to_json_list(values: np.ndarray) -> list:
+    """Array a lista JSON (fechas como ISO en lugar de enteros)"""
+    if np.issubdtype(values.dtype, np.datetime64):
+        return np.datetime_as_string(values).tolist()
+    return values.tolist()
+
+
+def downsample_indices(x: np.ndarray, y: np.ndarray, n_out: int, method: str = "lttb") -> np.ndarray:
+    """Índices a conservar de una serie (ignora puntos con y no numérico)"""
+    y = pd.to_numeric(pd.Series(y), errors="coerce").to_numpy(dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= n_out:
+        return valid
+
+    x_num, _ = _numeric_x(np.asarray(x)[valid])
+    if method == "minmax":
+        selected = minmax_indices(y[valid], max(n_out // 2, 1))
+    else:
+        selected = lttb_indices(x_num, y[valid], n_out)
+    return valid[selected]
+
+
+class SeriesDownsampler:
+    """
+    Registro de series completas y reducción por ancho de gráfico
+
+    Args:
+        max_series: Número máximo de figuras retenidas en el proceso (LRU)
+        directory: Directorio de la caché compartida (APG_SERIES_DIR)
+        expire: Segundos de vida de una serie sin uso (APG_SERIES_TTL); mayor
+                que el TTL de la caché de figuras para que sus aciertos
+                conserven el zoom
+        gl_threshold: Puntos originales a partir de los cuales se usa Scattergl
+        points_per_pixel: Puntos conservados por píxel de ancho
+        default_width: Ancho asumido (px) si el gráfico no lo define
+    """
+
+    def __init__(self, max_series: int = 64, directory: Optional[str] = None,
+                 expire: Optional[int] = None, gl_threshold: int = 5000,
+                 points_per_pixel: float = 1.0, default_width: int = 1200):
+        self.max_series = max_series
+        self.directory = directory or os.environ.get("APG_SERIES_DIR", os.path.join("data", "series"))
+        self.expire = expire or int(os.environ.get("APG_SERIES_TTL", "3600"))
+        self.gl_threshold = gl_threshold
+        self.points_per_pixel = points_per_pixel
+        self.default_width = default_width
+        self._series: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._registered = set()
+        self._cache = None
+
+    @property
+    def cache(self) -> diskcache.Cache:
+        if self._cache is None:
+            self._cache = diskcache.Cache(
+                self.directory,
+                size_limit=int(os.environ.get("APG_SERIES_SIZE_MB", "256")) * 1024 * 1024,
+                eviction_policy="least-recently-used",
+            )
+        return self._cache
+
+    def target_points(self, width: Optional[int] = None) -> int:
+        """Puntos por traza según el ancho del gráfico"""
+        return max(int((width or self.default_width) * self.points_per_pixel), 100)
+
+    # ------------------------------------------------------------------
+    # Registro de series completas
+    # ------------------------------------------------------------------
+    def _store(self, traces: List[Dict[str, Any]], method: str, width: Optional[int]) -> str:
+        digest = hashlib.md5()
+        for trace in traces:
+            digest.update(str(trace["index"]).encode())
+            digest.update(np.ascontiguousarray(trace["x_num"]).tobytes())
+            digest.update(pd.util.hash_array(np.asarray(trace["y"], dtype=object)).tobytes())
+        key = digest.hexdigest()
+
+        entry = {"traces": traces, "method": method, "width": width}
+        # Renueva la vigencia si otro worker ya la guardó
+        if not self.cache.touch(key, expire=self.expire):
+            self.cache.set(key, entry, expire=self.expire)
+        self._store_local(key, entry)
+        return key
+
+    def _store_local(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._series[key] = entry
+            self._series.move_to_end(key)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+
+    def get_series(self, key: str) -> Optional[Dict[str, Any]]:
+        """Obtiene las series completas registradas (de este proceso o de la caché compartida)"""
+        with self._lock:
+            entry = self._series.get(key)
+            if entry is not None:
+                self._series.move_to_end(key)
+                return entry
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            self._store_local(key, entry)
+        return entry
+
+    # ------------------------------------------------------------------
+    # Figuras
+    # ------------------------------------------------------------------
+    def downsample_figure(self, fig: go.Figure, width: Optional[int] = None,
+                          method: str = "lttb") -> go.Figure:
+        """
+        Reduce las trazas scatter largas de una figura
+
+        Args:
+            fig: Figura Plotly
+            width: Ancho del gráfico en píxeles
+            method: "lttb" o "minmax"
+
+        Returns:
+            Figura con trazas reducidas (Scattergl si son largas) y la clave
+            de la serie completa en layout.meta.series_key
+        """
+        if fig is None:
+            return fig
+
+        n_out = self.target_points(width)
+        stored, new_data, changed = [], [], False
+        for index, trace in enumerate(fig.data):
+            if trace.type not in ("scatter", "scattergl") or trace.x is None or trace.y is None:
+                new_data.append(trace)
+                continue
+
+            x, y = np.asarray(trace.x), np.asarray(trace.y)
+            if len(x) <= n_out:
+                new_data.append(trace)
+                continue
+
+            x_num, axis_type = _numeric_x(x)
+            points = {prop: np.asarray(trace[prop]) for prop in POINT_PROPS
+                      if trace[prop] is not None and np.ndim(trace[prop]) > 0 and len(trace[prop]) == len(x)}
+            stored.append({"index": index, "x": x, "x_num": x_num, "axis": axis_type, "y": y, "points": points})
+
+            keep = downsample_indices(x, y, n_out, method)
+            props = trace.to_plotly_json()
+            props.pop("type", None)
+            props.update({"x": x[keep], "y": y[keep]})
+            props.update({prop: values[keep] for prop, values in points.items()})
+            use_gl = trace.type == "scattergl" or len(x) > self.gl_threshold
+            new_data.append(self._as_gl(props) if use_gl else go.Scatter(**props))
+            changed = True
+
+        if not changed:
+            return fig
+
+        downsampled = go.Figure(data=new_data, layout=fig.layout)
+        key = self._store(stored, method, width)
+        meta = downsampled.layout.meta if isinstance(downsampled.layout.meta, dict) else {}
+        downsampled.update_layout(meta={**meta, "series_key": key})
+        return downsampled
+
+    @staticmethod
+    def _as_gl(props: Dict[str, Any]):
+        """Convierte propiedades de Scatter a Scattergl (si son compatibles)"""
+        try:
+            return go.Scattergl(**props)
+        except ValueError:
+            return go.Scatter(**props)
+
+    def window_patch(self, key: str, x_range: Optional[List[Any]] = None,
+                     width: Optional[int] = None) -> Optional[Patch]:
+        """
+        Patch con la resolución completa (reducida al ancho) del rango visible
+
+        Args:
+            key: Clave de layout.meta.series_key
+            x_range: [x0, x1] visibles; None para toda la serie
+            width: Ancho del gráfico en píxeles
+        """
+        entry = self.get_series(key)
+        if entry is None:
+            return None
+
+        n_out = self.target_points(width or entry["width"])
+        patched = Patch()
+        for trace in entry["traces"]:
+            x_num = trace["x_num"]
+            if x_range is not None:
+                lower, upper = self._range_bounds(x_range, trace["axis"])
+                visible = np.flatnonzero((x_num >= lower) & (x_num <= upper))
+            else:
+                visible = np.arange(len(x_num))
+
+            keep = visible[downsample_indices(trace["x"][visible], trace["y"][visible], n_out, entry["method"])]
+            patched["data"][trace["index"]]["x"] = _to_json_list(trace["x"][keep])
+            patched["data"][trace["index"]]["y"] = _to_json_list(trace["y"][keep])
+            for prop, values in trace["points"].items():
+                patched["data"][trace["index"]][prop] = _to_json_list(values[keep])
+        return patched
+
+    @staticmethod
+    def _range_bounds(x_range: List[Any], axis_type: str) -> Tuple[float, float]:
+        """Convierte el rango del relayout a la escala numérica interna"""
+        if axis_type == "date":
+            values = pd.to_datetime(pd.Series(x_range), errors="coerce").astype("int64")
+            return float(values.iloc[0]), float(values.iloc[1])
+        return float(x_range[0]), float(x_range[1])
+
+    @staticmethod
+    def _parse_relayout(relayout_data: Dict[str, Any]) -> Tuple[bool, Optional[List[Any]]]:
+        """Extrae el rango x de relayoutData; (False, None) si no aplica"""
+        if "xaxis.range[0]" in relayout_data and "xaxis.range[1]" in relayout_data:
+            return True, [relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]]
+        if "xaxis.range" in relayout_data:
+            return True, list(relayout_data["xaxis.range"])
+        if relayout_data.get("xaxis.autorange"):
+            return True, None
+        return False, None
+
+    def register_relayout_callback(self, graph_id: str, width: Optional[int] = None):
+        """Registra el callback que re-muestrea el rango visible al hacer zoom"""
+        if graph_id in self._registered:
+            return
+        self._registered.add(graph_id)
+
+        @callback(
+            Output(graph_id, "figure", allow_duplicate=True),
+            Input(graph_id, "relayoutData"),
+            State(graph_id, "figure"),
+            prevent_initial_call=True
+        )
+        def resample_visible_range(relayout_data, figure):
+            if not relayout_data or not figure:
+                return no_update
+            meta = (figure.get("layout") or {}).get("meta") or {}
+            key = meta.get("series_key") if isinstance(meta, dict) else None
+            applies, x_range = self._parse_relayout(relayout_data)
+            if not key or not applies:
+                return no_update
+            try:
+                patched = self.window_patch(key, x_range, width)
+                return patched if patched is not None else no_update
+            except Exception as e:
+                print(f"❌ Error re-muestreando {graph_id}: {e}")
+                return no_update
+
+
+# Instancia global del downsampler
+series_downsampler = SeriesDownsampler()
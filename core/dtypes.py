@@ -0,0 +1,84 @@
+"""
+Dtypes - Modo opcional de carga con tipos respaldados por Arrow
+Centraliza la lectura de datasets (parquet/excel) y la conversión a NumPy
+en los bordes que todavía lo requieren (plotly, AgGrid, dcc.Store)
+"""
+import os
+import pandas as pd
+import pyarrow as pa
+from typing import Any, Dict, List
+
+# Activar con la variable de entorno APG_ARROW_DTYPES=1
+_ARROW_MODE = {"enabled": os.environ.get("APG_ARROW_DTYPES", "0").lower() in ("1", "true", "yes")}
+
+
+def arrow_mode_enabled() -> bool:
+    """Indica si el modo de tipos Arrow está activo"""
+    return _ARROW_MODE["enabled"]
+
+
+def set_arrow_mode(enabled: bool):
+    """Activa o desactiva el modo de tipos Arrow de forma global"""
+    _ARROW_MODE["enabled"] = bool(enabled)
+    print(f"⚙️ Modo Arrow {'activado' if enabled else 'desactivado'}")
+
+
+def _backend_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Agrega dtype_backend='pyarrow' si el modo está activo"""
+    if arrow_mode_enabled():
+        kwargs.setdefault("dtype_backend", "pyarrow")
+    return kwargs
+
+
+def read_parquet(path, **kwargs) -> pd.DataFrame:
+    """pd.read_parquet respetando el modo de tipos Arrow"""
+    return pd.read_parquet(path, **_backend_kwargs(kwargs))
+
+
+def read_excel(path, **kwargs) -> pd.DataFrame:
+    """pd.read_excel respetando el modo de tipos Arrow"""
+    return pd.read_excel(path, **_backend_kwargs(kwargs))
+
+
+def is_arrow_column(series: pd.Series) -> bool:
+    """Indica si una columna usa un dtype respaldado por Arrow"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.ArrowDtype):
+        return True
+    return isinstance(dtype, pd.StringDtype) and dtype.storage in ("pyarrow", "pyarrow_numpy")
+
+
+def to_numpy_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convierte las columnas Arrow a dtypes NumPy clásicos
+
+    Args:
+        df: DataFrame con columnas ArrowDtype o string[pyarrow]
+
+    Returns:
+        DataFrame con columnas NumPy (object, float64, datetime64)
+    """
+    if df is None or df.empty:
+        return df
+
+    arrow_columns = [col for col in df.columns if is_arrow_column(df[col])]
+    if not arrow_columns:
+        return df
+
+    # pyarrow resuelve nulos (int -> float, string -> None) y timestamps; sin
+    # los metadatos de pandas, to_pandas no reconstruye los dtypes Arrow
+    table = pa.Table.from_pandas(df[arrow_columns], preserve_index=False).replace_schema_metadata()
+    converted = table.to_pandas()
+    converted.index = df.index
+
+    result = df.copy(deep=False)
+    for col in arrow_columns:
+        result[col] = converted[col]
+    return result
+
+
+def to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """to_dict('records') seguro para JSON (dcc.Store, AgGrid)"""
+    if df is None or df.empty:
+        return []
+    return to_numpy_frame(df).to_dict('records')
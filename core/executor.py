@@ -0,0 +1,162 @@
+"""
+Executor - Pool de procesos compartido para transformaciones pesadas
+Las transformaciones pandas están limitadas por el GIL, por lo que
+asyncio.to_thread las ejecuta en serie; aquí se envían a procesos
+y los DataFrames regresan serializados como Arrow IPC
+"""
+import os
+import asyncio
+import atexit
+import pickle
+import threading
+import multiprocessing
+import pandas as pd
+import pyarrow as pa
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Iterable, List, Optional
+
+from core.dtypes import arrow_mode_enabled
+
+
+def _serialize_result(result: Any):
+    """Serializa DataFrames a Arrow IPC; otros objetos se devuelven tal cual"""
+    if isinstance(result, pd.DataFrame):
+        try:
+            table = pa.Table.from_pandas(result)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return ("arrow", sink.getvalue())
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # Columnas con tipos mixtos: pickle estándar
+            pass
+    return ("raw", result)
+
+
+def _deserialize_result(payload) -> Any:
+    """Reconstruye el resultado recibido desde el proceso hijo"""
+    kind, value = payload
+    if kind != "arrow":
+        return value
+    table = pa.ipc.open_stream(value).read_all()
+    if arrow_mode_enabled():
+        # Sin copia: las columnas quedan respaldadas por los buffers Arrow
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return table.to_pandas()
+
+
+def _run_in_worker(func: Callable, args: tuple, kwargs: dict):
+    """Punto de entrada en el proceso hijo"""
+    return _serialize_result(func(*args, **kwargs))
+
+
+class ProcessExecutorService:
+    """
+    Servicio de ejecución en procesos con tamaño acotado y fallback a hilos
+
+    Args:
+        max_workers: Número máximo de procesos (APG_PROCESS_WORKERS)
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        env_workers = os.environ.get("APG_PROCESS_WORKERS")
+        self.max_workers = max_workers or (int(env_workers) if env_workers else min(4, os.cpu_count() or 1))
+        self.enabled = self.max_workers > 1 and os.environ.get("APG_PROCESS_POOL", "1") != "0"
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Crea el pool de forma perezosa"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # fork evita re-ejecutar app.py en cada hijo (spawn lo importaría como __main__)
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                print(f"⚙️ Pool de procesos iniciado ({self.max_workers} workers)")
+            return self._executor
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Ejecuta una función CPU-bound en el pool de procesos
+
+        Args:
+            func: Función a nivel de módulo (debe ser serializable)
+            *args, **kwargs: Argumentos de la función
+
+        Returns:
+            Resultado de la función (DataFrames reconstruidos desde Arrow)
+        """
+        executor = self._get_executor()
+        if executor is None:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        try:
+            payload = await loop.run_in_executor(executor, _run_in_worker, func, args, kwargs)
+            return _deserialize_result(payload)
+        except BrokenProcessPool as e:
+            print(f"⚠️ Pool de procesos caído, reintentando en hilo: {e}")
+            self._reset()
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            # Errores de serialización (lambdas, objetos no picklables)
+            if "pickle" not in str(e).lower():
+                raise
+            print(f"⚠️ No se pudo enviar {getattr(func, '__name__', func)} al pool, usando hilo: {e}")
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    def map(self, func: Callable, items: Iterable) -> List[Any]:
+        """
+        Versión síncrona de run() para una lista de entradas
+
+        Para callbacks síncronos, donde no se puede usar asyncio.run dentro
+        del event loop de Dash
+
+        Args:
+            func: Función a nivel de módulo que recibe un elemento
+            items: Elementos a procesar
+
+        Returns:
+            Resultados en el mismo orden que items
+        """
+        items = list(items)
+        executor = self._get_executor()
+        if executor is None or len(items) <= 1:
+            return [func(item) for item in items]
+
+        try:
+            futures = [executor.submit(_run_in_worker, func, (item,), {}) for item in items]
+            return [_deserialize_result(future.result()) for future in futures]
+        except BrokenProcessPool as e:
+            print(f"⚠️ Pool de procesos caído, procesando en serie: {e}")
+            self._reset()
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            if "pickle" not in str(e).lower():
+                raise
+            print(f"⚠️ No se pudo enviar {getattr(func, '__name__', func)} al pool, procesando en serie: {e}")
+        return [func(item) for item in items]
+
+    def _reset(self):
+        """Descarta un pool dañado para recrearlo en la próxima llamada"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def shutdown(self):
+        """Cierra el pool de procesos"""
+        self._reset()
+
+    def _after_fork(self):
+        """En el proceso hijo (p. ej. worker de gunicorn) el pool heredado no es utilizable"""
+        self._executor = None
+        self._lock = threading.Lock()
+
+
+# Instancia global del servicio de ejecución
+process_executor = ProcessExecutorService()
+atexit.register(process_executor.shutdown)
+os.register_at_fork(after_in_child=process_executor._after_fork)
@@ -0,0 +1,175 @@
+"""
+Exports - Descargas de datasets por HTTP en streaming
+Las páginas registran un loader (dataset en caché del servidor) y una
+función de filtros; la ruta /export/<dataset>.<formato> aplica los filtros
+recibidos como parámetros y transmite el archivo por bloques, sin pasar
+por el JSON/base64 de dcc.Download. Si el dataset tiene versión, el
+archivo se guarda en la caché de artefactos y las descargas repetidas se
+sirven desde disco
+"""
+import time
+import tempfile
+from urllib.parse import urlencode
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from flask import Flask, Response, abort, request
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional
+
+from core.artifacts import artifact_store, artifact_key
+
+CSV_CHUNK_ROWS = 20000      # Filas por bloque de CSV
+PARQUET_ROW_GROUP = 50000   # Filas por row group de Parquet
+STREAM_CHUNK = 64 * 1024
+SPOOL_MAX_SIZE = 32 * 1024 * 1024
+EXPORT_TEMPLATE_VERSION = "1"  # Cambiar si cambia el formato de los archivos
+
+MIMETYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def stream_csv(df: pd.DataFrame, sep: str = ";", chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[bytes]:
+    """CSV por bloques de filas (encabezado sólo en el primero)"""
+    if df.empty:
+        yield df.to_csv(sep=sep, index=False).encode("utf-8")
+        return
+    for start in range(0, len(df), chunk_rows):
+        block = df.iloc[start:start + chunk_rows]
+        yield block.to_csv(sep=sep, index=False, header=start == 0).encode("utf-8")
+
+
+def write_parquet(df: pd.DataFrame, output: BinaryIO, row_group: int = PARQUET_ROW_GROUP):
+    """Escribe el DataFrame como Parquet por row groups"""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(output, schema, compression="snappy") as writer:
+        for start in range(0, max(len(df), 1), row_group):
+            block = df.iloc[start:start + row_group]
+            writer.write_table(pa.Table.from_pandas(block, schema=schema, preserve_index=False))
+
+
+def stream_parquet(df: pd.DataFrame, chunk_size: int = STREAM_CHUNK) -> Iterator[bytes]:
+    """
+    Parquet por fragmentos
+
+    El archivo se escribe a un temporal (en disco si supera SPOOL_MAX_SIZE),
+    ya que el pie de página se escribe al final
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as buffer:
+        write_parquet(df, buffer)
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class ExportRegistry:
+    """Registro de datasets exportables por /export"""
+
+    def __init__(self):
+        self._sources: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, name: str, loader: Callable[[], Optional[pd.DataFrame]],
+                 filters: Optional[Callable[[pd.DataFrame, Dict[str, str]], pd.DataFrame]] = None,
+                 filename: Optional[str] = None, sep: str = ";",
+                 version: Optional[Callable[[], Optional[str]]] = None):
+        """
+        Registra un dataset exportable
+
+        Args:
+            name: Nombre del dataset (DATA_SOURCE de la página)
+            loader: Devuelve el DataFrame en caché del servidor (None si no hay datos)
+            filters: Aplica los parámetros de la URL al DataFrame
+            filename: Prefijo del archivo descargado (por defecto name)
+            sep: Separador del CSV
+            version: Devuelve la versión vigente del dataset; con versión los
+                     archivos se guardan en la caché de artefactos
+        """
+        self._sources[name] = {
+            "loader": loader,
+            "filters": filters,
+            "filename": filename or name,
+            "sep": sep,
+            "version": version,
+        }
+
+    def url(self, name: str, fmt: str = "csv", **params) -> str:
+        """URL de descarga con los filtros como parámetros (se omiten vacíos)"""
+        query = urlencode({key: value for key, value in params.items() if value not in (None, "", [])})
+        return f"/export/{name}.{fmt}" + (f"?{query}" if query else "")
+
+    def load(self, name: str, params: Dict[str, str]) -> Optional[pd.DataFrame]:
+        """Dataset filtrado; None si el dataset no existe o no tiene datos"""
+        source = self._sources.get(name)
+        if source is None:
+            return None
+        df = source["loader"]()
+        if df is None:
+            return None
+        if source["filters"] is not None:
+            df = source["filters"](df, params)
+        return df
+
+    def response(self, name: str, fmt: str, params: Dict[str, str]) -> Response:
+        """Respuesta Flask en streaming con el archivo exportado"""
+        if fmt not in MIMETYPES:
+            abort(404)
+        df = self.load(name, params)
+        if df is None:
+            abort(404)
+
+        source = self._sources[name]
+        version = source["version"]() if source["version"] is not None else None
+        if version is not None:
+            key = artifact_key(f"export-{fmt}", version, params, EXPORT_TEMPLATE_VERSION)
+            handle = artifact_store.open_or_build(key, lambda output: self._write(df, fmt, source, output))
+            body = artifact_store.stream(handle)
+        elif fmt == "csv":
+            body = stream_csv(df, sep=source["sep"])
+        else:
+            body = stream_parquet(df)
+
+        filename = f"{source['filename']}_{int(time.time())}.{fmt}"
+        print(f"📤 Exportando '{name}' ({len(df)} filas, {fmt})")
+        return Response(
+            body,
+            mimetype=MIMETYPES[fmt],
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "Cache-Control": "no-store",
+            },
+        )
+
+    @staticmethod
+    def _write(df: pd.DataFrame, fmt: str, source: Dict[str, Any], output: BinaryIO):
+        """Escribe el archivo completo (para la caché de artefactos)"""
+        if fmt == "csv":
+            for chunk in stream_csv(df, sep=source["sep"]):
+                output.write(chunk)
+        else:
+            write_parquet(df, output)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Datasets registrados"""
+        return {"sources": list(self._sources)}
+
+
+# Instancia global de exportaciones
+export_registry = ExportRegistry()
+
+
+def init_exports(server: Flask):
+    """
+    Registra /export/<dataset>.<formato> (csv o parquet)
+
+    Args:
+        server: Servidor Flask (app.server)
+    """
+    @server.route('/export/<name>.<fmt>', methods=['GET'])
+    def export_dataset(name, fmt):
+        return export_registry.response(name, fmt, request.args.to_dict())
+
+    return server
@@ -0,0 +1,237 @@
+"""
+FigureCache - Caché de figuras Plotly serializadas (JSON)
+La clave es (callback, versión del dataset, entradas normalizadas) y se
+comparte entre sesiones vía Redis (CacheManager), con respaldo en memoria
+"""
+import time
+import json
+import hashlib
+import threading
+import pandas as pd
+import plotly.graph_objects as go
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+from plotly.io.json import to_json_plotly
+
+from core.cache_manager import get_cache_manager
+
+# Clave con la que los stores transportan la versión/vista de los datos
+VERSION_KEY = "__version__"
+VIEW_KEY = "__view__"
+
+
+def frames_version(*frames: pd.DataFrame) -> str:
+    """Versión de contenido de uno o más DataFrames (cambia sólo si cambian los datos)"""
+    digest = hashlib.md5()
+    for df in frames:
+        if df is None:
+            continue
+        try:
+            content = pd.util.hash_pandas_object(df, index=False).sum()
+        except TypeError:
+            content = pd.util.hash_pandas_object(df.astype(str), index=False).sum()
+        digest.update(f"{len(df)}|{int(content)}|{'|'.join(map(str, df.columns))}".encode())
+    return digest.hexdigest()[:16]
+
+
+def build_view(raw_data: Dict[str, Any], year: Any, month: Any) -> Optional[Dict[str, Any]]:
+    """Descriptor de vista (versión + filtros) para un store filtrado"""
+    version = (raw_data or {}).get(VERSION_KEY)
+    if not version:
+        return None
+    months = month if isinstance(month, list) else ([month] if month else [])
+    return {**version, "year": str(year) if year else None, "month": sorted(str(m) for m in months)}
+
+
+class FigureCache:
+    """
+    Caché de figuras con Redis compartido y LRU local de respaldo
+
+    Args:
+        ttl: Tiempo de vida en segundos
+        max_local: Número máximo de figuras en memoria local
+        retry_interval: Segundos antes de reintentar la conexión a Redis
+    """
+
+    def __init__(self, ttl: int = 1800, max_local: int = 256, retry_interval: int = 60):
+        self.ttl = ttl
+        self.max_local = max_local
+        self.retry_interval = retry_interval
+        self._local: "OrderedDict[str, str]" = OrderedDict()
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_failed_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _get_redis(self):
+        """CacheManager si Redis está disponible (reintenta cada retry_interval)"""
+        if self._redis is not None:
+            return self._redis
+        if time.time() - self._redis_failed_at < self.retry_interval:
+            return None
+        try:
+            self._redis = get_cache_manager()
+        except Exception as e:
+            self._redis_failed_at = time.time()
+            print(f"⚠️ Redis no disponible para caché de figuras, usando memoria local: {e}")
+        return self._redis
+
+    # ------------------------------------------------------------------
+    # Versiones de datasets
+    # ------------------------------------------------------------------
+    def set_dataset_version(self, dataset: str, version: str):
+        """Registra la versión vigente de un dataset e invalida figuras anteriores"""
+        previous = self.get_dataset_version(dataset)
+        self._versions[dataset] = version
+        redis_cache = self._get_redis()
+        if redis_cache is not None:
+            redis_cache.set(f"dataset_version:{dataset}", version, ttl=86400, prefix='data')
+        if previous and previous != version:
+            self.invalidate(dataset)
+            print(f"🔄 Dataset '{dataset}' actualizado ({previous} -> {version}), figuras invalidadas")
+
+    def get_dataset_version(self, dataset: str) -> Optional[str]:
+        """Versión vigente de un dataset (local o compartida)"""
+        redis_cache = self._get_redis()
+        if redis_cache is not None:
+            version = redis_cache.get(f"dataset_version:{dataset}", prefix='data')
+            if version:
+                self._versions[dataset] = version
+                return version
+        return self._versions.get(dataset)
+
+    # ------------------------------------------------------------------
+    # Almacenamiento
+    # ------------------------------------------------------------------
+    def get(self, key: str) -> Optional[str]:
+        """Obtiene el JSON de una figura"""
+        with self._lock:
+            if key in self._local:
+                self._local.move_to_end(key)
+                return self._local[key]
+        redis_cache = self._get_redis()
+        if redis_cache is not None:
+            value = redis_cache.get(key, prefix='dashboard')
+            if value is not None:
+                self._store_local(key, value)
+                return value
+        return None
+
+    def set(self, key: str, value: str):
+        """Guarda el JSON de una figura"""
+        self._store_local(key, value)
+        redis_cache = self._get_redis()
+        if redis_cache is not None:
+            redis_cache.set(key, value, ttl=self.ttl, prefix='dashboard')
+
+    def _store_local(self, key: str, value: str):
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local:
+                self._local.popitem(last=False)
+
+    def invalidate(self, dataset: str = None):
+        """Elimina las figuras de un dataset (o todas)"""
+        prefix = f"figure:{dataset}:" if dataset else "figure:"
+        with self._lock:
+            for key in [k for k in self._local if k.startswith(prefix)]:
+                del self._local[key]
+        redis_cache = self._get_redis()
+        if redis_cache is not None:
+            redis_cache.invalidate_pattern(f"{prefix}*", prefix='dashboard')
+
+    # ------------------------------------------------------------------
+    # Claves
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _normalize(value: Any) -> Any:
+        """Normaliza una entrada para la clave (datos grandes se reducen a hash)"""
+        # DataFrames primero: compararlos con "" es ambiguo
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            frame = value.to_frame() if isinstance(value, pd.Series) else value
+            return {"frame": frames_version(frame)}
+        if value is None or (isinstance(value, str) and value == "") or (isinstance(value, (list, tuple, dict)) and len(value) == 0):
+            return None
+        if isinstance(value, dict):
+            if VIEW_KEY in value:
+                return {"view": value[VIEW_KEY]}
+            return {str(k): FigureCache._normalize(v) for k, v in sorted(value.items(), key=lambda i: str(i[0]))}
+        if isinstance(value, (list, tuple)):
+            if len(value) > 50:
+                payload = json.dumps(value, sort_keys=True, default=str)
+                return {"list": hashlib.md5(payload.encode()).hexdigest()}
+            return [FigureCache._normalize(v) for v in value]
+        if isinstance(value, (str, int, float, bool)):
+            return value
+        return str(value)
+
+    def make_key(self, name: str, dataset: Optional[str], args: tuple, kwargs: dict) -> str:
+        """Clave (callback, versión del dataset, entradas normalizadas)"""
+        normalized = [self._normalize(arg) for arg in args]
+        normalized.append(self._normalize(kwargs))
+        version = self.get_dataset_version(dataset) if dataset else None
+        payload = json.dumps([name, version, normalized], sort_keys=True, default=str)
+        # Las vistas traen su propio dataset; se usa para invalidar por dataset
+        for arg in list(args) + list(kwargs.values()):
+            if isinstance(arg, dict) and isinstance(arg.get(VIEW_KEY), dict):
+                dataset = dataset or arg[VIEW_KEY].get("dataset")
+                break
+        return f"figure:{dataset or 'global'}:{name}:{hashlib.md5(payload.encode()).hexdigest()}"
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 2) if total else 0.0,
+            "local_entries": len(self._local),
+            "redis": self._redis is not None,
+        }
+
+
+# Instancia global de la caché de figuras
+figure_cache = FigureCache()
+
+
+def cached_figure(name: str, dataset: str = None, as_figure: bool = False):
+    """
+    Decorator que cachea el resultado (figura o tupla con figuras) de una función
+
+    Args:
+        name: Nombre estable del callback/función
+        dataset: Dataset cuya versión forma parte de la clave (opcional si
+                 los datos traen su descriptor __view__)
+        as_figure: Reconstruir go.Figure en los aciertos (si el llamador la modifica)
+    """
+    def decorator(func: Callable):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                key = figure_cache.make_key(name, dataset, args, kwargs)
+                cached = figure_cache.get(key)
+            except Exception as e:
+                print(f"⚠️ Error en caché de figuras ({name}): {e}")
+                return func(*args, **kwargs)
+
+            if cached is not None:
+                figure_cache.hits += 1
+                result = json.loads(cached)
+                if as_figure and isinstance(result, dict):
+                    return go.Figure(result)
+                return result
+
+            figure_cache.misses += 1
+            result = func(*args, **kwargs)
+            try:
+                figure_cache.set(key, to_json_plotly(result))
+            except Exception as e:
+                print(f"⚠️ No se pudo cachear la figura ({name}): {e}")
+            return result
+
+        return wrapper
+    return decorator
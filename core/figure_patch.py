@@ -0,0 +1,62 @@
+"""
+FigurePatch - Actualizaciones parciales de figuras con dash.Patch
+Cuando la estructura de la figura no cambia (mismas trazas), basta con
+reemplazar los arrays x/y y algunos títulos en lugar de reenviar la figura
+"""
+import numpy as np
+import pandas as pd
+from dash import Patch
+from typing import Any, Dict, List, Optional
+
+
+def _to_list(value: Any) -> Any:
+    """Convierte Series/arrays a listas JSON"""
+    if isinstance(value, (pd.Series, pd.Index)):
+        return value.tolist()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+def build_figure_patch(traces: List[Dict[str, Any]], layout: Optional[Dict[str, Any]] = None,
+                       patch: Optional[Patch] = None) -> Patch:
+    """
+    Crea un Patch que reemplaza propiedades de trazas y del layout
+
+    Args:
+        traces: Lista (en orden de fig.data) de {propiedad: valor}, ej. [{"x": [...], "y": [...]}]
+        layout: Rutas con puntos del layout, ej. {"xaxis.title.text": "Mes"}
+        patch: Patch existente a extender
+
+    Returns:
+        dash.Patch listo para retornar en un Output 'figure'
+    """
+    patched = patch if patch is not None else Patch()
+
+    for index, trace in enumerate(traces):
+        for prop, value in trace.items():
+            patched["data"][index][prop] = _to_list(value)
+
+    for path, value in (layout or {}).items():
+        keys = path.split(".")
+        target = patched["layout"]
+        for key in keys[:-1]:
+            target = target[key]
+        target[keys[-1]] = _to_list(value)
+
+    return patched
+
+
+def frame_traces_patch(df: pd.DataFrame, x: str, y_columns: List[str],
+                       layout: Optional[Dict[str, Any]] = None) -> Patch:
+    """
+    Patch para figuras tipo px.bar/px.line con una traza por columna y
+
+    Args:
+        df: DataFrame con los datos nuevos
+        x: Columna del eje x
+        y_columns: Columnas y en el mismo orden que las trazas de la figura
+        layout: Actualizaciones opcionales del layout
+    """
+    traces = [{"x": df[x], "y": df[col]} for col in y_columns]
+    return build_figure_patch(traces, layout)
@@ -0,0 +1,370 @@
+"""
+Forecasting - Servicio de pronósticos con Prophet y statsmodels (ETS)
+Los ajustes corren en el pool de procesos y los resultados se guardan en
+disco con clave = (serie, hash de los datos, horizonte, configuración del
+modelo). Los parámetros ajustados de cada serie se conservan para iniciar
+el siguiente ajuste desde ellos (warm start) cuando sólo se agregaron
+semanas nuevas. Los paneles leen de la caché; el reajuste nocturno usa
+todos los núcleos
+
+    python scripts/manage.py forecast-refit
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import multiprocessing
+import diskcache
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.executor import process_executor
+
+# Configuración por defecto de cada modelo
+MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
+    "prophet": {
+        "yearly_seasonality": "auto",
+        "weekly_seasonality": False,
+        "daily_seasonality": False,
+        "changepoint_prior_scale": 0.05,
+        "interval_width": 0.8,
+    },
+    "ets": {
+        "error": "add",
+        "trend": "add",
+        "damped_trend": True,
+    },
+}
+
+ALGORITHM_NAMES = {"prophet": "Prophet", "ets": "ETS (statsmodels)"}
+MIN_POINTS = {"prophet": 6, "ets": 4}
+
+FORECAST_COLUMNS = ["Año", "Semana", "Paso", "Algoritmo", "Prediction", "Lower", "Upper"]
+
+
+def _config(model: str, config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {**MODEL_CONFIGS[model], **(config or {})}
+
+
+def _digest(*parts: Any) -> str:
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:20]
+
+
+def series_hash(years: np.ndarray, weeks: np.ndarray, values: np.ndarray) -> str:
+    """Hash de los datos de una serie (semanas y valores)"""
+    return _digest(years.astype(np.int64), weeks.astype(np.int64), values.astype(np.float64))
+
+
+def week_dates(years: np.ndarray, weeks: np.ndarray) -> pd.DatetimeIndex:
+    """
+    Lunes de cada semana ISO (año ISO, semana)
+
+    Se cuenta desde el lunes de la semana 1 (la que contiene el 4 de enero),
+    así una semana 53 en un año de 52 semanas cae en la semana 1 siguiente
+    en lugar de fallar como date.fromisocalendar
+    """
+    january_4 = pd.to_datetime(pd.DataFrame({"year": np.asarray(years, dtype=np.int64), "month": 1, "day": 4}))
+    first_monday = january_4 - pd.to_timedelta(january_4.dt.weekday, unit="D")
+    offset = pd.to_timedelta((np.asarray(weeks, dtype=np.int64) - 1) * 7, unit="D")
+    return pd.DatetimeIndex(first_monday + offset)
+
+
+# ----------------------------------------------------------------------
+# Ajuste (se ejecuta en procesos del pool)
+# ----------------------------------------------------------------------
+def _prophet_init(model) -> Dict[str, Any]:
+    """Parámetros ajustados de Prophet en el formato de init para warm start"""
+    params = {name: float(model.params[name][0][0]) for name in ("k", "m", "sigma_obs")}
+    params.update({name: model.params[name][0].tolist() for name in ("delta", "beta")})
+    return params
+
+
+def _fit_prophet(dates, values, horizon, config, init):
+    from prophet import Prophet
+
+    # cmdstanpy registra cada ajuste en INFO
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    history = pd.DataFrame({"ds": dates, "y": values})
+
+    def fit(warm):
+        model = Prophet(**config)
+        return model.fit(history, init=warm) if warm else model.fit(history)
+
+    try:
+        model = fit(init)
+    except Exception as e:
+        if not init:
+            raise
+        # Distinto número de changepoints u otro cambio de forma: ajuste en frío
+        print(f"⚠️ Warm start de Prophet no aplicable, ajustando en frío: {e}")
+        model = fit(None)
+    future = model.make_future_dataframe(periods=horizon, freq="W-MON", include_history=False)
+    predicted = model.predict(future)
+    return (
+        future["ds"],
+        predicted["yhat"].to_numpy(),
+        predicted["yhat_lower"].to_numpy(),
+        predicted["yhat_upper"].to_numpy(),
+        _prophet_init(model),
+    )
+
+
+def _fit_ets(dates, values, horizon, config, init):
+    from statsmodels.tsa.exponential_smoothing.ets import ETSModel
+
+    # Índice entero: semanas faltantes no impiden el ajuste
+    model = ETSModel(pd.Series(values, dtype=float), **config)
+    start_params = np.asarray(init["params"]) if init else None
+    try:
+        fitted = model.fit(start_params=start_params, disp=False)
+    except Exception as e:
+        if start_params is None:
+            raise
+        print(f"⚠️ Warm start de ETS no aplicable, ajustando en frío: {e}")
+        fitted = model.fit(disp=False)
+    summary = fitted.get_prediction(start=len(values), end=len(values) + horizon - 1).summary_frame(alpha=0.2)
+    future = pd.date_range(dates[-1], periods=horizon + 1, freq="W-MON")[1:]
+    return (
+        future,
+        summary["mean"].to_numpy(),
+        summary["pi_lower"].to_numpy(),
+        summary["pi_upper"].to_numpy(),
+        {"params": np.asarray(fitted.params).tolist()},
+    )
+
+
+FITTERS = {"prophet": _fit_prophet, "ets": _fit_ets}
+
+
+def fit_series(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ajusta un modelo a una serie (punto de entrada del pool de procesos)
+
+    Args:
+        task: {model, config, horizon, years, weeks, values, init}
+
+    Returns:
+        {forecast: DataFrame, state: parámetros para warm start, seconds, warm},
+        o {error: mensaje} si la serie no se pudo ajustar
+    """
+    start = time.perf_counter()
+    years, weeks, values = task["years"], task["weeks"], task["values"]
+    try:
+        dates = week_dates(years, weeks)
+        future, mean, lower, upper, state = FITTERS[task["model"]](
+            dates, values, task["horizon"], task["config"], task["init"]
+        )
+    except Exception as e:
+        # Una serie con problemas no debe abortar el lote completo
+        return {"error": f"{type(e).__name__}: {e}"}
+
+    iso = pd.DatetimeIndex(future).isocalendar()
+    forecast = pd.DataFrame({
+        "Año": iso["year"].to_numpy(dtype=int),
+        "Semana": iso["week"].to_numpy(dtype=int),
+        "Paso": np.arange(1, len(mean) + 1),
+        "Algoritmo": ALGORITHM_NAMES[task["model"]],
+        "Prediction": np.maximum(mean, 0),  # Kilos no negativos
+        "Lower": np.maximum(lower, 0),
+        "Upper": np.maximum(upper, 0),
+    })
+    return {
+        "forecast": forecast,
+        "state": state,
+        "seconds": time.perf_counter() - start,
+        "warm": task["init"] is not None,
+    }
+
+
+class ForecastService:
+    """
+    Pronósticos con caché de resultados y parámetros ajustados
+
+    Args:
+        directory: Directorio de la caché (APG_FORECAST_DIR)
+        size_limit: Tamaño máximo de la caché en bytes
+    """
+
+    def __init__(self, directory: Optional[str] = None, size_limit: int = 256 * 1024 * 1024):
+        self.directory = directory or os.environ.get("APG_FORECAST_DIR", os.path.join("data", "forecasts"))
+        self.size_limit = size_limit
+        self._cache = None
+        self.stats = {"hits": 0, "fits": 0, "warm_fits": 0, "fit_seconds": 0.0, "errors": 0}
+
+    @property
+    def cache(self) -> diskcache.Cache:
+        if self._cache is None:
+            self._cache = diskcache.Cache(self.directory, size_limit=self.size_limit)
+        return self._cache
+
+    # ------------------------------------------------------------------
+    # Claves
+    # ------------------------------------------------------------------
+    @staticmethod
+    def forecast_key(series_id: Any, data_hash: str, horizon: int, model: str, config: Dict[str, Any]) -> str:
+        """Clave (serie, hash de datos, horizonte, configuración del modelo)"""
+        return f"forecast:{model}:{_digest(series_id, data_hash, horizon, config)}"
+
+    @staticmethod
+    def state_key(series_id: Any, model: str, config: Dict[str, Any]) -> str:
+        """Clave de los últimos parámetros ajustados de una serie"""
+        return f"state:{model}:{_digest(series_id, config)}"
+
+    # ------------------------------------------------------------------
+    # Series
+    # ------------------------------------------------------------------
+    @staticmethod
+    def split_series(long_df: pd.DataFrame, id_columns: List[str]) -> List[Tuple[Tuple, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Separa un frame largo (ver prediction_models.kg_series_long) en series
+
+        Returns:
+            [(id, años, semanas, valores)] ordenados por semana
+        """
+        df = long_df[id_columns + ["Año", "Semana", "Valor"]].copy()
+        for column in ("Año", "Semana", "Valor"):
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+        df = df.dropna(subset=["Año", "Semana", "Valor"]).sort_values(id_columns + ["Año", "Semana"], kind="stable")
+
+        series = []
+        for series_id, group in df.groupby(id_columns, sort=False, observed=True, dropna=False):
+            series_id = series_id if isinstance(series_id, tuple) else (series_id,)
+            series.append((
+                series_id,
+                group["Año"].to_numpy(dtype=np.int64),
+                group["Semana"].to_numpy(dtype=np.int64),
+                group["Valor"].to_numpy(dtype=np.float64),
+            ))
+        return series
+
+    def _task(self, series_id, years, weeks, values, horizon, model, config) -> Tuple[str, Dict[str, Any]]:
+        """Clave del resultado y tarea de ajuste (con warm start si la serie sólo creció)"""
+        key = self.forecast_key(series_id, series_hash(years, weeks, values), horizon, model, config)
+
+        init = None
+        state = self.cache.get(self.state_key(series_id, model, config))
+        if state is not None and state["length"] <= len(values):
+            length = state["length"]
+            if series_hash(years[:length], weeks[:length], values[:length]) == state["data_hash"]:
+                init = state["params"]
+
+        return key, {
+            "series_id": series_id,
+            "model": model,
+            "config": config,
+            "horizon": horizon,
+            "years": years,
+            "weeks": weeks,
+            "values": values,
+            "init": init,
+        }
+
+    def _store(self, key: str, task: Dict[str, Any], result: Dict[str, Any]):
+        self.cache.set(key, result["forecast"])
+        self.cache.set(self.state_key(task["series_id"], task["model"], task["config"]), {
+            "length": len(task["values"]),
+            "data_hash": series_hash(task["years"], task["weeks"], task["values"]),
+            "params": result["state"],
+            "fitted_at": time.time(),
+        })
+        self.stats["fits"] += 1
+        self.stats["warm_fits"] += int(result["warm"])
+        self.stats["fit_seconds"] += result["seconds"]
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def forecast_frame(self, long_df: pd.DataFrame, id_columns: List[str], horizon: int = 3,
+                       model: str = "prophet", config: Optional[Dict[str, Any]] = None,
+                       cached_only: bool = False, executor: Optional[ProcessPoolExecutor] = None) -> pd.DataFrame:
+        """
+        Pronósticos de todas las series de un frame largo
+
+        Args:
+            long_df: Frame largo con id_columns, 'Año', 'Semana' y 'Valor'
+            id_columns: Columnas que identifican cada serie
+            horizon: Semanas a pronosticar
+            model: "prophet" o "ets"
+            config: Cambios sobre MODEL_CONFIGS[model]
+            cached_only: Sólo resultados en caché (paneles); las series sin
+                         ajuste vigente se omiten
+            executor: Pool propio (reajuste nocturno); por defecto process_executor
+
+        Returns:
+            Frame ordenado: id_columns + FORECAST_COLUMNS
+        """
+        config = _config(model, config)
+        frames, pending = [], []
+
+        for series_id, years, weeks, values in self.split_series(long_df, id_columns):
+            if len(values) < MIN_POINTS[model]:
+                continue
+            key, task = self._task(series_id, years, weeks, values, horizon, model, config)
+            forecast = self.cache.get(key)
+            if forecast is not None:
+                self.stats["hits"] += 1
+                frames.append((series_id, forecast))
+            elif not cached_only:
+                pending.append((key, task))
+
+        if pending:
+            print(f"🔮 Ajustando {len(pending)} series ({model})...")
+            tasks = [task for _, task in pending]
+            if executor is not None:
+                results = list(executor.map(fit_series, tasks))
+            else:
+                results = process_executor.map(fit_series, tasks)
+            for (key, task), result in zip(pending, results):
+                if "error" in result:
+                    self.stats["errors"] += 1
+                    print(f"⚠️ Serie {task['series_id']} omitida ({model}): {result['error']}")
+                    continue
+                self._store(key, task, result)
+                frames.append((task["series_id"], result["forecast"]))
+
+        if not frames:
+            return pd.DataFrame(columns=id_columns + FORECAST_COLUMNS)
+        return pd.concat(
+            [forecast.assign(**dict(zip(id_columns, series_id))) for series_id, forecast in frames],
+            ignore_index=True,
+        )[id_columns + FORECAST_COLUMNS]
+
+    def refit_all(self, long_df: pd.DataFrame, id_columns: List[str], horizon: int = 3,
+                  models: Tuple[str, ...] = ("prophet", "ets"), workers: Optional[int] = None) -> Dict[str, int]:
+        """
+        Reajuste completo (nocturno) usando todos los núcleos
+
+        Returns:
+            Número de pronósticos por modelo
+        """
+        workers = workers or os.cpu_count() or 1
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        start = time.perf_counter()
+        counts = {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            for model in models:
+                counts[model] = len(self.forecast_frame(long_df, id_columns, horizon, model, executor=executor))
+        print(f"✅ Reajuste de pronósticos en {time.perf_counter() - start:.1f}s ({workers} procesos): {counts}")
+        return counts
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de ajustes y caché"""
+        return {
+            **self.stats,
+            "entries": len(self.cache),
+            "size_bytes": self.cache.volume(),
+        }
+
+
+# Instancia global del servicio de pronósticos
+forecast_service = ForecastService()
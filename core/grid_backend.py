@@ -0,0 +1,292 @@
+"""
+GridBackend - Modelo de filas en servidor (infinite row model) para dash_ag_grid
+El DataFrame queda en el servidor; la grilla pide bloques de filas ya
+ordenadas/filtradas y sólo recibe las columnas visibles. Los DataFrames se
+guardan como Arrow en una caché de disco compartida (APG_GRID_DIR) con
+clave = hash del contenido, así cualquier worker puede responder los
+bloques de una grilla registrada por otro
+"""
+import os
+import hashlib
+import threading
+import diskcache
+import pandas as pd
+import pyarrow as pa
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from dash import html, dcc, callback, Input, Output, State, no_update
+from dash_ag_grid import AgGrid
+
+from core.dtypes import to_numpy_frame
+from core.dataset_store import SharedDatasetStore
+
+
+class InfiniteGridBackend:
+    """
+    Registro compartido de DataFrames servidos por bloques a grillas AgGrid
+
+    Args:
+        directory: Directorio de la caché compartida (APG_GRID_DIR)
+        size_limit: Tamaño máximo en bytes (APG_GRID_SIZE_MB)
+        expire: Segundos de vida de un DataFrame sin uso (APG_GRID_TTL)
+        max_local: DataFrames abiertos que se retienen en el proceso (LRU)
+        block_size: Tamaño de bloque solicitado por la grilla
+    """
+
+    def __init__(self, directory: Optional[str] = None, size_limit: Optional[int] = None,
+                 expire: Optional[int] = None, max_local: int = 8, block_size: int = 100):
+        self.directory = directory or os.environ.get("APG_GRID_DIR", os.path.join("data", "grids"))
+        self.size_limit = size_limit or int(os.environ.get("APG_GRID_SIZE_MB", "512")) * 1024 * 1024
+        self.expire = expire or int(os.environ.get("APG_GRID_TTL", "3600"))
+        self.max_local = max_local
+        self.block_size = block_size
+        self._cache = None
+        self._frames: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._registered = set()
+
+    @property
+    def cache(self) -> diskcache.Cache:
+        if self._cache is None:
+            self._cache = diskcache.Cache(
+                self.directory,
+                size_limit=self.size_limit,
+                eviction_policy="least-recently-used",
+            )
+        return self._cache
+
+    # ------------------------------------------------------------------
+    # Registro de DataFrames
+    # ------------------------------------------------------------------
+    @staticmethod
+    def frame_key(df: pd.DataFrame, columns: List[str]) -> str:
+        """Clave de un DataFrame (hash del contenido de las columnas expuestas)"""
+        try:
+            content_hash = pd.util.hash_pandas_object(df[columns], index=False).sum()
+        except TypeError:
+            content_hash = pd.util.hash_pandas_object(df[columns].astype(str), index=False).sum()
+        return hashlib.md5(f"{len(df)}|{int(content_hash)}|{'|'.join(map(str, columns))}".encode()).hexdigest()
+
+    def _store_local(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._frames[key] = entry
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_local:
+                self._frames.popitem(last=False)
+
+    def register_frame(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> str:
+        """
+        Guarda un DataFrame en la caché compartida y retorna su clave
+
+        Args:
+            df: DataFrame a servir
+            columns: Columnas expuestas a la grilla (por defecto todas)
+        """
+        columns = [col for col in (columns or list(df.columns)) if col in df.columns]
+        key = self.frame_key(df, columns)
+        frame = df[columns].reset_index(drop=True)
+
+        # Renueva la vigencia si ya existe; si no, lo escribe como Arrow IPC
+        if not self.cache.touch(key, expire=self.expire):
+            sink = pa.BufferOutputStream()
+            table = SharedDatasetStore._to_table(frame)
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            self.cache.set(key, {"columns": columns, "arrow": sink.getvalue().to_pybytes()}, expire=self.expire)
+        self._store_local(key, {"df": frame, "columns": columns})
+        return key
+
+    def get_frame(self, key: str) -> Optional[Dict[str, Any]]:
+        """Obtiene un DataFrame registrado (de este proceso o de la caché compartida)"""
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None:
+                self._frames.move_to_end(key)
+                return entry
+
+        stored = self.cache.get(key)
+        if stored is None:
+            return None
+        df = pa.ipc.open_file(pa.py_buffer(stored["arrow"])).read_all().to_pandas()
+        entry = {"df": df, "columns": stored["columns"]}
+        self._store_local(key, entry)
+        return entry
+
+    # ------------------------------------------------------------------
+    # Filtros y orden (modelos de AG Grid)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _condition_mask(series: pd.Series, condition: Dict[str, Any]) -> pd.Series:
+        """Máscara booleana para una condición simple del filterModel"""
+        filter_type = condition.get("filterType", "text")
+        op = condition.get("type", "contains")
+
+        if op == "blank":
+            return series.isna() | (series.astype(str).str.strip() == "")
+        if op == "notBlank":
+            return series.notna() & (series.astype(str).str.strip() != "")
+
+        if filter_type == "set":
+            return series.astype(str).isin([str(v) for v in condition.get("values", [])])
+
+        if filter_type == "number":
+            values = pd.to_numeric(series, errors="coerce")
+            value, value_to = condition.get("filter"), condition.get("filterTo")
+        elif filter_type == "date":
+            values = pd.to_datetime(series, errors="coerce")
+            value = pd.to_datetime(condition.get("dateFrom"), errors="coerce")
+            value_to = pd.to_datetime(condition.get("dateTo"), errors="coerce")
+        else:
+            values = series.astype(str).str.lower()
+            text = str(condition.get("filter", "")).lower()
+            text_ops = {
+                "contains": lambda: values.str.contains(text, regex=False),
+                "notContains": lambda: ~values.str.contains(text, regex=False),
+                "equals": lambda: values == text,
+                "notEqual": lambda: values != text,
+                "startsWith": lambda: values.str.startswith(text),
+                "endsWith": lambda: values.str.endswith(text),
+            }
+            return text_ops.get(op, text_ops["contains"])().fillna(False)
+
+        compare_ops = {
+            "equals": lambda: values == value,
+            "notEqual": lambda: values != value,
+            "lessThan": lambda: values < value,
+            "lessThanOrEqual": lambda: values <= value,
+            "greaterThan": lambda: values > value,
+            "greaterThanOrEqual": lambda: values >= value,
+            "inRange": lambda: (values >= value) & (values <= value_to),
+        }
+        if op not in compare_ops:
+            return pd.Series(True, index=series.index)
+        return compare_ops[op]().fillna(False)
+
+    def apply_filter_model(self, df: pd.DataFrame, filter_model: Dict[str, Any]) -> pd.DataFrame:
+        """Aplica el filterModel de AG Grid sobre el DataFrame"""
+        if not filter_model:
+            return df
+
+        mask = pd.Series(True, index=df.index)
+        for column, model in filter_model.items():
+            if column not in df.columns:
+                continue
+            series = df[column]
+            if "conditions" in model:
+                masks = [self._condition_mask(series, cond) for cond in model["conditions"]]
+            elif "condition1" in model:
+                masks = [self._condition_mask(series, model["condition1"]),
+                         self._condition_mask(series, model["condition2"])]
+            else:
+                masks = [self._condition_mask(series, model)]
+
+            column_mask = masks[0]
+            for other in masks[1:]:
+                column_mask = (column_mask | other) if model.get("operator") == "OR" else (column_mask & other)
+            mask &= column_mask
+        return df[mask]
+
+    @staticmethod
+    def apply_sort_model(df: pd.DataFrame, sort_model: List[Dict[str, str]]) -> pd.DataFrame:
+        """Aplica el sortModel de AG Grid sobre el DataFrame"""
+        sort_model = [s for s in (sort_model or []) if s.get("colId") in df.columns]
+        if not sort_model:
+            return df
+        return df.sort_values(
+            by=[s["colId"] for s in sort_model],
+            ascending=[s.get("sort", "asc") == "asc" for s in sort_model],
+            kind="mergesort",
+        )
+
+    def filtered_frame(self, key: str, filter_model: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """DataFrame registrado con el filterModel de la grilla aplicado (p. ej. para totales)"""
+        entry = self.get_frame(key)
+        if entry is None:
+            return None
+        return self.apply_filter_model(entry["df"], filter_model)
+
+    def get_rows(self, key: str, request: Dict[str, Any],
+                 column_state: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Responde una solicitud getRowsRequest de la grilla
+
+        Returns:
+            {"rowData": [...], "rowCount": total de filas filtradas}
+        """
+        entry = self.get_frame(key)
+        if entry is None:
+            return {"rowData": [], "rowCount": 0}
+
+        df, columns = entry["df"], entry["columns"]
+        if column_state:
+            hidden = {state.get("colId") for state in column_state if state.get("hide")}
+            columns = [col for col in columns if col not in hidden]
+
+        df = self.apply_filter_model(df, request.get("filterModel"))
+        df = self.apply_sort_model(df, request.get("sortModel"))
+
+        start = int(request.get("startRow", 0))
+        end = int(request.get("endRow", start + self.block_size))
+        block = to_numpy_frame(df.iloc[start:end][columns])
+        # NaN/NaT no son JSON válido
+        block = block.astype(object).where(block.notna(), None)
+        return {"rowData": block.to_dict("records"), "rowCount": len(df)}
+
+    # ------------------------------------------------------------------
+    # Componentes y callbacks
+    # ------------------------------------------------------------------
+    def create_grid(self, grid_id: str, df: pd.DataFrame, column_defs: List[Dict[str, Any]],
+                    dashGridOptions: Optional[Dict[str, Any]] = None, **grid_props) -> html.Div:
+        """
+        Crea una AgGrid con rowModelType infinite respaldada por el DataFrame
+
+        Requiere haber llamado register_callback(grid_id) al importar la página
+        """
+        columns = [col["field"] for col in column_defs if "field" in col]
+        key = self.register_frame(df, columns)
+
+        grid_options = {
+            "rowBuffer": 0,
+            "cacheBlockSize": self.block_size,
+            "maxBlocksInCache": 20,
+            "infiniteInitialRowCount": min(len(df), self.block_size),
+        }
+        grid_options.update(dashGridOptions or {})
+        grid_props.setdefault("style", {"height": "500px", "width": "100%"})
+
+        return html.Div([
+            dcc.Store(id=f"{grid_id}-frame-key", data=key),
+            AgGrid(
+                id=grid_id,
+                rowModelType="infinite",
+                columnDefs=column_defs,
+                dashGridOptions=grid_options,
+                **grid_props
+            ),
+        ])
+
+    def register_callback(self, grid_id: str):
+        """Registra el callback que sirve los bloques de filas de una grilla"""
+        if grid_id in self._registered:
+            return
+        self._registered.add(grid_id)
+
+        @callback(
+            Output(grid_id, "getRowsResponse"),
+            Input(grid_id, "getRowsRequest"),
+            State(f"{grid_id}-frame-key", "data"),
+            State(grid_id, "columnState"),
+            prevent_initial_call=True
+        )
+        def serve_rows(request, frame_key, column_state):
+            if not request or not frame_key:
+                return no_update
+            try:
+                return self.get_rows(frame_key, request, column_state)
+            except Exception as e:
+                print(f"❌ Error sirviendo filas de {grid_id}: {e}")
+                return {"rowData": [], "rowCount": 0}
+
+
+# Instancia global del backend de grillas
+grid_backend = InfiniteGridBackend()
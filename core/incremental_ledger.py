@@ -0,0 +1,291 @@
+"""
+IncrementalLedger - Ingesta incremental de libros contables (Mayor Analítico)
+Mantiene el histórico ya transformado particionado por (Año, Mes) y sólo
+re-transforma los periodos cuya firma (filas, checksum, fecha máxima) cambió.
+Las particiones se guardan como archivos Arrow junto a los datasets
+compartidos (APG_DATASET_DIR/_ledger/<clave>): todos los workers y los
+reinicios parten del histórico ya transformado. Si la etiqueta de los
+archivos de origen (cTag de Graph) no cambió, el crudo no se descarga ni se lee
+"""
+import os
+import json
+import shutil
+import hashlib
+import threading
+import pandas as pd
+import pyarrow as pa
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.executor import process_executor
+from core.dataset_store import dataset_store, SharedDatasetStore, _atomic_write
+from helpers.transform.costos import mayor_analitico_opex_agrupado_transform
+
+STATE_FILE = "state.json"
+
+
+def source_tag(files_data: List[Dict[str, Any]], *names: str) -> Optional[str]:
+    """
+    Etiqueta de versión de uno o más archivos del listado de Graph
+
+    Args:
+        files_data: Resultado de listar_archivos_en_carpeta_compartida
+        *names: Nombres de los archivos
+
+    Returns:
+        Etiqueta combinada (None si falta algún archivo o etiqueta)
+    """
+    tags = []
+    for name in names:
+        item = next((f for f in files_data or [] if f.get("name") == name), None)
+        tag = item.get("cTag") or item.get("eTag") if item else None
+        if not tag:
+            return None
+        tags.append(f"{name}:{tag}")
+    return "|".join(tags)
+
+
+class IncrementalLedger:
+    """
+    Almacén persistente de particiones transformadas de un libro que sólo crece
+
+    Args:
+        name: Nombre del libro (para logs)
+        transform: Función a nivel de módulo (raw_df, *contexto) -> df agregado
+        key: Nombre del directorio de particiones
+        date_column: Columna de fecha en el archivo crudo
+        period_columns: Columnas (año, mes) en el resultado transformado
+        directory: Directorio de particiones (por defecto junto a los datasets)
+    """
+
+    def __init__(self, name: str, transform: Callable, key: str, date_column: str = "Fecha",
+                 period_columns: Tuple[str, str] = ("Año", "Mes"), directory: Optional[str] = None):
+        self.name = name
+        self.transform = transform
+        self.date_column = date_column
+        self.period_columns = period_columns
+        self.directory = directory or os.path.join(dataset_store.root, "_ledger", key)
+        self.enabled = os.environ.get("APG_INCREMENTAL_LEDGER", "1") != "0"
+        self._state: Dict[str, Any] = self._empty_state()
+        self._state_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self.last_refresh: Optional[datetime] = None
+
+    # ------------------------------------------------------------------
+    # Estado persistido
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _empty_state() -> Dict[str, Any]:
+        # partitions: {periodo: {"signature": [filas, fecha_max, checksum], "file", "rows"}}
+        return {"source_tag": None, "context": None, "partitions": {}}
+
+    def _state_path(self) -> str:
+        return os.path.join(self.directory, STATE_FILE)
+
+    def _load_state(self) -> Dict[str, Any]:
+        """Lee state.json si otro proceso lo modificó desde la última lectura"""
+        try:
+            mtime = os.path.getmtime(self._state_path())
+        except FileNotFoundError:
+            self._state, self._state_mtime = self._empty_state(), None
+            return self._state
+        if mtime != self._state_mtime:
+            try:
+                with open(self._state_path(), encoding="utf-8") as f:
+                    self._state = json.load(f)
+                self._state_mtime = mtime
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Estado de {self.name} ilegible, reprocesando histórico: {e}")
+                self._state, self._state_mtime = self._empty_state(), None
+        return self._state
+
+    def _save_state(self, state: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        _atomic_write(self._state_path(), json.dumps(state))
+        self._state = state
+        self._state_mtime = os.path.getmtime(self._state_path())
+
+    def _write_partition(self, period: str, df: pd.DataFrame, signature: List[Any]) -> str:
+        """Escribe una partición (nombre por contenido: los lectores nunca ven un archivo a medias)"""
+        digest = hashlib.sha1(json.dumps(signature, default=str).encode()).hexdigest()[:12]
+        filename = f"{period}-{digest}.arrow"
+        path = os.path.join(self.directory, filename)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        table = SharedDatasetStore._to_table(df)
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        return filename
+
+    def _read_partition(self, filename: str) -> pd.DataFrame:
+        source = pa.memory_map(os.path.join(self.directory, filename), "r")
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+    def _remove_orphans(self, state: Dict[str, Any]):
+        """Elimina archivos de particiones que el estado ya no referencia"""
+        referenced = {entry["file"] for entry in state["partitions"].values()}
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".arrow") and filename not in referenced:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass
+
+    # ------------------------------------------------------------------
+    # Firmas
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _frame_checksum(df: pd.DataFrame) -> int:
+        """Checksum estable del contenido de un DataFrame"""
+        if df.empty:
+            return 0
+        try:
+            hashed = pd.util.hash_pandas_object(df, index=False)
+        except TypeError:
+            # Columnas con tipos mixtos: hashear como texto
+            hashed = pd.util.hash_pandas_object(df.astype(str), index=False)
+        return int(hashed.sum())
+
+    def detect_changes(self, raw_df: pd.DataFrame, keys: pd.Series, fechas: pd.Series,
+                       previous: Dict[str, Any]) -> Tuple[List[int], List[str], Dict[str, List[Any]]]:
+        """
+        Compara la firma de cada periodo contra la última ingesta
+
+        Args:
+            raw_df: Archivo crudo
+            keys: Periodo (año * 100 + mes) de cada fila; 0 si no hay fecha
+            fechas: Columna de fecha ya convertida (se parsea una sola vez)
+            previous: Particiones del estado persistido
+
+        Returns:
+            (periodos a re-transformar, periodos que desaparecieron, firmas nuevas)
+        """
+        signatures = {}
+        for key, positions in keys.groupby(keys, sort=True).indices.items():
+            group_fechas = fechas.iloc[positions]
+            max_fecha = group_fechas.max()
+            signatures[str(key)] = [
+                len(positions),
+                None if pd.isna(max_fecha) else max_fecha.isoformat(),
+                self._frame_checksum(raw_df.iloc[positions]),
+            ]
+
+        changed = [int(key) for key, sig in signatures.items()
+                   if previous.get(key, {}).get("signature") != sig]
+        removed = [key for key in previous if key not in signatures]
+        return changed, removed, signatures
+
+    def has_source(self, tag: Optional[str]) -> bool:
+        """Indica si las particiones guardadas corresponden a la etiqueta de origen"""
+        if not self.enabled or not tag:
+            return False
+        with self._lock:
+            return self._load_state().get("source_tag") == tag
+
+    async def refresh(self, raw_df: Optional[pd.DataFrame], *context: pd.DataFrame,
+                      tag: Optional[str] = None) -> pd.DataFrame:
+        """
+        Ingesta el archivo crudo completo procesando sólo los periodos modificados
+
+        Args:
+            raw_df: Archivo crudo del libro (histórico completo); puede ser None
+                    si has_source(tag) indicó que el origen no cambió
+            *context: DataFrames auxiliares de la transformación (ej. agrupador);
+                      si cambian se reprocesa todo
+            tag: Etiqueta de los archivos de origen (ver source_tag)
+
+        Returns:
+            DataFrame transformado del histórico completo
+        """
+        if not self.enabled:
+            return await process_executor.run(self.transform, raw_df, *context)
+
+        with self._lock:
+            state = self._load_state()
+        if tag and state.get("source_tag") == tag:
+            print(f"✅ {self.name}: archivos de origen sin cambios ({len(state['partitions'])} periodos)")
+            self.last_refresh = datetime.now()
+            return self.combined()
+        if raw_df is None:
+            raise ValueError(f"{self.name}: el origen cambió y no se recibió el archivo crudo")
+
+        fechas = pd.to_datetime(raw_df[self.date_column], errors='coerce')
+        keys = (fechas.dt.year * 100 + fechas.dt.month).fillna(0).astype(int)
+        context_signature = [self._frame_checksum(df) for df in context]
+        previous = state["partitions"]
+        if context_signature != state.get("context"):
+            if previous:
+                print(f"🔄 {self.name}: contexto modificado, reprocesando histórico completo")
+            previous = {}
+        changed, removed, signatures = self.detect_changes(raw_df, keys, fechas, previous)
+
+        partitions = {key: entry for key, entry in previous.items() if key not in removed}
+        if changed:
+            print(f"🔄 {self.name}: re-transformando {len(changed)} de {len(signatures)} periodos")
+            changed_df = raw_df[keys.isin(changed).to_numpy()]
+            transformed = await process_executor.run(self.transform, changed_df, *context)
+
+            year_col, month_col = self.period_columns
+            if transformed.empty:
+                transformed_keys = pd.Series(dtype=int)
+            else:
+                transformed_keys = (transformed[year_col] * 100 + transformed[month_col]).fillna(0).astype(int)
+            os.makedirs(self.directory, exist_ok=True)
+            for key in changed:
+                part = transformed[transformed_keys == key] if not transformed.empty else transformed
+                partitions[str(key)] = {
+                    "signature": signatures[str(key)],
+                    "file": self._write_partition(str(key), part, signatures[str(key)]),
+                    "rows": int(len(part)),
+                }
+        else:
+            print(f"✅ {self.name}: sin cambios en {len(signatures)} periodos")
+
+        with self._lock:
+            self._save_state({"source_tag": tag, "context": context_signature, "partitions": partitions})
+            self._remove_orphans(self._state)
+        self.last_refresh = datetime.now()
+        return self.combined()
+
+    def combined(self) -> pd.DataFrame:
+        """Concatena todas las particiones guardadas en orden cronológico"""
+        for attempt in range(2):
+            with self._lock:
+                entries = [entry for _, entry in sorted(self._load_state()["partitions"].items(),
+                                                         key=lambda item: int(item[0]))]
+            try:
+                partitions = [self._read_partition(entry["file"]) for entry in entries if entry.get("rows")]
+                break
+            except FileNotFoundError:
+                # Otro proceso reemplazó particiones entre la lectura del estado y de los archivos
+                if attempt:
+                    raise
+                self._state_mtime = None
+        if not partitions:
+            return pd.DataFrame()
+        return pd.concat(partitions, ignore_index=True)
+
+    def clear(self):
+        """Descarta todas las particiones (fuerza reproceso completo)"""
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._state, self._state_mtime = self._empty_state(), None
+        print(f"🗑️ Particiones de {self.name} limpiadas")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de las particiones almacenadas"""
+        with self._lock:
+            partitions = self._load_state()["partitions"]
+        return {
+            "directory": self.directory,
+            "partitions": len(partitions),
+            "rows": sum(entry.get("rows", 0) for entry in partitions.values()),
+            "last_refresh": self.last_refresh.isoformat() if self.last_refresh else None,
+        }
+
+
+# Instancia global del libro Mayor Analítico
+mayor_analitico_ledger = IncrementalLedger(
+    "Mayor Analítico", mayor_analitico_opex_agrupado_transform, key="mayor_analitico"
+)
@@ -0,0 +1,279 @@
+"""
+PageRegistry - Registro diferido de páginas Dash (opcional, APG_LAZY_PAGES=1)
+Registra rutas y metadatos al iniciar (leídos del código con ast, sin importar)
+y carga los módulos de página (layout, callbacks y helpers pesados) en la
+primera visita o en un hilo de precarga en segundo plano
+
+Por defecto Dash importa las páginas al crear la app; en producción el arranque
+rápido lo da gunicorn con preload_app (wsgi.py): el maestro importa todo una
+vez y los workers lo heredan. Este modo sirve para desarrollo (el servidor
+responde antes de importar las páginas) y depende de internos de Dash
+(_callback, _validate), por lo que dash queda fijado en requirements.txt
+"""
+import os
+import ast
+import sys
+import time
+import threading
+import importlib
+import contextvars
+import dash
+from dash import _callback, _validate, Output, no_update
+from flask import request
+from typing import Any, Dict, List, Optional
+
+import constants
+from core.startup_profiler import startup_profiler
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rutas que no necesitan las páginas cargadas (estáticos y health checks)
+UNGATED_PREFIXES = ("/assets/", "/_dash-component-suites/", "/favicon.ico", "/health", "/ready")
+
+
+def preload_mode() -> bool:
+    """Proceso maestro de gunicorn (wsgi.py): todo se carga antes del fork"""
+    return os.environ.get("APG_SERVING_MODE") == "wsgi"
+
+
+def lazy_pages_enabled() -> bool:
+    """Carga diferida de páginas (APG_LAZY_PAGES=1); por defecto Dash las importa al arrancar"""
+    return os.environ.get("APG_LAZY_PAGES", "0").lower() in ("1", "true", "yes")
+
+
+class LazyPageRegistry:
+    """
+    Registro de páginas con importación diferida
+
+    Args:
+        pages_folder: Carpeta con los módulos de página
+        ready_timeout: Segundos máximos que una petición espera la precarga
+    """
+
+    def __init__(self, pages_folder: str = "pages", ready_timeout: float = 120.0):
+        self.pages_folder = pages_folder
+        self.ready_timeout = ready_timeout
+        self.app = None
+        self.load_times: Dict[str, float] = {}
+        self._pages: List[Dict[str, Any]] = []
+        self._loaded = set()
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._cancel_inputs = set()
+
+    # ------------------------------------------------------------------
+    # Descubrimiento de metadatos sin importar
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _eval(node: ast.AST) -> Any:
+        """Evalúa una expresión literal (permite constantes como PAGE_TITLE_PREFIX)"""
+        expression = compile(ast.Expression(body=node), "<register_page>", "eval")
+        return eval(expression, {"__builtins__": {}}, vars(constants))
+
+    def _read_metadata(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Argumentos de dash.register_page en un módulo; None si no es página"""
+        with open(file_path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=file_path)
+
+        for node in tree.body:
+            if not isinstance(node, ast.Expr) or not isinstance(node.value, ast.Call):
+                continue
+            func = node.value.func
+            name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+            if name != "register_page":
+                continue
+            args = node.value.args[1:]
+            kwargs = {kw.arg: self._eval(kw.value) for kw in node.value.keywords if kw.arg}
+            if args:
+                kwargs["path"] = self._eval(args[0])
+            return kwargs
+        return None
+
+    def discover(self) -> List[Dict[str, Any]]:
+        """Recorre la carpeta de páginas y retorna [{module, kwargs}]"""
+        pages = []
+        for root, dirs, files in os.walk(os.path.join(PROJECT_ROOT, self.pages_folder)):
+            dirs[:] = sorted(d for d in dirs if not d.startswith(("_", ".")))
+            for file in sorted(files):
+                if not file.endswith(".py") or file.startswith("_"):
+                    continue
+                file_path = os.path.join(root, file)
+                module_name = os.path.splitext(os.path.relpath(file_path, PROJECT_ROOT))[0].replace(os.sep, ".")
+                try:
+                    kwargs = self._read_metadata(file_path)
+                except Exception as e:
+                    # Metadatos no evaluables: se importa en el arranque
+                    print(f"⚠️ No se pudieron leer metadatos de {module_name}: {e}")
+                    kwargs = {"eager": True}
+                if kwargs is not None:
+                    pages.append({"module": module_name, "kwargs": kwargs})
+        # La página de inicio primero en la precarga
+        pages.sort(key=lambda page: page["kwargs"].get("path") != "/")
+        return pages
+
+    # ------------------------------------------------------------------
+    # Carga de módulos
+    # ------------------------------------------------------------------
+    def _merge_callbacks(self):
+        """
+        Traspasa los callbacks globales nuevos a la app (como Dash en _setup_server)
+
+        Las claves se retiran de GLOBAL_CALLBACK_MAP: si quedaran, _setup_server
+        las vería duplicadas en la primera petición. Los callbacks en segundo
+        plano se validan y sus cancel_inputs se conectan aquí, porque
+        _setup_server sólo lo hace con los callbacks que existen al arrancar
+        """
+        if self.app is None:
+            return
+        merged = {}
+        for key in list(_callback.GLOBAL_CALLBACK_MAP):
+            merged[key] = self.app.callback_map[key] = _callback.GLOBAL_CALLBACK_MAP.pop(key)
+        self.app._callback_list.extend(_callback.GLOBAL_CALLBACK_LIST)
+        _callback.GLOBAL_CALLBACK_LIST.clear()
+        inline_scripts = getattr(_callback, "GLOBAL_INLINE_SCRIPTS", None)
+        if inline_scripts:
+            self.app._inline_scripts.extend(inline_scripts)
+            inline_scripts.clear()
+
+        if any(entry.get("background") for entry in merged.values()):
+            _validate.validate_background_callbacks(self.app.callback_map)
+            self._wire_cancel_inputs(merged)
+
+    def _wire_cancel_inputs(self, callbacks: Dict[str, Any]):
+        """Registra el callback que cancela los trabajos de cada cancel_input"""
+        for entry in callbacks.values():
+            background = entry.get("background") or {}
+            for cancel_input in background.pop("cancel_inputs", []):
+                cancel_id = str(cancel_input)
+                if cancel_id in self._cancel_inputs:
+                    continue
+                self._cancel_inputs.add(cancel_id)
+
+                @self.app.callback(
+                    Output(cancel_input.component_id, "id"),
+                    cancel_input,
+                    prevent_initial_call=True,
+                    manager=background.get("manager"),
+                )
+                def cancel_call(*_):
+                    job_ids = request.args.getlist("cancelJob")
+                    executor = _callback.context_value.get().background_callback_manager
+                    for job_id in job_ids:
+                        executor.terminate_job(job_id)
+                    return no_update
+
+    def load(self, module_name: str):
+        """Importa un módulo de página (una sola vez) y registra sus callbacks"""
+        with self._lock:
+            if module_name in self._loaded:
+                return sys.modules[module_name]
+
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(module_name)
+            except Exception:
+                # El import parcial pudo re-registrar la página sin layout
+                page = dash.page_registry.get(module_name)
+                if page is not None:
+                    page["layout"] = self._lazy_layout(module_name)
+                raise
+            # El módulo vuelve a llamar register_page sin layout: se conserva el real
+            page = dash.page_registry.get(module_name)
+            if page is not None and hasattr(module, "layout"):
+                page["layout"] = module.layout
+            self._merge_callbacks()
+            self._loaded.add(module_name)
+
+            self.load_times[module_name] = time.perf_counter() - start
+            print(f"📄 Página {module_name} cargada en {self.load_times[module_name]:.2f}s")
+            return module
+
+    def _lazy_layout(self, module_name: str):
+        """Layout que importa la página en la primera visita"""
+        def layout(**kwargs):
+            page_layout = getattr(self.load(module_name), "layout", None)
+            return page_layout(**kwargs) if callable(page_layout) else page_layout
+        return layout
+
+    def load_all(self) -> Dict[str, str]:
+        """
+        Importa todas las páginas pendientes en el hilo actual
+
+        Returns:
+            {módulo: error} de las páginas que no se pudieron cargar
+        """
+        errors = {}
+        for page in self._pages:
+            try:
+                self.load(page["module"])
+            except Exception as e:
+                errors[page["module"]] = str(e)
+                print(f"❌ Error cargando página {page['module']}: {e}")
+        return errors
+
+    def warm_up(self):
+        """Importa todas las páginas pendientes (hilo en segundo plano)"""
+        start = time.perf_counter()
+        self.load_all()
+        self._ready.set()
+        print(f"✅ Precarga de páginas completada en {time.perf_counter() - start:.2f}s")
+        startup_profiler.mark("páginas precargadas")
+        startup_profiler.report()
+
+    def is_ready(self) -> bool:
+        """Indica si todas las páginas están cargadas"""
+        return self._ready.is_set()
+
+    def _wait_until_ready(self):
+        """before_request: el navegador debe recibir todos los callbacks"""
+        if self._ready.is_set() or request.path.startswith(UNGATED_PREFIXES):
+            return None
+        if not self._ready.wait(timeout=self.ready_timeout):
+            print("⚠️ Precarga de páginas incompleta, atendiendo petición igualmente")
+        return None
+
+    # ------------------------------------------------------------------
+    # Integración con la app
+    # ------------------------------------------------------------------
+    def init_app(self, app):
+        """
+        Registra las páginas con layout diferido e inicia la precarga
+
+        Requiere crear la app con use_pages=True y pages_folder="" para que
+        Dash no importe la carpeta de páginas por su cuenta. En modo wsgi la
+        precarga es síncrona: los hilos no sobreviven al fork de los workers
+        """
+        self.app = app
+        self._pages = self.discover()
+
+        for page in self._pages:
+            kwargs = dict(page["kwargs"])
+            if kwargs.pop("eager", False):
+                self.load(page["module"])
+                continue
+            dash.register_page(page["module"], layout=self._lazy_layout(page["module"]), **kwargs)
+
+        # Antes que el _setup_server de Dash: la primera petición ve todos los callbacks
+        app.server.before_request_funcs.setdefault(None, []).insert(0, self._wait_until_ready)
+        print(f"✅ {len(self._pages)} páginas registradas (carga diferida)")
+
+        if preload_mode():
+            self.warm_up()
+        else:
+            # Copia del contexto: dash.register_page lee context_value en el hilo
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(self.warm_up,), name="page-warmup", daemon=True).start()
+        return app
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado de la carga de páginas"""
+        return {
+            "pages": len(self._pages),
+            "loaded": len(self._loaded),
+            "ready": self.is_ready(),
+            "load_times": dict(self.load_times),
+        }
+
+
+# Instancia global del registro de páginas
+page_registry = LazyPageRegistry()
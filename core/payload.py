@@ -0,0 +1,140 @@
+"""
+Payload - Formato columnar compacto para dcc.Store y salidas de callbacks
+Reemplaza to_dict('records') (nombres de columna repetidos en cada fila)
+por arrays por columna: numéricos tipados en base64 y strings con diccionario.
+El decodificador equivalente del navegador está en assets/clientside.js
+"""
+import base64
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Union
+
+from core.dtypes import to_numpy_frame
+
+PAYLOAD_FORMAT = "columnar-v1"
+
+# Strings con cardinalidad menor a este ratio se codifican con diccionario
+DICTIONARY_RATIO = 0.5
+
+
+def _b64(array: np.ndarray) -> str:
+    """Serializa un array NumPy little-endian en base64"""
+    return base64.b64encode(np.ascontiguousarray(array).astype(array.dtype.newbyteorder("<")).tobytes()).decode("ascii")
+
+
+def _from_b64(data: str, dtype: str) -> np.ndarray:
+    """Reconstruye un array NumPy desde base64"""
+    return np.frombuffer(base64.b64decode(data), dtype=np.dtype(dtype).newbyteorder("<"))
+
+
+def _encode_column(series: pd.Series) -> Dict[str, Any]:
+    """Codifica una columna según su tipo"""
+    if pd.api.types.is_bool_dtype(series) and not series.isna().any():
+        return {"t": "bool", "v": _b64(series.to_numpy(dtype=np.uint8))}
+
+    if pd.api.types.is_integer_dtype(series) and not series.isna().any():
+        values = series.to_numpy(dtype=np.int64)
+        if values.size and values.min() >= np.iinfo(np.int32).min and values.max() <= np.iinfo(np.int32).max:
+            return {"t": "i4", "v": _b64(values.astype(np.int32))}
+        # JS no tiene int64 nativo: se transporta como float64
+        return {"t": "f8", "v": _b64(values.astype(np.float64))}
+
+    if pd.api.types.is_numeric_dtype(series):
+        return {"t": "f8", "v": _b64(pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan))}
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if getattr(series.dt, "tz", None) is not None:
+            series = series.dt.tz_localize(None)
+        millis = series.astype("datetime64[ms]").astype("int64").astype(np.float64)
+        millis[series.isna().to_numpy()] = np.nan
+        return {"t": "dt", "v": _b64(millis)}
+
+    # Texto / object: diccionario si la cardinalidad es baja
+    values = series.astype(object).where(series.notna(), None)
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    if len(series) and len(uniques) <= len(series) * DICTIONARY_RATIO:
+        return {"t": "dict", "k": [_plain(u) for u in uniques], "v": _b64(codes.astype(np.int32))}
+    return {"t": "list", "v": [_plain(v) for v in values.tolist()]}
+
+
+def _plain(value: Any) -> Any:
+    """Convierte escalares NumPy/pandas a tipos JSON"""
+    if value is None:
+        return None
+    if isinstance(value, (pd.Timestamp,)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def encode_frame(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Codifica un DataFrame en formato columnar
+
+    Args:
+        df: DataFrame a codificar
+
+    Returns:
+        Diccionario JSON-serializable {"format","n","columns","data"}
+    """
+    if df is None:
+        df = pd.DataFrame()
+    df = to_numpy_frame(df)
+    return {
+        "format": PAYLOAD_FORMAT,
+        "n": int(len(df)),
+        "columns": [str(col) for col in df.columns],
+        "data": [_encode_column(df[col]) for col in df.columns],
+    }
+
+
+def is_columnar(payload: Any) -> bool:
+    """Indica si un objeto es un payload columnar"""
+    return isinstance(payload, dict) and payload.get("format") == PAYLOAD_FORMAT
+
+
+def _decode_column(column: Dict[str, Any], n: int) -> Union[np.ndarray, List]:
+    """Decodifica una columna del payload"""
+    kind = column["t"]
+    if kind == "bool":
+        return _from_b64(column["v"], "u1").astype(bool)
+    if kind == "i4":
+        return _from_b64(column["v"], "i4")
+    if kind == "f8":
+        return _from_b64(column["v"], "f8")
+    if kind == "dt":
+        millis = _from_b64(column["v"], "f8")
+        return pd.to_datetime(millis, unit="ms")
+    if kind == "dict":
+        codes = _from_b64(column["v"], "i4")
+        categories = np.array(column["k"] + [None], dtype=object)
+        return categories[codes]  # -1 apunta al None final
+    return column["v"]
+
+
+def decode_frame(payload: Any) -> pd.DataFrame:
+    """
+    Reconstruye un DataFrame desde un payload columnar o una lista de registros
+
+    Acepta ambos formatos para poder migrar stores de forma gradual
+    """
+    if not payload:
+        return pd.DataFrame()
+    if not is_columnar(payload):
+        return pd.DataFrame(payload)
+    n = payload["n"]
+    data = {name: _decode_column(column, n) for name, column in zip(payload["columns"], payload["data"])}
+    return pd.DataFrame(data, columns=payload["columns"])
+
+
+def encode_frames(frames: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, Any]]:
+    """Codifica un diccionario {nombre: DataFrame}"""
+    return {name: encode_frame(df) for name, df in frames.items()}
+
+
+def payload_rows(payload: Any) -> int:
+    """Número de filas de un payload (columnar o registros)"""
+    if is_columnar(payload):
+        return payload["n"]
+    return len(payload or [])
@@ -0,0 +1,35 @@
+"""
+Serving - Endpoints de disponibilidad para el modo producción (gunicorn)
+/ready responde 200 sólo cuando las páginas y los snapshots están cargados
+"""
+import os
+from flask import Flask, jsonify
+
+from core.page_registry import page_registry, lazy_pages_enabled
+from core.snapshots import dataset_snapshots
+
+
+def is_ready() -> bool:
+    """Páginas registradas y cachés calientes"""
+    pages_ready = page_registry.is_ready() or not lazy_pages_enabled()
+    return pages_ready and dataset_snapshots.is_ready()
+
+
+def init_readiness(server: Flask):
+    """
+    Registra /ready para balanceadores y healthchecks
+
+    Args:
+        server: Servidor Flask (app.server)
+    """
+    @server.route('/ready', methods=['GET'])
+    def readiness():
+        payload = {
+            "status": "ready" if is_ready() else "warming",
+            "pid": os.getpid(),
+            "pages": page_registry.get_stats(),
+            "snapshots": dataset_snapshots.get_stats(),
+        }
+        return jsonify(payload), 200 if payload["status"] == "ready" else 503
+
+    return server
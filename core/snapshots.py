@@ -0,0 +1,80 @@
+"""
+Snapshots - Datasets cargados antes del fork de los workers
+Con gunicorn (preload_app) el proceso maestro ejecuta una vez los loaders que
+registran las páginas; los workers heredan los datos por copy-on-write
+"""
+import gc
+import time
+import asyncio
+import inspect
+import threading
+from typing import Any, Callable, Dict
+
+
+class DatasetSnapshots:
+    """Registro de loaders de datasets para precargar antes de servir"""
+
+    def __init__(self):
+        self._loaders: Dict[str, Dict[str, Any]] = {}
+        self._ready = threading.Event()
+        self.load_times: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    def register(self, name: str, loader: Callable, *args, **kwargs):
+        """
+        Registra un loader (síncrono o async) que llena la caché de una página
+
+        Args:
+            name: Nombre del dataset (DATA_SOURCE de la página)
+            loader: Función o corrutina, p. ej. load_all_data de la página
+            *args, **kwargs: Argumentos del loader
+        """
+        self._loaders[name] = {"loader": loader, "args": args, "kwargs": kwargs}
+
+    def load_all(self, freeze: bool = True):
+        """
+        Ejecuta todos los loaders registrados
+
+        Args:
+            freeze: gc.freeze() al terminar para que el GC de los workers no
+                    toque (y copie) las páginas de memoria heredadas
+        """
+        start = time.perf_counter()
+        for name, entry in self._loaders.items():
+            loader_start = time.perf_counter()
+            try:
+                result = entry["loader"](*entry["args"], **entry["kwargs"])
+                if inspect.isawaitable(result):
+                    asyncio.run(result)
+                self.load_times[name] = time.perf_counter() - loader_start
+                print(f"📦 Snapshot '{name}' cargado en {self.load_times[name]:.2f}s")
+            except Exception as e:
+                self.errors[name] = str(e)
+                print(f"❌ Error cargando snapshot '{name}': {e}")
+
+        if freeze:
+            gc.collect()
+            gc.freeze()
+        self._ready.set()
+        print(f"✅ Snapshots cargados en {time.perf_counter() - start:.2f}s ({len(self.errors)} errores)")
+
+    def mark_ready(self):
+        """Marca los snapshots como listos sin cargarlos (servidor de desarrollo)"""
+        self._ready.set()
+
+    def is_ready(self) -> bool:
+        """Indica si la precarga terminó"""
+        return self._ready.is_set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado de los snapshots"""
+        return {
+            "datasets": list(self._loaders),
+            "ready": self.is_ready(),
+            "load_times": {name: round(seconds, 3) for name, seconds in self.load_times.items()},
+            "errors": dict(self.errors),
+        }
+
+
+# Instancia global de snapshots
+dataset_snapshots = DatasetSnapshots()
@@ -0,0 +1,184 @@
+"""
+StartupProfiler - Perfil de arranque de la aplicación
+Mide el tiempo de importación por módulo y el de inicialización de cada
+cliente (config, Google Sheets, Redis, páginas). Se activa con
+APG_STARTUP_PROFILE=1
+"""
+import os
+import sys
+import time
+import threading
+import importlib.abc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+
+def startup_profile_enabled() -> bool:
+    """Indica si el perfilador de arranque está activo"""
+    return os.environ.get("APG_STARTUP_PROFILE", "0").lower() in ("1", "true", "yes")
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Loader que delega en el original y mide exec_module"""
+
+    def __init__(self, loader, profiler: "StartupProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter_import()
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit_import(module.__name__, time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """Finder que envuelve los loaders del resto de finders"""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self._profiler = profiler
+        self._resolving = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._resolving, "active", False):
+            return None
+        self._resolving.active = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimedLoader(spec.loader, self._profiler)
+                    return spec
+            return None
+        finally:
+            self._resolving.active = False
+
+
+class StartupProfiler:
+    """
+    Perfilador de arranque
+
+    Args:
+        top: Número de módulos mostrados en el reporte
+    """
+
+    def __init__(self, top: int = 25):
+        self.top = top
+        self.enabled = False
+        self.started_at: Optional[float] = None
+        self.imports: Dict[str, Dict[str, float]] = {}
+        self.inits: Dict[str, float] = {}
+        self.marks: List[Dict[str, Any]] = []
+        self._finder: Optional[_TimingFinder] = None
+        self._stack = threading.local()
+
+    def start(self):
+        """Instala el medidor de importaciones (llamar antes de importar la app)"""
+        if self.enabled or not startup_profile_enabled():
+            return self
+        self.enabled = True
+        self.started_at = time.perf_counter()
+        self._finder = _TimingFinder(self)
+        sys.meta_path.insert(0, self._finder)
+        return self
+
+    def stop(self):
+        """Retira el medidor de importaciones"""
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self._finder = None
+
+    # ------------------------------------------------------------------
+    # Importaciones (tiempo acumulado y propio)
+    # ------------------------------------------------------------------
+    def _children(self) -> List[float]:
+        if not hasattr(self._stack, "children"):
+            self._stack.children = []
+        return self._stack.children
+
+    def _enter_import(self):
+        self._children().append(0.0)
+
+    def _exit_import(self, name: str, elapsed: float):
+        children = self._children()
+        nested = children.pop() if children else 0.0
+        if children:
+            children[-1] += elapsed
+        self.imports[name] = {"cumulative": elapsed, "self": max(elapsed - nested, 0.0)}
+
+    # ------------------------------------------------------------------
+    # Inicialización de clientes
+    # ------------------------------------------------------------------
+    @contextmanager
+    def measure(self, name: str):
+        """Mide la inicialización de un cliente o recurso"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.inits[name] = self.inits.get(name, 0.0) + time.perf_counter() - start
+
+    def timed(self, name: str):
+        """Decorator equivalente a measure()"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.measure(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def mark(self, label: str):
+        """Marca un hito del arranque (segundos desde start)"""
+        if self.started_at is not None:
+            self.marks.append({"label": label, "at": time.perf_counter() - self.started_at})
+
+    # ------------------------------------------------------------------
+    # Reporte
+    # ------------------------------------------------------------------
+    def total_time(self) -> float:
+        """Segundos transcurridos desde start()"""
+        return time.perf_counter() - self.started_at if self.started_at is not None else 0.0
+
+    def get_report(self) -> Dict[str, Any]:
+        """Reporte serializable del arranque"""
+        slowest = sorted(self.imports.items(), key=lambda item: item[1]["self"], reverse=True)[:self.top]
+        return {
+            "total_seconds": round(self.total_time(), 4),
+            "modules_imported": len(self.imports),
+            "imports": [{"module": name, **{k: round(v, 4) for k, v in times.items()}} for name, times in slowest],
+            "inits": {name: round(seconds, 4) for name, seconds in self.inits.items()},
+            "marks": [{"label": m["label"], "at": round(m["at"], 4)} for m in self.marks],
+        }
+
+    def report(self):
+        """Imprime el reporte del arranque"""
+        if not self.enabled:
+            return
+        data = self.get_report()
+        print(f"⏱️ Arranque: {data['total_seconds']:.2f}s, {data['modules_imported']} módulos importados")
+        print("   Importaciones más lentas (propio / acumulado):")
+        for item in data["imports"]:
+            print(f"   {item['self']:8.3f}s {item['cumulative']:8.3f}s  {item['module']}")
+        if data["inits"]:
+            print("   Inicialización de clientes:")
+            for name, seconds in sorted(data["inits"].items(), key=lambda i: i[1], reverse=True):
+                print(f"   {seconds:8.3f}s  {name}")
+        for mark in data["marks"]:
+            print(f"   ⏩ {mark['at']:8.3f}s  {mark['label']}")
+
+
+# Instancia global del perfilador de arranque
+startup_profiler = StartupProfiler()
@@ -7,6 +7,7 @@ import pandas as pd
 from typing import Dict, Any, Optional, List
 from helpers.helpers import get_download_url_by_name
 from helpers.helpers import dataframe_filtro
+from core.dtypes import read_parquet
 
 
 class DataManager:
@@ -64,7 +65,7 @@ class DataManager:
                 return None
             
             # Cargar DataFrame de forma asíncrona
-            df = await asyncio.to_thread(pd.read_parquet, url)
+            df = await asyncio.to_thread(read_parquet, url)
             print(f"✅ Datos de {source_name} cargados: {len(df)} registros")
             return df
             
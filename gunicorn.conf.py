@@ -0,0 +1,43 @@
+"""
+Configuración de gunicorn para APG BI Dashboard
+
+Variables de entorno:
+    PORT / APG_WORKERS / APG_THREADS / APG_WORKER_CLASS (gthread | gevent)
+    APG_MAX_REQUESTS / APG_MAX_REQUESTS_JITTER / APG_TIMEOUT
+"""
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8888')}"
+
+# Workers: un proceso por núcleo; gthread atiende varias peticiones por worker
+workers = int(os.environ.get("APG_WORKERS", multiprocessing.cpu_count()))
+worker_class = os.environ.get("APG_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("APG_THREADS", 4))
+worker_connections = int(os.environ.get("APG_WORKER_CONNECTIONS", 100))  # gevent
+
+# Cargar app, páginas y snapshots en el maestro antes del fork (copy-on-write)
+preload_app = True
+
+# Reciclado gradual de workers (evita crecimiento de memoria)
+max_requests = int(os.environ.get("APG_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("APG_MAX_REQUESTS_JITTER", 100))
+timeout = int(os.environ.get("APG_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("APG_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("APG_LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    server.log.info(f"✅ Maestro listo: {workers} workers {worker_class} x {threads} hilos")
+
+
+def post_fork(server, worker):
+    server.log.info(f"👷 Worker {worker.pid} iniciado")
+
+
+def worker_exit(server, worker):
+    server.log.info(f"♻️ Worker {worker.pid} finalizado")
@@ -1,18 +1,77 @@
 import yaml
 import os
+import threading
+from core.startup_profiler import startup_profiler
+
+_config_cache = None
+_config_lock = threading.Lock()
+
+
 # Cargar configuración desde YAML
 def load_config():
     """
-    Carga la configuración desde el archivo config.yaml
+    Carga la configuración desde el archivo config.yaml (una sola vez por proceso)
     """
-    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.yaml')
-    
-    try:
-        with open(config_path, 'r', encoding='utf-8') as file:
-            return yaml.safe_load(file)
-    except FileNotFoundError:
-        print(f"Error: No se encontró el archivo de configuración en {config_path}")
-        return None
-    except yaml.YAMLError as e:
-        print(f"Error al leer el archivo YAML: {e}")
-        return None
\ No newline at end of file
+    global _config_cache
+    if _config_cache is not None:
+        return _config_cache
+
+    with _config_lock:
+        if _config_cache is not None:
+            return _config_cache
+
+        config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.yaml')
+
+        try:
+            with startup_profiler.measure("config.yaml"):
+                with open(config_path, 'r', encoding='utf-8') as file:
+                    _config_cache = yaml.safe_load(file)
+            return _config_cache
+        except FileNotFoundError:
+            print(f"Error: No se encontró el archivo de configuración en {config_path}")
+            return None
+        except yaml.YAMLError as e:
+            print(f"Error al leer el archivo YAML: {e}")
+            return None
+
+
+class LazyConfig:
+    """
+    Proxy de la configuración que lee config.yaml en el primer acceso
+
+    Permite mantener `config = ...` a nivel de módulo sin leer el archivo al importar
+    """
+
+    def _data(self):
+        return load_config() or {}
+
+    def __getitem__(self, key):
+        return self._data()[key]
+
+    def __contains__(self, key):
+        return key in self._data()
+
+    def __iter__(self):
+        return iter(self._data())
+
+    def __len__(self):
+        return len(self._data())
+
+    def __bool__(self):
+        return bool(load_config())
+
+    def get(self, key, default=None):
+        return self._data().get(key, default)
+
+    def items(self):
+        return self._data().items()
+
+    def keys(self):
+        return self._data().keys()
+
+    def values(self):
+        return self._data().values()
+
+
+# Configuración compartida (diferida)
+config = LazyConfig()
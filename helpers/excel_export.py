@@ -0,0 +1,147 @@
+"""
+Excel Export - Exportación de DataFrames a Excel con memoria acotada
+Usa xlsxwriter en modo constant_memory: las filas se escriben en orden y
+se vuelcan a disco, sin mantener la hoja completa en memoria. Los anchos
+de columna se calculan sobre el DataFrame de forma vectorizada y el estilo
+(encabezado, filtros, franjas) se escribe directamente en la hoja
+"""
+import tempfile
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from typing import Any, Iterator, List
+
+WRITE_CHUNK = 5000         # Filas convertidas por bloque al escribir
+STREAM_CHUNK = 64 * 1024   # Bytes por fragmento al transmitir el archivo
+SPOOL_MAX_SIZE = 32 * 1024 * 1024
+MAX_COLUMN_WIDTH = 60
+EXCEL_TEMPLATE_VERSION = "1"  # Cambiar si cambia el formato de la hoja
+
+HEADER_COLOR = "#B7DEE8"
+STRIPE_COLOR = "#EEF6F9"
+INVALID_HEADER_CHARS = ['[', ']', '*', '?', '/', '\\']
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def excel_column_widths(df: pd.DataFrame, max_width: int = MAX_COLUMN_WIDTH) -> List[int]:
+    """
+    Ancho de cada columna según el texto más largo (encabezado incluido)
+
+    Args:
+        df: DataFrame a exportar
+        max_width: Ancho máximo en caracteres
+
+    Returns:
+        Ancho por columna (caracteres + 2 de margen)
+    """
+    widths = []
+    for index, col in enumerate(df.columns):
+        column = df.iloc[:, index]
+        longest = column.dropna().astype(str).str.len().max() if len(column) else 0
+        longest = 0 if pd.isna(longest) else int(longest)
+        widths.append(min(max(longest, len(str(col))) + 2, max_width))
+    return widths
+
+
+def valid_table_headers(columns: Any) -> bool:
+    """Indica si los encabezados sirven para filtros y tablas de Excel"""
+    colnames = list(columns)
+    if any(pd.isna(col) or str(col).strip() == '' for col in colnames):
+        return False
+    if len(set(colnames)) != len(colnames):
+        return False
+    return not any(any(c in str(col) for c in INVALID_HEADER_CHARS) for col in colnames)
+
+
+def _row_blocks(df: pd.DataFrame, chunk_rows: int) -> Iterator[np.ndarray]:
+    """Bloques de filas como objetos Python; los nulos quedan como None"""
+    for start in range(0, len(df), chunk_rows):
+        block = df.iloc[start:start + chunk_rows]
+        yield block.astype(object).where(block.notna(), None).to_numpy()
+
+
+def write_excel(df: pd.DataFrame, output: Any, sheet_name: str = "Sheet1",
+                header_color: str = HEADER_COLOR, stripes: bool = True,
+                chunk_rows: int = WRITE_CHUNK):
+    """
+    Escribe un DataFrame en un archivo Excel formateado
+
+    Args:
+        df: DataFrame a exportar
+        output: Ruta o archivo binario con seek
+        sheet_name: Nombre de la hoja
+        header_color: Color de fondo del encabezado
+        stripes: Franjas alternas en las filas de datos
+        chunk_rows: Filas convertidas por bloque
+    """
+    workbook = xlsxwriter.Workbook(output, {
+        "constant_memory": True,
+        "strings_to_urls": False,
+        "nan_inf_to_errors": True,
+        "default_date_format": "dd/mm/yyyy",
+    })
+    try:
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        header_format = workbook.add_format({"bold": True, "bg_color": header_color, "border": 1})
+
+        # Los anchos deben definirse antes de escribir filas en constant_memory
+        for index, width in enumerate(excel_column_widths(df)):
+            worksheet.set_column(index, index, width)
+
+        worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+        row = 1
+        for block in _row_blocks(df, chunk_rows):
+            for values in block:
+                worksheet.write_row(row, 0, values)
+                row += 1
+
+        worksheet.freeze_panes(1, 0)
+        last_row, last_col = len(df), max(len(df.columns) - 1, 0)
+        if valid_table_headers(df.columns):
+            worksheet.autofilter(0, 0, last_row, last_col)
+        else:
+            print("⚠️  Encabezados no válidos para filtros de Excel. Solo se aplicó el formato básico.")
+        if stripes and last_row > 0:
+            worksheet.conditional_format(1, 0, last_row, last_col, {
+                "type": "formula",
+                "criteria": "=MOD(ROW(),2)=0",
+                "format": workbook.add_format({"bg_color": STRIPE_COLOR}),
+            })
+    finally:
+        workbook.close()
+
+
+def excel_bytes(df: pd.DataFrame, **kwargs) -> bytes:
+    """Archivo Excel completo como bytes (ver write_excel)"""
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as buffer:
+        write_excel(df, buffer, **kwargs)
+        buffer.seek(0)
+        return buffer.read()
+
+
+def stream_excel(df: pd.DataFrame, chunk_size: int = STREAM_CHUNK, **kwargs) -> Iterator[bytes]:
+    """
+    Archivo Excel por fragmentos para respuestas Flask en streaming
+
+    El archivo se escribe a un temporal (en disco si supera SPOOL_MAX_SIZE)
+    y se transmite sin cargarlo entero en memoria
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as buffer:
+        write_excel(df, buffer, **kwargs)
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def excel_response(df: pd.DataFrame, filename: str, **kwargs):
+    """Respuesta Flask que transmite el Excel como descarga"""
+    from flask import Response
+    return Response(
+        stream_excel(df, **kwargs),
+        mimetype=XLSX_MIMETYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
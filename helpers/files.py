@@ -2,9 +2,9 @@ import pandas as pd
 from helpers.get_api import listar_archivos_en_carpeta_compartida
 from helpers.get_api import get_access_token
 from helpers.helpers import get_download_url_by_name
-from helpers.config import load_config
+from helpers.config import config
+from core.dtypes import read_parquet
 
-config = load_config()
 
 def load_data_cosecha_campo():
     print("📊 Cargando datos de Transformación Materia Prima...")
@@ -15,7 +15,7 @@ def load_data_cosecha_campo():
             access_token=get_access_token()
         )
         url_excel_1 = get_download_url_by_name(data, "COSECHA CAMPO.parquet")
-        df = pd.read_parquet(url_excel_1)
+        df = read_parquet(url_excel_1)
         
         # Procesamiento básico de fechas si existe la columna
         if "FECHA" in df.columns:
@@ -3,10 +3,9 @@ import time
 import pandas as pd
 import io
 from pathlib import Path
-from helpers.get_token import get_access_token, load_config 
+from helpers.get_token import get_access_token
 from helpers.helpers import create_format_excel_in_memory
 
-config = load_config()
 
 
 BASE_URL = "https://api.apis.net.pe/v2/sunat/tipo-cambio"
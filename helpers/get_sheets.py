@@ -1,22 +1,40 @@
 import re
+import threading
 import pandas as pd
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from core.startup_profiler import startup_profiler
 
-# Paso 1: Autenticación
+# Paso 1: Autenticación (diferida hasta la primera lectura)
 scope = [
     "https://spreadsheets.google.com/feeds",
     "https://www.googleapis.com/auth/drive"
 ]
-creds = ServiceAccountCredentials.from_json_keyfile_name("nifty-might-269005-cd303aaaa33f.json", scope)
-client = gspread.authorize(creds)
+CREDENTIALS_FILE = "nifty-might-269005-cd303aaaa33f.json"
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Cliente gspread autenticado, creado en el primer uso"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import gspread
+                from oauth2client.service_account import ServiceAccountCredentials
+
+                with startup_profiler.measure("gspread"):
+                    creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, scope)
+                    _client = gspread.authorize(creds)
+    return _client
+
 
 def read_sheet(key_sheet, sheet_name):
     try:
-        spreadsheet = client.open_by_key(key_sheet)
+        spreadsheet = get_client().open_by_key(key_sheet)
         sheet = spreadsheet.worksheet(sheet_name)
         data = sheet.get_all_values()
 
         return data
     except Exception as e:
-        return key_sheet, f"Error: {str(e)}"
\ No newline at end of file
+        return key_sheet, f"Error: {str(e)}"
@@ -1,8 +1,7 @@
 import requests
 from typing import Optional
 from constants import *
-from helpers.config import load_config
-config = load_config()
+from helpers.config import config
 
 def get_access_token() -> Optional[str]:
     """
@@ -1,14 +1,10 @@
 import re
 import pandas as pd
-import openpyxl
 import numpy as np
 import calendar
 from datetime import datetime
-from openpyxl.styles import Font, PatternFill
-from openpyxl.utils import get_column_letter
 import re
-from openpyxl.worksheet.table import Table, TableStyleInfo
-import io
+from helpers.excel_export import write_excel, excel_bytes
 
 
 change_month = {
@@ -94,49 +90,18 @@ def corregir_hora_tarde(hora_str):
 
 
 def create_format_excel(dff: pd.DataFrame, nombre_archivo: str) -> str:
-     with pd.ExcelWriter(nombre_archivo, engine="openpyxl") as writer:
-        dff.to_excel(writer, index=False, sheet_name="TIEMPOS")
-        ws = writer.sheets["TIEMPOS"]
-
-        # Encabezados en negrita y fondo azul claro
-        header_fill = PatternFill(start_color="B7DEE8", end_color="B7DEE8", fill_type="solid")
-        for col_num, col in enumerate(dff.columns, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.font = Font(bold=True)
-            cell.fill = header_fill
-
-        # Ajustar ancho de columnas automáticamente
-        for i, col in enumerate(dff.columns, 1):
-            max_length = max(
-                [len(str(cell.value)) if cell.value is not None else 0 for cell in ws[get_column_letter(i)]]
-            )
-            ws.column_dimensions[get_column_letter(i)].width = max_length + 2
-
-        # Congelar la primera fila
-        ws.freeze_panes = "A2"
+    """
+    Crea un archivo Excel formateado en disco (ver helpers.excel_export)
 
-        # Validar encabezados para tabla de Excel
-        columnas_validas = True
-        colnames = list(dff.columns)
-        if any(pd.isna(col) or str(col).strip() == '' for col in colnames):
-            columnas_validas = False
-        if len(set(colnames)) != len(colnames):
-            columnas_validas = False
-        if any(any(c in str(col) for c in ['[', ']', '*', '?', '/', '\\']) for col in colnames):
-            columnas_validas = False
+    Args:
+        dff: DataFrame de pandas a formatear
+        nombre_archivo: Ruta del archivo a crear
 
-        # Crear tabla de Excel real solo si los encabezados son válidos
-        if columnas_validas:
-            nrows = dff.shape[0] + 1  # +1 por encabezado
-            ncols = dff.shape[1]
-            last_col = get_column_letter(ncols)
-            table_ref = f"A1:{last_col}{nrows}"
-            tabla = Table(displayName="TIEMPOS_TABLA", ref=table_ref)
-            style = TableStyleInfo(name="TableStyleMedium9", showFirstColumn=False, showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-            tabla.tableStyleInfo = style
-            ws.add_table(tabla)
-        else:
-            print("No se pudo crear la tabla de Excel porque los encabezados no son válidos para Excel. Solo se exportó el formato básico.")
+    Returns:
+        str: Ruta del archivo creado
+    """
+    write_excel(dff, nombre_archivo, sheet_name="TIEMPOS")
+    return nombre_archivo
 
 def create_format_excel_in_memory(dff: pd.DataFrame) -> bytes:
     """
@@ -148,58 +113,7 @@ def create_format_excel_in_memory(dff: pd.DataFrame) -> bytes:
     Returns:
         bytes: Contenido del archivo Excel formateado
     """
-    # Crear buffer en memoria
-    excel_buffer = io.BytesIO()
-    
-    with pd.ExcelWriter(excel_buffer, engine="openpyxl") as writer:
-        dff.to_excel(writer, index=False, sheet_name="TIEMPOS")
-        ws = writer.sheets["TIEMPOS"]
-
-        # Encabezados en negrita y fondo azul claro
-        header_fill = PatternFill(start_color="B7DEE8", end_color="B7DEE8", fill_type="solid")
-        for col_num, col in enumerate(dff.columns, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.font = Font(bold=True)
-            cell.fill = header_fill
-
-        # Ajustar ancho de columnas automáticamente
-        for i, col in enumerate(dff.columns, 1):
-            max_length = max(
-                [len(str(cell.value)) if cell.value is not None else 0 for cell in ws[get_column_letter(i)]]
-            )
-            ws.column_dimensions[get_column_letter(i)].width = max_length + 2
-
-        # Congelar la primera fila
-        ws.freeze_panes = "A2"
-
-        # Validar encabezados para tabla de Excel
-        columnas_validas = True
-        colnames = list(dff.columns)
-        if any(pd.isna(col) or str(col).strip() == '' for col in colnames):
-            columnas_validas = False
-        if len(set(colnames)) != len(colnames):
-            columnas_validas = False
-        if any(any(c in str(col) for c in ['[', ']', '*', '?', '/', '\\']) for col in colnames):
-            columnas_validas = False
-
-        # Crear tabla de Excel real solo si los encabezados son válidos
-        if columnas_validas:
-            nrows = dff.shape[0] + 1  # +1 por encabezado
-            ncols = dff.shape[1]
-            last_col = get_column_letter(ncols)
-            table_ref = f"A1:{last_col}{nrows}"
-            tabla = Table(displayName="TIEMPOS_TABLA", ref=table_ref)
-            style = TableStyleInfo(name="TableStyleMedium9", showFirstColumn=False, showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-            tabla.tableStyleInfo = style
-            ws.add_table(tabla)
-        else:
-            print("⚠️  No se pudo crear la tabla de Excel porque los encabezados no son válidos. Solo se aplicó el formato básico.")
-    
-    # Obtener los bytes del archivo Excel formateado
-    excel_data = excel_buffer.getvalue()
-    excel_buffer.close()
-    
-    return excel_data
+    return excel_bytes(dff, sheet_name="TIEMPOS")
 
 def get_download_url_by_name(json_data, name,):
     """
@@ -569,6 +483,49 @@ def generate_list_month(start_year, start_month):
     
     return grouped_df
 
+def generate_date_options_tree(start_year, start_month, week_label="Semana {}"):
+    """
+    Genera un árbol de opciones año -> mes -> semana para resolver
+    filtros dependientes en el navegador (assets/clientside.js)
+    
+    Args:
+        start_year (int): Año de inicio
+        start_month (int): Mes de inicio (1-12)
+        week_label (str): Formato de la etiqueta de semana
+    
+    Returns:
+        dict: {'years': [...], 'months': {año: [...]}, 'weeks': {año: {mes|'all': [...]}}, 'default_year': str}
+    """
+    df = generate_list_month(start_year, start_month)
+    
+    years = sorted(df['YEAR'].unique(), reverse=True)
+    tree = {
+        'years': [{'label': str(year), 'value': str(year)} for year in years],
+        'months': {},
+        'weeks': {},
+        'default_year': str(years[0]) if years else None,
+    }
+    
+    for year, df_year in df.groupby('YEAR'):
+        months = df_year[['MES', 'MES_TEXT']].drop_duplicates().sort_values('MES')
+        tree['months'][str(year)] = [
+            {'label': month_text, 'value': str(month)}
+            for month, month_text in zip(months['MES'], months['MES_TEXT'])
+        ]
+        
+        weeks_tree = {'all': [
+            {'label': week_label.format(week), 'value': str(week)}
+            for week in sorted(df_year['SEMANA'].unique())
+        ]}
+        for month, df_month in df_year.groupby('MES'):
+            weeks_tree[str(month)] = [
+                {'label': week_label.format(week), 'value': str(week)}
+                for week in sorted(df_month['SEMANA'].unique())
+            ]
+        tree['weeks'][str(year)] = weeks_tree
+    
+    return tree
+
 def dataframe_filtro(values=[], columns_df=[]):
         """
         Genera una query de filtrado para pandas DataFrame
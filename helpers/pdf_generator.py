@@ -4,20 +4,27 @@ from datetime import datetime
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
 import plotly.graph_objects as go
-import plotly.io as pio
 import pandas as pd
 from reportlab.graphics.barcode import qr
 from reportlab.graphics import renderPDF
 from reportlab.graphics.shapes import Drawing
+from core.chart_renderer import chart_renderer
+from helpers.pdf_tables import build_table_flowables
+
+# Tamaño de render de los gráficos del reporte (6x4 pulgadas a 2x)
+CHART_RENDER_OPTS = {"format": "png", "width": 600, "height": 400, "scale": 2}
 
 class DashboardPDFGenerator:
     def __init__(self):
         self.styles = getSampleStyleSheet()
         self.setup_custom_styles()
+        self._chart_images = {}
+        # Ancho útil de A4 con márgenes de 72 pt (se actualiza con el documento)
+        self.available_width = A4[0] - 144
         
     def setup_custom_styles(self):
         """Configurar estilos personalizados para el PDF"""
@@ -100,8 +107,8 @@ class DashboardPDFGenerator:
         
         if fig is not None:
             try:
-                # Convertir gráfico Plotly a imagen
-                img_bytes = pio.to_image(fig, format="png", width=600, height=400, scale=2)
+                # Imagen del lote pre-renderizado o render individual (ambos cacheados)
+                img_bytes = self._chart_images.get(id(fig)) or chart_renderer.render(fig, **CHART_RENDER_OPTS)
                 img = Image(io.BytesIO(img_bytes), width=6*inch, height=4*inch)
                 story.append(img)
             except Exception as e:
@@ -131,27 +138,8 @@ class DashboardPDFGenerator:
         
         if df is not None and len(df) > 0:
             try:
-                # Preparar datos para la tabla
-                data = [df.columns.tolist()]  # Headers
-                for _, row in df.iterrows():
-                    data.append(row.tolist())
-                
-                # Crear tabla
-                table = Table(data, repeatRows=1)
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#094782')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 9),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                
-                story.append(table)
+                # Matriz vectorizada + LongTables paginadas (ver helpers/pdf_tables.py)
+                story.extend(build_table_flowables(df, available_width=self.available_width))
             except Exception as e:
                 print(f"Error creando tabla: {e}")
                 no_table_msg = Paragraph(
@@ -170,11 +158,25 @@ class DashboardPDFGenerator:
         story.append(Paragraph(explanation, self.styles['ExplanationText']))
         story.append(Spacer(1, 20))
 
+    def prerender_charts(self, charts_data):
+        """Renderiza todos los gráficos del reporte en un solo lote"""
+        figures = [charts_data.get('main_chart')] + list(charts_data.get('prediction_charts', {}).values())
+        figures = [fig for fig in figures if fig is not None]
+        if not figures:
+            return
+        try:
+            images = chart_renderer.render_many(figures, **CHART_RENDER_OPTS)
+            self._chart_images = {id(fig): image for fig, image in zip(figures, images)}
+        except Exception as e:
+            print(f"Error pre-renderizando gráficos: {e}")
+
     def generate_dashboard_pdf(self, charts_data, tables_data, summary_data):
         """Generar PDF completo del dashboard"""
+        self.prerender_charts(charts_data)
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72,
                               topMargin=72, bottomMargin=18)
+        self.available_width = doc.width
         
         story = []
         
@@ -341,16 +343,66 @@ def create_pdf_from_dashboard_data(filtered_data, charts, summary_data):
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, landscape
+from core.executor import process_executor
+
+try:
+    from pypdf import PdfWriter
+except ImportError:  # pypdf es opcional: sin él las boletas se generan en un solo bloque
+    PdfWriter = None
 
 class BoletaGenerator:
+    """
+    Generador de boletas de despacho (2 por página A4)
+
+    La parte fija de la boleta (marco, encabezado, etiquetas, grilla de la
+    tabla y casillas) se dibuja una sola vez por documento como Form XObject;
+    en cada boleta sólo se superponen los valores y el QR
+    """
+
+    FRAME_FORM = "boleta_frame"
+    TABLE_WIDTHS = [80, 80, 60, 250, 80, 80, 150]
+    TABLE_ROWS = 5
+    ROW_HEIGHT = 20
+    FOOTER_BASE = 140
+
     def __init__(self, buffer):
         self.buffer = buffer
         self.page_width, self.page_height = A4 
         # Dimensiones lógicas de una boleta (diseño original horizontal)
         self.logical_width, self.logical_height = landscape(A4) 
         self.c = canvas.Canvas(self.buffer, pagesize=A4)
+        # Los boxes de fields terminan en y = h - 205; header de tabla en h - 220
+        self.y_table = self.logical_height - 220
 
-    def draw_header(self, data):
+    # ------------------------------------------------------------------
+    # Parte fija (Form XObject)
+    # ------------------------------------------------------------------
+    def define_frame_form(self):
+        """Registra la plantilla fija de la boleta en el documento"""
+        c = self.c
+        c.beginForm(self.FRAME_FORM, lowerx=0, lowery=0, upperx=self.logical_width, uppery=self.logical_height)
+        self.draw_frame()
+        c.endForm()
+
+    def draw_frame(self):
+        c = self.c
+        w = self.logical_width
+        h = self.logical_height
+
+        # --- Contorno General ---
+        c.setLineWidth(1.5)
+        # Coordenadas aproximadas cubriendo desde Header hasta bajo la firma
+        # Margin reduced to 12 for wider box
+        c.rect(12, 130, w - 24, h - 150)
+        c.setLineWidth(1) # Resetear para el resto
+
+        self.draw_header_frame()
+        self.draw_fields_frame()
+        self.draw_table_header(self.y_table)
+        self.draw_table_grid(self.y_table - 20)
+        self.draw_footer_frame()
+
+    def draw_header_frame(self):
         c = self.c
         w = self.logical_width
         h = self.logical_height
@@ -361,8 +413,6 @@ class BoletaGenerator:
             c.drawImage("assets/logo.jpg", 30, h - 95, width=80, height=60, mask='auto', preserveAspectRatio=True)
         except Exception as e:
             print(f"Error loading logo: {e}")
-            
-
         
         # Título Central
         c.setFont("Helvetica-Bold", 16)
@@ -374,10 +424,7 @@ class BoletaGenerator:
         c.drawCentredString(w / 2, h - 80, "LA LIBERTAD TRUJILLO - HUANCHACO")
 
         # Cuadro RUC (Derecha) - Estilo redondeado
-        ruc_x = w - 250
-        ruc_y = h - 100
-        ruc_w = 220
-        ruc_h = 75
+        ruc_x, ruc_y, ruc_w, ruc_h = self._ruc_box()
         
         c.setLineWidth(1)
         c.setFillColor(colors.white) # Fondo blanco
@@ -393,84 +440,66 @@ class BoletaGenerator:
         c.drawCentredString(ruc_x + ruc_w/2, ruc_y + 58, "R.U.C. N° 20611417749")
         
         c.setFont("Helvetica-Bold", 11)
-        c.setFillColor(colors.black) 
         c.drawCentredString(ruc_x + ruc_w/2, ruc_y + 33, "BOLETA DE DESPACHO")
-        
-        # Numero Boleta
-        nro_boleta = str(data.get('CORRELATIVO', '-'))
-        c.setFont("Helvetica-Bold", 14)
-        c.setFillColor(colors.red)
-        c.drawCentredString(ruc_x + ruc_w/2, ruc_y + 8, nro_boleta)
-        c.setFillColor(colors.black)
 
-    def draw_fields(self, data):
+    def _ruc_box(self):
+        """Posición y tamaño del cuadro RUC (x, y, ancho, alto)"""
+        return self.logical_width - 250, self.logical_height - 100, 220, 75
+
+    def _left_box(self):
+        """Posición y tamaño del contenedor de datos (x, y, ancho, alto)"""
+        return 30, self.logical_height - 205, 500, 95
+
+    def draw_fields_frame(self):
         c = self.c
         h = self.logical_height
         
         # --- Contenedor Izquierdo (Datos) ---
-        left_box_x = 30
-        left_box_y = h - 205
-        left_box_w = 500
-        left_box_h = 95
+        left_box_x, left_box_y, left_box_w, left_box_h = self._left_box()
         
         c.setLineWidth(0.5)
         c.roundRect(left_box_x, left_box_y, left_box_w, left_box_h, 6, stroke=1, fill=0)
         
         start_y = left_box_y + left_box_h - 15
         line_step = 14
-        font_size = 7
         
+        # Etiquetas y valores fijos (None = valor de la boleta)
         fields = [
-            ("DESTINATARIO:", data['DESTINATARIO']+" - "+data['FUNDO']),
+            ("DESTINATARIO:", None),
             ("COMPRADOR:", "-"),
             ("PUNTO DE PARTIDA:", "VALLE MOCHE EL MILAGRO - TRUJILLO - LA LIBERTAD"),
-            ("PUNTO DE LLEGADA:", data.get('PUNTO DE LLEGADA', '')+" - "+data['FUNDO']),
-            ("PREPARADOR POR:", data.get('USUARIO', '')),
+            ("PUNTO DE LLEGADA:", None),
+            ("PREPARADOR POR:", None),
         ]
         current_y = start_y
-        # Fecha de Inicio de Traslado (Line with boxes)
+        # Fecha de Inicio de Traslado
         c.setFont("Helvetica-Bold", 11)
         c.drawString(left_box_x + 10, current_y, "FECHA:")
         
-        # Boxes for date [ ] [ ] [ ]
-        # c.setFont("Helvetica-Bold", 11) # Ya establecido arriba
-        fecha_str = str(data.get('FECHA', ''))
-        c.drawString(left_box_x + 100, current_y, fecha_str) 
-        
-        #c.line(left_box_x + 50, current_y - 2, left_box_x + 155, current_y - 2)
-        
         # Mover una fila abajo para los siguientes campos
         current_y -= line_step
 
-        c.setFont("Helvetica", font_size)
+        c.setFont("Helvetica", 7)
         
         for i, (label, value) in enumerate(fields):
             # Etiqueta
             c.drawString(left_box_x + 10, current_y, label)
             
-            # Linea y Valor
+            # Linea y Valor fijo
             line_start_x = left_box_x + 100
             line_end_x = left_box_x + 330
             c.line(line_start_x, current_y - 2, line_end_x, current_y - 2)
-            c.drawString(line_start_x + 2, current_y, str(value if value else ''))
+            if value is not None:
+                c.drawString(line_start_x + 2, current_y, value)
 
             # Campos RUC adicionales en las dos primeras lineas
             if i == 0 or i == 1:
-                ruc_label = "N° DE RUC:"
-                c.drawString(left_box_x + 340, current_y, ruc_label)
+                c.drawString(left_box_x + 340, current_y, "N° DE RUC:")
                 c.line(left_box_x + 385, current_y - 2, left_box_x + 490, current_y - 2)
-                
-                if i == 0:
-                    ruc_val = str(data.get('Nº RUC DESTINATARIO', ''))
-                else:
-                    ruc_val = "-"
-                    
-                c.drawString(left_box_x + 390, current_y, ruc_val)
+                if i == 1:
+                    c.drawString(left_box_x + 390, current_y, "-")
                 
             current_y -= line_step
-
-        
-
         
         # --- Contenedor Derecho (Checkboxes de Operación) ---
         right_box_x = 540
@@ -486,7 +515,6 @@ class BoletaGenerator:
         opts_y_start = right_box_y + right_box_h - 15
         
         col1_opts = ["VENTA", "VENTA SUJETA A CONFIRMACIÓN", "COMPRA", "CONSIGNACIÓN", "IMPORTACIÓN", "OTROS"]
-        col2_opts = ["MATERIALES", "EXPORTACIÓN", "TRASLADO DE BIENES", "PARA TRANSFORMACIÓN", "ENTRE ESTABLECIMIENTO DE", "LA MISMA EMPRESA"]
         
         # Checkbox drawing helper
         def draw_check_item(x, y, text, checked=False):
@@ -502,11 +530,6 @@ class BoletaGenerator:
             curr_y -= 12
             
         # Col 2
-        curr_y = opts_y_start
-        # Special case for multi-line items in col 2 or just list distinct
-        # Logic adjustment for "TRASLADO ... PARA TRANSFORMACION" looks like 2 lines visually in image
-        # But we list flat for simplicity unless specific
-        
         draw_check_item(col2_x, opts_y_start, "MATERIALES", checked=True)
         draw_check_item(col2_x, opts_y_start - 12, "EXPORTACIÓN")
         
@@ -520,8 +543,7 @@ class BoletaGenerator:
     def draw_table_header(self, y_pos):
         c = self.c
         headers = ["CODIGO", "CANTIDAD", "UNID", "DESCRIPCION", "PESO BRUTO", "PESO NETO", "OBSERVACIÓN"]
-        widths = [80, 80, 60, 250, 80, 80, 150]
-        x = 40
+        widths = self.TABLE_WIDTHS
         
         c.setFillColor(colors.grey)
         c.rect(30, y_pos - 15, sum(widths), 20, fill=1)
@@ -535,13 +557,102 @@ class BoletaGenerator:
         c.setFillColor(colors.black)
         return current_x # Total width
 
-    def draw_table_row(self, y_pos, data):
+    def draw_table_grid(self, y_pos):
+        """Celdas de las filas de materiales y celda fusionada de Observación"""
+        c = self.c
+        widths = self.TABLE_WIDTHS
+        current_y = y_pos
+        
+        for _ in range(self.TABLE_ROWS):
+            current_x = 30
+            for w in widths[:-1]:
+                c.rect(current_x, current_y - 20, w, 20)
+                current_x += w
+            current_y -= self.ROW_HEIGHT
+        
+        obs_x = 30 + sum(widths[:-1])
+        c.rect(obs_x, current_y, widths[-1], self.TABLE_ROWS * self.ROW_HEIGHT)
+
+    def draw_footer_frame(self):
+        c = self.c
+        y_footer_base = self.FOOTER_BASE
+        
+        # Reset color/font for footer
+        c.setFillColor(colors.black)
+        
+        # Titulo seccion inferior
+        c.setFont("Helvetica-Bold", 7)
+        c.drawString(40, y_footer_base + 65, "HECHO POR APG PACKING") 
+        
+        c.setFont("Helvetica", 8)
+        
+        # Linea 1: Apellidos y Nombres Transportista
+        y_row1 = y_footer_base + 50
+        c.drawString(40, y_row1, "APELLIDOS Y NOMBRES Ó RAZÓN SOCIAL DEL TRANSPORTISTA:")
+        c.line(310, y_row1 - 2, 690, y_row1 - 2)
+
+        # Linea 2: Domicilio, RUC, Marca
+        y_row2 = y_footer_base + 35
+        c.drawString(40, y_row2, "DOMICILIO FISCAL:")
+        c.line(125, y_row2 - 2, 280, y_row2 - 2)
+        c.drawString(130, y_row2, "-")
+        c.drawString(290, y_row2, "N° DE RUC:")
+        c.line(345, y_row2 - 2, 450, y_row2 - 2) 
+        c.drawString(460, y_row2, "MARCA DEL VEHICULO:") 
+        c.line(560, y_row2 - 2, 690, y_row2 - 2) 
+
+        # Linea 3: Placa, Chofer, Constancia
+        y_row3 = y_footer_base + 20
+        c.drawString(40, y_row3, "PLACA VEHICULO:")
+        c.line(125, y_row3 - 2, 190, y_row3 - 2)
+        c.drawString(210, y_row3, "NOMBRE DEL CHOFER:") 
+        c.line(315, y_row3 - 2, 450, y_row3 - 2) 
+        c.drawString(460, y_row3, "N° DE CONSTANCIA DE RECEPCIÓN:") 
+        c.line(615, y_row3 - 2, 690, y_row3 - 2) 
+        c.drawString(620, y_row3, "-")
+
+    # ------------------------------------------------------------------
+    # Valores de cada boleta
+    # ------------------------------------------------------------------
+    def draw_header(self, data):
+        c = self.c
+        ruc_x, ruc_y, ruc_w, _ = self._ruc_box()
+        
+        # Numero Boleta
+        nro_boleta = str(data.get('CORRELATIVO', '-'))
+        c.setFont("Helvetica-Bold", 14)
+        c.setFillColor(colors.red)
+        c.drawCentredString(ruc_x + ruc_w/2, ruc_y + 8, nro_boleta)
+        c.setFillColor(colors.black)
+
+    def draw_fields(self, data):
         c = self.c
-        widths = [80, 80, 60, 250, 80, 80, 150]
-        row_height = 20
+        left_box_x, left_box_y, _, left_box_h = self._left_box()
         
+        start_y = left_box_y + left_box_h - 15
+        line_step = 14
+        value_x = left_box_x + 102
+        
+        # Fecha
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(left_box_x + 100, start_y, str(data.get('FECHA', '')))
+        
+        # Filas 0 (destinatario), 3 (llegada) y 4 (preparador) de la plantilla
+        values = {
+            0: data['DESTINATARIO']+" - "+data['FUNDO'],
+            3: data.get('PUNTO DE LLEGADA', '')+" - "+data['FUNDO'],
+            4: data.get('USUARIO', ''),
+        }
+        c.setFont("Helvetica", 7)
+        for i, value in values.items():
+            row_y = start_y - line_step * (i + 1)
+            c.drawString(value_x, row_y, str(value if value else ''))
+        
+        c.drawString(left_box_x + 390, start_y - line_step, str(data.get('Nº RUC DESTINATARIO', '')))
+
+    def get_table_rows(self, data):
+        """Filas de materiales con cantidad > 0 y precintos"""
         # Lista de columnas de materiales a procesar (según estructura de datos)
-        # Se verifica si existen y si tienen cantidad > 0
         materials = [
             "JABAS VACIAS",
             "JARRAS VACIAS",
@@ -549,20 +660,12 @@ class BoletaGenerator:
             "ESQUINEROS",
             "JABAS CON DESCARTE",
             "JARRAS CON DESCARTE",
-
         ]
         
-        c.setFont("Helvetica", 9)
-        current_y = y_pos
-        has_items = False
-        
-        # Lista de items validos
         valid_rows = []
         for material in materials:
-            print(material)
             try:
                 val = data.get(material, 0)
-                print(val)
                 if pd.isna(val) or val == '': val = 0
                 qty = float(val)
                 
@@ -575,9 +678,7 @@ class BoletaGenerator:
                         material,               # DESCRIPCION
                         "-",                    # PESO BRUTO
                         "-",                    # PESO NETO
-                        data.get('OBSERVACIONES', ''), # OBSERVACION
                     ])
-                    #data.get('Nº PRECINTO', '')
             except Exception:
                 continue
 
@@ -596,156 +697,75 @@ class BoletaGenerator:
                     "PRECINTOS",                # DESCRIPCION
                     "-",                        # PESO BRUTO
                     "-",                        # PESO NETO
-                    data.get('OBSERVACIONES') or '' # OBSERVACION
                 ])
             except Exception as e:
                 print(f"Error processing precintos: {e}")
-                
-        # Dibujar siempre 5 filas
-        num_rows = 5
-        c.setFont("Helvetica", 8)
+        return valid_rows
+
+    def draw_table_row(self, y_pos, data):
+        c = self.c
+        widths = self.TABLE_WIDTHS
+        valid_rows = self.get_table_rows(data)
         
-        for i in range(num_rows):
-            if i < len(valid_rows):
-                row_data = valid_rows[i]
-            else:
-                # Fila vacía para completar formato
-                row_data = ["-", "", "", "", "-", "-", ""]
-            
-            # Dibujar celdas (menos la última columna)
+        # Siempre 5 filas; las vacías completan el formato
+        c.setFont("Helvetica", 8)
+        current_y = y_pos
+        for i in range(self.TABLE_ROWS):
+            row_data = valid_rows[i] if i < len(valid_rows) else ["-", "", "", "", "-", "-"]
             current_x = 30
-            for j, (val, w) in enumerate(zip(row_data, widths)):
-                if j == len(widths) - 1: # Saltar columna Observación
-                    continue
-                    
-                c.drawCentredString(current_x + w/2, current_y - 14, str(val)) 
-                c.rect(current_x, current_y - 20, w, 20)
+            for val, w in zip(row_data, widths[:-1]):
+                if val:
+                    c.drawCentredString(current_x + w/2, current_y - 14, str(val)) 
                 current_x += w
-            
-            current_y -= row_height
+            current_y -= self.ROW_HEIGHT
 
-        # Dibujar celda fusionada de Observación
-        obs_idx = len(widths) - 1
-        obs_w = widths[obs_idx]
-        obs_x = 30 + sum(widths[:obs_idx])
-        total_h = num_rows * row_height
-        
-        # El current_y ahora está en la base de la tabla tras el loop
-        # Dibujamos el rectangulo desde ahí hacia arriba
-        c.rect(obs_x, current_y, obs_w, total_h)
-        c.drawCentredString(obs_x + obs_w/2, current_y + total_h/2 - 4, data.get('OBSERVACIONES') or 'DEVOLUCIÓN DE MATERIAL')
+        # Texto de la celda fusionada de Observación
+        obs_x = 30 + sum(widths[:-1])
+        total_h = self.TABLE_ROWS * self.ROW_HEIGHT
+        c.drawCentredString(obs_x + widths[-1]/2, current_y + total_h/2 - 4, data.get('OBSERVACIONES') or 'DEVOLUCIÓN DE MATERIAL')
 
-    def draw_single_boleta(self, data):
+    def draw_footer(self, data):
         c = self.c
-        w = self.logical_width
-        h = self.logical_height
-
-        # --- Contorno General ---
-        c.setLineWidth(1.5)
-        # Coordenadas aproximadas cubriendo desde Header hasta bajo la firma
-        # Margin reduced to 12 for wider box
-        c.rect(12, 130, w - 24, h - 150)
-        c.setLineWidth(1) # Resetear para el resto
-
-        self.draw_header(data)
-        self.draw_fields(data)
-        
-        # Tabla - Movida hacia arriba para reducir espacio en blanco
-        h = self.logical_height
-        # Los boxes de fields terminan en y = h - 205.
-        # Dejamos un margen pequeño (ej. 15 pt), entonces header de tabla en h - 220.
-        y_table = h - 220 
-        
-        self.draw_table_header(y_table)
-        
-        # Dibujar filas de materiales
-        self.draw_table_row(y_table - 20, data)
-        
-        # Footer
-        c = self.c
-        # Footer también sube. 
-        # Si la tabla tiene 1 fila, termina en y_table - 40.
-        # Pongamos el footer base en y = 140 para que quede pegado pero con aire.
-        # Check if we didn't invoke too many rows overlap. (Max 6 rows = 120pts used)
-        # y_table (375) - 20 (header) - 120 (rows) = 235. Footer at 140. PLENTY of space.
-        y_footer_base = 140
+        y_footer_base = self.FOOTER_BASE
+        y_row1 = y_footer_base + 50
+        y_row2 = y_footer_base + 35
+        y_row3 = y_footer_base + 20
         
-        # Reset color/font for footer
         c.setFillColor(colors.black)
-        
-        # Titulo seccion inferior
-        c.setFont("Helvetica-Bold", 7)
-        c.drawString(40, y_footer_base + 65, "HECHO POR APG PACKING") 
-        
         c.setFont("Helvetica", 8)
-        
-        # Ajustamos coordenadas para dar espacio al recuadro de firma (Width ~120 reserved at right)
-        # Max width ~840. Box starts ~700. Lines should end ~690.
-        
-        # Linea 1: Apellidos y Nombres Transportista
-        y_row1 = y_footer_base + 50
-        c.drawString(40, y_row1, "APELLIDOS Y NOMBRES Ó RAZÓN SOCIAL DEL TRANSPORTISTA:")
-        c.line(310, y_row1 - 2, 690, y_row1 - 2)
         c.drawString(315, y_row1, str(data.get('RAZON SOCIAL TRANSPORTE', ''))) 
-
-        # Linea 2: Domicilio, RUC, Marca
-        # Redistribuimos para ganar espacio
-        y_row2 = y_footer_base + 35
-        
-        # Col 1
-        c.drawString(40, y_row2, "DOMICILIO FISCAL:")
-        c.line(125, y_row2 - 2, 280, y_row2 - 2)
-        c.drawString(130, y_row2, "-")
-        # Col 2
-        c.drawString(290, y_row2, "N° DE RUC:")
-        c.line(345, y_row2 - 2, 450, y_row2 - 2) 
         c.drawString(350, y_row2, str(data.get('Nº RUC TRANSPORTISTA', '')))
-        
-        # Col 3
-        c.drawString(460, y_row2, "MARCA DEL VEHICULO:") 
-        c.line(560, y_row2 - 2, 690, y_row2 - 2) 
         c.drawString(565, y_row2, str(data.get('MARCA_VEHICULO', '-')))
-
-        # Linea 3: Placa, Chofer, Constancia
-        y_row3 = y_footer_base + 20
-        
-        # Col 1
-        c.drawString(40, y_row3, "PLACA VEHICULO:")
-        c.line(125, y_row3 - 2, 190, y_row3 - 2)
         c.drawString(130, y_row3, str(data.get('PLACA', data.get('Nº PLACA', ''))))
-        
-        # Col 2
-        c.drawString(210, y_row3, "NOMBRE DEL CHOFER:") 
-        c.line(315, y_row3 - 2, 450, y_row3 - 2) 
         c.drawString(320, y_row3, str(data.get('CONDUCTOR', '-')))
         
-        # Col 3
-        c.drawString(460, y_row3, "N° DE CONSTANCIA DE RECEPCIÓN:") 
-        c.line(615, y_row3 - 2, 690, y_row3 - 2) 
-        c.drawString(620, y_row3, "-")
-        # Constancia signature box (Derecha) -> AHORA QR
+        # QR (a la derecha, donde estaba el box de firma)
         try:
             qr_data = str(data.get('CORRELATIVO', '-'))
             qr_widget = qr.QrCodeWidget(qr_data)
             bounds = qr_widget.getBounds()
             width = bounds[2] - bounds[0]
-            height = bounds[3] - bounds[1]
             
-            # Desired size same as box height roughly
             size = 120.0
             scale = size / width
             
-            # Posicionar donde estaba el box
-            # box_x = 700 (definido arriba)
-            # y_footer_base + 15 (base del box)
-            
             d = Drawing(size, size, transform=[scale, 0, 0, scale, 0, 0])
             d.add(qr_widget)
             renderPDF.draw(d, c, 700, y_footer_base - 20) 
         except Exception as e:
             print(f"Error drawing QR in footer: {e}")
 
+    def draw_single_boleta(self, data):
+        # Plantilla fija + valores de la boleta
+        self.c.doForm(self.FRAME_FORM)
+        self.draw_header(data)
+        self.draw_fields(data)
+        self.draw_table_row(self.y_table - 20, data)
+        self.draw_footer(data)
+
     def generate(self, data_list):
+        self.define_frame_form()
+        
         for i, data in enumerate(data_list):
             if i > 0 and i % 2 == 0:
                 self.c.showPage()
@@ -774,8 +794,42 @@ class BoletaGenerator:
         self.buffer.seek(0)
         return self.buffer
 
-def generate_boleta_pdf(data_list):
-    buffer = io.BytesIO()
+
+# Boletas por bloque al generar en paralelo (par: 2 boletas por página)
+BOLETA_CHUNK_SIZE = 200
+# Cambiar al modificar el diseño de la boleta (invalida los PDFs en caché)
+BOLETA_TEMPLATE_VERSION = "1"
+
+
+def _render_boleta_chunk(data_list):
+    """Genera un bloque de boletas (punto de entrada del pool de procesos)"""
+    return BoletaGenerator(io.BytesIO()).generate(data_list).getvalue()
+
+
+def generate_boleta_pdf(data_list, chunk_size=BOLETA_CHUNK_SIZE):
     # Asegúrate de pasar data_list como lista de dicts
-    generator = BoletaGenerator(buffer)
-    return generator.generate(data_list)
\ No newline at end of file
+    data_list = list(data_list)
+    if PdfWriter is None or len(data_list) <= chunk_size:
+        buffer = io.BytesIO()
+        generator = BoletaGenerator(buffer)
+        return generator.generate(data_list)
+
+    # Lotes grandes: bloques en paralelo y unión de páginas al final
+    chunk_size += chunk_size % 2
+    chunks = [data_list[i:i + chunk_size] for i in range(0, len(data_list), chunk_size)]
+    parts = process_executor.map(_render_boleta_chunk, chunks)
+    
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(io.BytesIO(part))
+    try:
+        # Logo y plantilla repetidos en cada bloque -> un solo objeto
+        writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+    except Exception as e:
+        print(f"⚠️ No se pudieron deduplicar objetos del PDF: {e}")
+    
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    buffer.seek(0)
+    print(f"✅ {len(data_list)} boletas generadas en {len(chunks)} bloques")
+    return buffer
@@ -0,0 +1,152 @@
+"""
+PDF Tables - Tablas grandes para reportes PDF
+La matriz de celdas se arma de forma vectorizada, los anchos de columna se
+calculan una sola vez y las filas se reparten en LongTables por bloques
+para que reportlab no tenga que maquetar miles de filas en una sola pieza.
+Si las columnas se reducen para caber en la página, sólo las celdas que ya
+no caben se convierten en Paragraph (texto en varias líneas)
+"""
+import numpy as np
+import pandas as pd
+from typing import Any, List, Optional, Tuple
+from xml.sax.saxutils import escape
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import LongTable, Paragraph, TableStyle
+
+CHUNK_ROWS = 500     # Filas por LongTable
+WIDTH_SAMPLE = 5     # Textos más largos por columna usados para medir el ancho
+CELL_PADDING = 12    # Padding horizontal (6 + 6 pt por defecto en reportlab)
+
+HEADER_FONT = ("Helvetica-Bold", 10)
+BODY_FONT = ("Helvetica", 9)
+
+# Estilo de tabla de los reportes (encabezado azul, cuerpo beige)
+REPORT_TABLE_STYLE = [
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#094782')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), HEADER_FONT[0]),
+    ('FONTSIZE', (0, 0), (-1, 0), HEADER_FONT[1]),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('FONTNAME', (0, 1), (-1, -1), BODY_FONT[0]),
+    ('FONTSIZE', (0, 1), (-1, -1), BODY_FONT[1]),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+]
+
+# Estilos de las celdas que se parten en varias líneas
+HEADER_PARAGRAPH = ParagraphStyle("TableHeader", fontName=HEADER_FONT[0], fontSize=HEADER_FONT[1],
+                                  leading=HEADER_FONT[1] * 1.2, alignment=TA_CENTER, textColor=colors.whitesmoke)
+BODY_PARAGRAPH = ParagraphStyle("TableBody", fontName=BODY_FONT[0], fontSize=BODY_FONT[1],
+                                leading=BODY_FONT[1] * 1.2, alignment=TA_CENTER)
+
+
+def table_matrix(data: Any) -> Tuple[List[str], np.ndarray]:
+    """
+    Matriz de textos de una tabla sin recorrer filas en Python
+
+    Args:
+        data: DataFrame o lista de dicts (registros)
+
+    Returns:
+        (encabezados, matriz 2D de str); los valores nulos quedan vacíos
+    """
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    cells = df.astype(object).where(df.notna(), "").astype(str).to_numpy()
+    return [str(col) for col in df.columns], cells
+
+
+def column_widths(headers: List[str], cells: np.ndarray, available_width: float) -> Tuple[List[float], List[float]]:
+    """
+    Anchos de columna a partir de los textos más largos de cada columna
+
+    Si la suma supera el ancho disponible, sólo las columnas más anchas se
+    limitan a un ancho común (las angostas conservan su ancho natural)
+
+    Args:
+        headers: Encabezados
+        cells: Matriz de textos (ver table_matrix)
+        available_width: Ancho útil de la página en puntos
+
+    Returns:
+        (anchos, ancho máximo por carácter medido en cada columna)
+    """
+    widths, char_widths = [], []
+    for index, header in enumerate(headers):
+        width = stringWidth(header, *HEADER_FONT)
+        char_width = width / max(len(header), 1)
+        if len(cells):
+            column = pd.Series(cells[:, index])
+            longest = column.iloc[column.str.len().nlargest(WIDTH_SAMPLE).index]
+            for text in longest:
+                text_width = stringWidth(text, *BODY_FONT)
+                width = max(width, text_width)
+                char_width = max(char_width, text_width / max(len(text), 1))
+        widths.append(width + CELL_PADDING)
+        char_widths.append(char_width)
+
+    if sum(widths) > available_width:
+        # Límite c tal que sum(min(ancho, c)) == ancho disponible
+        remaining, pending = available_width, sorted(widths)
+        while pending and pending[0] * len(pending) <= remaining:
+            remaining -= pending.pop(0)
+        cap = remaining / len(pending) if pending else available_width
+        widths = [min(width, cap) for width in widths]
+    return widths, char_widths
+
+
+def wrap_cells(headers: List[str], cells: np.ndarray, widths: List[float],
+               char_widths: List[float]) -> Tuple[List[Any], np.ndarray]:
+    """
+    Convierte en Paragraph las celdas más largas que su columna
+
+    El largo máximo por columna se estima con el ancho por carácter medido,
+    así no se mide cada celda; las demás siguen como texto simple
+
+    Returns:
+        (encabezados, matriz de celdas) listos para LongTable
+    """
+    headers = list(headers)
+    cells = cells.astype(object)
+    for index, (width, char_width) in enumerate(zip(widths, char_widths)):
+        max_chars = int((width - CELL_PADDING) / char_width) if char_width else 0
+        if stringWidth(headers[index], *HEADER_FONT) + CELL_PADDING > width:
+            headers[index] = Paragraph(escape(headers[index]), HEADER_PARAGRAPH)
+        if not len(cells):
+            continue
+        column = cells[:, index]
+        long_rows = np.flatnonzero(pd.Series(column).str.len().to_numpy() > max_chars)
+        for row in long_rows:
+            column[row] = Paragraph(escape(column[row]), BODY_PARAGRAPH)
+    return headers, cells
+
+
+def build_table_flowables(data: Any, available_width: float, chunk_rows: int = CHUNK_ROWS,
+                          style: Optional[list] = None) -> List[LongTable]:
+    """
+    LongTables paginadas para una tabla de cualquier tamaño
+
+    Args:
+        data: DataFrame o lista de dicts
+        available_width: Ancho útil de la página en puntos
+        chunk_rows: Filas por LongTable (cada una repite el encabezado)
+        style: Comandos de TableStyle (por defecto REPORT_TABLE_STYLE)
+
+    Returns:
+        Lista de flowables para agregar a la historia del documento
+    """
+    headers, cells = table_matrix(data)
+    widths, char_widths = column_widths(headers, cells, available_width)
+    headers, cells = wrap_cells(headers, cells, widths, char_widths)
+    table_style = TableStyle(style or REPORT_TABLE_STYLE)
+
+    flowables = []
+    for start in range(0, max(len(cells), 1), chunk_rows):
+        rows = [headers] + cells[start:start + chunk_rows].tolist()
+        table = LongTable(rows, colWidths=widths, repeatRows=1, splitByRow=1)
+        table.setStyle(table_style)
+        flowables.append(table)
+    return flowables
@@ -2,6 +2,9 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import warnings
+from core.figure_cache import cached_figure
+from core.downsample import series_downsampler
+from core.forecasting import forecast_service
 warnings.filterwarnings('ignore')
 
 # Algorithm 1: Simple Moving Average with Trend
@@ -234,6 +237,250 @@ def linear_regression_prediction(data, target_column, weeks_ahead=3):
         print(f"Error in Linear Regression prediction: {e}")
         return pd.DataFrame()
 
+# Batch forecasting: all algorithms for many series at once
+ALGORITHMS = ['Moving Average + Trend', 'Exponential Smoothing', 'Linear Regression']
+SERIES_KEYS = ['FUNDO', 'VARIEDAD', 'EMPRESA']
+MIN_POINTS = {'Moving Average + Trend': 2, 'Exponential Smoothing': 2, 'Linear Regression': 4}
+
+
+def week_year(data, week_column='Semana', date_column='FECHA'):
+    """
+    Year of each row's week, keeping the source week number
+
+    The week column is the one the dashboard groups by, so forecasts line up
+    week-for-week with the actuals. Only the year is corrected: a week 1 that
+    starts in late December belongs to the next year, and a week 52/53 that
+    ends in early January to the previous one. The month comes from the date
+    column when present, otherwise from 'Mes'.
+
+    Returns:
+        (year Series, week Series)
+    """
+    year = pd.to_numeric(data['Año'], errors='coerce')
+    week = pd.to_numeric(data[week_column], errors='coerce')
+    if date_column in data.columns:
+        month = pd.to_datetime(data[date_column], errors='coerce').dt.month
+    elif 'Mes' in data.columns:
+        month = pd.to_numeric(data['Mes'], errors='coerce')
+    else:
+        return year, week
+    year = year.where(~((month == 12) & (week == 1)), year + 1)
+    year = year.where(~((month == 1) & (week >= 52)), year - 1)
+    return year, week
+
+
+def kg_series_long(data, target_columns=['KG_PROCESADOS', 'KG_EXPORTABLES'], keys=SERIES_KEYS,
+                   week_column='Semana', date_column='FECHA'):
+    """
+    Build a long-format frame of weekly series (one per key combination and metric)
+
+    Args:
+        data: DataFrame with keys, 'Año', week column and target columns
+        target_columns: Metric columns to forecast
+        keys: Series id columns (missing ones are ignored)
+        week_column: Week column name ('Semana' or 'SEMANA')
+        date_column: Date column used to correct the year at year boundaries (optional)
+
+    Returns:
+        DataFrame with columns keys + ['Serie', 'Año', 'Semana', 'Valor'], weekly
+        sums; 'Semana' is the source week and 'Año' the year that week belongs to
+    """
+    keys = [key for key in keys if key in data.columns]
+    targets = [column for column in target_columns if column in data.columns]
+    year, week = week_year(data, week_column, date_column)
+    weekly = (
+        data[keys + targets]
+        .assign(Año=year.to_numpy(), Semana=week.to_numpy())
+        .dropna(subset=['Año', 'Semana'])
+        .groupby(keys + ['Año', 'Semana'], observed=True)[targets].sum()
+        .reset_index()
+    )
+    return weekly.melt(id_vars=keys + ['Año', 'Semana'], value_vars=targets,
+                       var_name='Serie', value_name='Valor')
+
+
+def _series_matrix(long_df, id_columns):
+    """
+    Right-aligned matrix of series values (one row per series, NaN padding on the left)
+
+    Returns:
+        (ids DataFrame, values matrix, lengths, last year, last week)
+    """
+    df = long_df[id_columns + ['Año', 'Semana', 'Valor']].copy()
+    for column in ('Año', 'Semana', 'Valor'):
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    df = df.dropna(subset=['Año', 'Semana', 'Valor'])
+    df = df.sort_values(id_columns + ['Año', 'Semana'], kind='stable')
+
+    grouped = df.groupby(id_columns, sort=False, observed=True, dropna=False)
+    series_index = grouped.ngroup().to_numpy()
+    position = grouped.cumcount().to_numpy()
+    lengths = np.bincount(series_index)
+    width = int(lengths.max()) if len(lengths) else 0
+
+    values = np.full((len(lengths), width), np.nan)
+    values[series_index, width - lengths[series_index] + position] = df['Valor'].to_numpy(dtype=float)
+
+    last = grouped.tail(1)
+    ids = last[id_columns].reset_index(drop=True)
+    return ids, values, lengths, last['Año'].to_numpy(dtype=int), last['Semana'].to_numpy(dtype=int)
+
+
+def _masked_slope(y, x):
+    """Least squares slope per row over non-NaN values"""
+    valid = ~np.isnan(y)
+    n = valid.sum(axis=1)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    sum_x, sum_y = x.sum(axis=1), y.sum(axis=1)
+    denominator = n * (x ** 2).sum(axis=1) - sum_x ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * (x * y).sum(axis=1) - sum_x * sum_y) / denominator
+    return np.where(denominator != 0, slope, 0.0), sum_x, sum_y, n
+
+
+def batch_forecast(long_df, id_columns=None, weeks_ahead=3, window_size=4, alpha=0.3, beta=0.1):
+    """
+    Run the three algorithms for every series of a long-format frame
+
+    Same models as the single-series functions above, vectorized across
+    series with NumPy
+
+    Args:
+        long_df: DataFrame with id columns, 'Año', 'Semana' and 'Valor' (see kg_series_long)
+        id_columns: Columns that identify a series (default: all but Año/Semana/Valor)
+        weeks_ahead: Number of weeks to predict ahead
+        window_size: Size of moving average window
+        alpha: Smoothing parameter for level
+        beta: Smoothing parameter for trend
+
+    Returns:
+        Tidy DataFrame: id columns + ['Año', 'Semana', 'Paso', 'Algoritmo', 'Prediction']
+    """
+    if id_columns is None:
+        id_columns = [column for column in long_df.columns if column not in ('Año', 'Semana', 'Valor')]
+    output_columns = id_columns + ['Año', 'Semana', 'Paso', 'Algoritmo', 'Prediction']
+    if long_df.empty:
+        return pd.DataFrame(columns=output_columns)
+
+    ids, values, lengths, last_year, last_week = _series_matrix(long_df, id_columns)
+    n_series, width = values.shape
+    steps = np.arange(1, weeks_ahead + 1)
+    start = width - lengths  # First observed column of each series
+    rows = np.arange(n_series)
+
+    # Algorithm 1: moving average of the last window + slope of the last window
+    recent = values[:, -window_size:] if width else values
+    last_ma = np.nanmean(recent, axis=1) if width else np.zeros(n_series)
+    trend_ma, _, _, _ = _masked_slope(recent, np.arange(recent.shape[1], dtype=float)[None, :])
+    moving_average = last_ma[:, None] + trend_ma[:, None] * steps
+
+    # Algorithm 2: Holt smoothing, one time step for all series at once
+    first = np.clip(start, 0, max(width - 1, 0))
+    second = np.clip(start + 1, 0, max(width - 1, 0))
+    level = values[rows, first]
+    trend = np.where(lengths > 1, values[rows, second] - level, 0.0)
+    for t in range(width):
+        active = t > start
+        new_level = alpha * values[:, t] + (1 - alpha) * (level + trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+    smoothing = level[:, None] + trend[:, None] * steps
+
+    # Algorithm 3: linear regression over the whole series (time index 0..n-1)
+    time_index = np.arange(width, dtype=float)[None, :] - start[:, None]
+    slope, sum_x, sum_y, n = _masked_slope(values, time_index)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        intercept = np.where(n > 0, (sum_y - slope * sum_x) / n, 0.0)
+    regression = intercept[:, None] + slope[:, None] * (lengths[:, None] - 1 + steps)
+
+    # Next weeks (52 weeks per year, as in the single-series functions)
+    weeks = last_week[:, None] + steps
+    years = last_year[:, None] + (weeks - 1) // 52
+    weeks = (weeks - 1) % 52 + 1
+
+    frames = []
+    for algorithm, predictions in zip(ALGORITHMS, (moving_average, smoothing, regression)):
+        keep = lengths >= MIN_POINTS[algorithm]
+        if not keep.any():
+            continue
+        frame = ids[keep].loc[ids[keep].index.repeat(weeks_ahead)].reset_index(drop=True)
+        frame['Año'] = years[keep].ravel()
+        frame['Semana'] = weeks[keep].ravel()
+        frame['Paso'] = np.tile(steps, keep.sum())
+        frame['Algoritmo'] = algorithm
+        frame['Prediction'] = np.maximum(predictions[keep].ravel(), 0)  # Ensure non-negative
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=output_columns)
+    return pd.concat(frames, ignore_index=True)[output_columns]
+
+
+def forecast_kg_by_series(data, target_columns=['KG_PROCESADOS', 'KG_EXPORTABLES'], keys=SERIES_KEYS,
+                          weeks_ahead=3, week_column='Semana'):
+    """
+    Forecasts for every fundo/variety/company and KG metric
+
+    Returns:
+        Tidy DataFrame (see batch_forecast) with keys + 'Serie' as series id
+    """
+    long_df = kg_series_long(data, target_columns, keys, week_column)
+    id_columns = [key for key in keys if key in long_df.columns] + ['Serie']
+    return batch_forecast(long_df, id_columns, weeks_ahead)
+
+def forecast_kg_models(data, target_columns=['KG_PROCESADOS', 'KG_EXPORTABLES'], keys=SERIES_KEYS,
+                       weeks_ahead=3, model='prophet', week_column='Semana', cached_only=True):
+    """
+    Prophet / statsmodels forecasts for every series, from the forecasting service
+
+    Args:
+        model: 'prophet' or 'ets'
+        cached_only: Only return fitted forecasts (panels); series without a
+                     current fit are skipped until the nightly refit
+
+    Returns:
+        Tidy DataFrame: keys + 'Serie' + core.forecasting.FORECAST_COLUMNS
+    """
+    long_df = kg_series_long(data, target_columns, keys, week_column)
+    id_columns = [key for key in keys if key in long_df.columns] + ['Serie']
+    return forecast_service.forecast_frame(long_df, id_columns, weeks_ahead, model, cached_only=cached_only)
+
+def cached_model_predictions(data, target_column, keys=SERIES_KEYS, weeks_ahead=3, model='prophet',
+                             week_column='Semana'):
+    """
+    Totals of the cached per-series forecasts, in the format of create_prediction_chart
+
+    Only series with a current fit are included (see forecast_kg_models), and
+    the history is summed over the same series so both lines are comparable.
+    'data' must be the full dataset the nightly refit used, otherwise the data
+    hashes do not match and nothing is found in the cache.
+
+    Returns:
+        (historical DataFrame with 'Año', 'Semana' and target_column,
+         {target_column: {algorithm: DataFrame}}), or (empty DataFrame, {})
+    """
+    forecast = forecast_kg_models(data, [target_column], keys, weeks_ahead, model, week_column, cached_only=True)
+    if forecast.empty:
+        return pd.DataFrame(), {}
+
+    id_columns = [key for key in keys if key in forecast.columns]
+    long_df = kg_series_long(data, [target_column], keys, week_column)
+    fitted = forecast[id_columns].drop_duplicates()
+    history = long_df.merge(fitted, on=id_columns) if id_columns else long_df
+    historical = (
+        history.groupby(['Año', 'Semana'])['Valor'].sum().reset_index()
+        .rename(columns={'Valor': target_column})
+    )
+
+    totals = forecast.groupby(['Algoritmo', 'Año', 'Semana'])['Prediction'].sum().reset_index()
+    predictions = {
+        algorithm: group[['Año', 'Semana', 'Prediction']].assign(Algorithm=algorithm).reset_index(drop=True)
+        for algorithm, group in totals.groupby('Algoritmo')
+    }
+    return historical, {target_column: predictions}
+
 # Main function to run all algorithms
 def predict_kg_values(data, target_columns=['KG_PROCESADOS', 'KG_EXPORTABLES'], weeks_ahead=3):
     """
@@ -247,26 +494,33 @@ def predict_kg_values(data, target_columns=['KG_PROCESADOS', 'KG_EXPORTABLES'],
     Returns:
         Dictionary with predictions for each algorithm and column
     """
-    results = {}
-    
+    columns = []
     for column in target_columns:
         if column not in data.columns:
             print(f"Column {column} not found in data")
             continue
-            
-        column_results = {}
-        
-        # Run all algorithms
-        ma_predictions = simple_moving_average_prediction(data, column, weeks_ahead)
-        es_predictions = exponential_smoothing_prediction(data, column, weeks_ahead)
-        lr_predictions = linear_regression_prediction(data, column, weeks_ahead)
-        
-        # Store results
-        column_results['Moving Average + Trend'] = ma_predictions
-        column_results['Exponential Smoothing'] = es_predictions
-        column_results['Linear Regression'] = lr_predictions
-        
-        results[column] = column_results
+        columns.append(column)
+    if not columns:
+        return {}
+
+    # Each column is one series (rows are time points, as in the single-series functions)
+    long_df = data[['Año', 'Semana'] + columns].melt(
+        id_vars=['Año', 'Semana'], value_vars=columns, var_name='Serie', value_name='Valor'
+    )
+    forecast = batch_forecast(long_df, ['Serie'], weeks_ahead)
+
+    results = {}
+    for column in columns:
+        column_forecast = forecast[forecast['Serie'] == column]
+        results[column] = {}
+        for algorithm in ALGORITHMS:
+            predictions = column_forecast[column_forecast['Algoritmo'] == algorithm]
+            results[column][algorithm] = (
+                predictions[['Año', 'Semana', 'Prediction']]
+                .assign(Algorithm=algorithm)
+                .reset_index(drop=True)
+                if len(predictions) else pd.DataFrame()
+            )
     
     return results
 
@@ -308,6 +562,7 @@ def format_predictions_for_display(predictions_dict):
     return pd.DataFrame(all_predictions)
 
 # Function to create prediction chart
+@cached_figure("prediction_chart", as_figure=True)
 def create_prediction_chart(historical_data, predictions_dict, target_column):
     """
     Create a chart showing historical data and predictions
@@ -388,7 +643,8 @@ def create_prediction_chart(historical_data, predictions_dict, target_column):
             height=400
         )
         
-        return fig
+        # Historia larga: LTTB + Scattergl (las predicciones son cortas y no cambian)
+        return series_downsampler.downsample_figure(fig)
     
     except Exception as e:
         print(f"Error creating prediction chart: {e}")
@@ -0,0 +1,206 @@
+"""
+QR PDF - Hojas de etiquetas QR vectoriales
+Los QR se dibujan como trazos vectoriales (un rectángulo por tramo de
+módulos oscuros) en lugar de imágenes PNG. La codificación se reparte por
+bloques en el pool de procesos y las páginas se escriben en orden sobre un
+único canvas, directamente al archivo de destino (p. ej. la caché de
+artefactos, servida por /artifacts/<token>)
+"""
+import asyncio
+import tempfile
+import qrcode
+from typing import Callable, List, Optional, Tuple
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+
+from core.executor import process_executor
+
+CHUNK_SIZE = 2000          # Códigos por bloque enviado al pool
+SPOOL_MAX_SIZE = 32 * 1024 * 1024
+
+# Grillas disponibles (columnas, filas)
+GRID_PRESETS = {
+    "3x3": (3, 3),
+    "3x4": (3, 4),
+    "4x5": (4, 5),
+    "5x7": (5, 7),
+}
+
+EncodedQR = Tuple[int, List[Tuple[int, int, int]]]
+
+
+def encode_qr_runs(code: str, border: int = 2) -> EncodedQR:
+    """
+    Codifica un QR y lo reduce a tramos horizontales de módulos oscuros
+
+    Args:
+        code: Texto del código
+        border: Módulos de margen (zona silenciosa)
+
+    Returns:
+        (módulos por lado, [(fila, columna inicial, largo)])
+    """
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, border=border)
+    qr.add_data(code)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+
+    runs = []
+    for row_idx, row in enumerate(matrix):
+        col, size = 0, len(row)
+        while col < size:
+            if row[col]:
+                start = col
+                while col < size and row[col]:
+                    col += 1
+                runs.append((row_idx, start, col - start))
+            else:
+                col += 1
+    return len(matrix), runs
+
+
+def encode_chunk(codes: List[str]) -> List[EncodedQR]:
+    """Codifica un bloque de códigos (punto de entrada del pool de procesos)"""
+    return [encode_qr_runs(code) for code in codes]
+
+
+class QRSheetLayout:
+    """
+    Grilla de etiquetas por página
+
+    Args:
+        cols: Columnas por página
+        rows: Filas por página
+        pagesize: Tamaño de página (reportlab)
+        margin: Margen de la página en puntos
+        font_size: Tamaño del texto (por defecto según el alto de la celda)
+    """
+
+    def __init__(self, cols: int = 3, rows: int = 3, pagesize=A4, margin: float = 10 * mm,
+                 font_size: Optional[float] = None):
+        self.cols = cols
+        self.rows = rows
+        self.pagesize = pagesize
+        self.margin = margin
+
+        width, height = pagesize
+        self.cell_width = (width - 2 * margin) / cols
+        self.cell_height = (height - 2 * margin) / rows
+        self.font_size = font_size or max(6, min(12, self.cell_height / 8))
+        # Espacio entre QR y texto (5 mm con letra de 12 pt, como la grilla 3x3 original)
+        self.label_offset = 5 * mm * self.font_size / 12
+        self.qr_size = min(self.cell_width, self.cell_height - 3 * self.font_size) * 0.8
+
+    @classmethod
+    def from_preset(cls, name: str) -> "QRSheetLayout":
+        """Crea la grilla a partir de un nombre de GRID_PRESETS (3x3 por defecto)"""
+        cols, rows = GRID_PRESETS.get(name, GRID_PRESETS["3x3"])
+        return cls(cols, rows)
+
+    @property
+    def per_page(self) -> int:
+        return self.cols * self.rows
+
+    def cell_center(self, index: int) -> Tuple[float, float]:
+        """Centro de la celda index de la página (fila 0 arriba)"""
+        page_index = index % self.per_page
+        col_idx = page_index % self.cols
+        visual_row = page_index // self.cols
+        height = self.pagesize[1]
+        x_pos = self.margin + col_idx * self.cell_width
+        y_pos = height - self.margin - self.cell_height * (visual_row + 1)
+        return x_pos + self.cell_width / 2, y_pos + self.cell_height / 2
+
+
+class QRSheetRenderer:
+    """
+    Generador de PDFs de etiquetas QR
+
+    Args:
+        layout: Grilla de etiquetas
+        chunk_size: Códigos por bloque de codificación en el pool
+    """
+
+    def __init__(self, layout: Optional[QRSheetLayout] = None, chunk_size: int = CHUNK_SIZE):
+        self.layout = layout or QRSheetLayout()
+        self.chunk_size = chunk_size
+
+    async def _encode(self, codes: List[str], progress: Callable[[int, str], None]) -> List[EncodedQR]:
+        """Codifica los códigos por bloques en paralelo (resultado en orden)"""
+        chunks = [codes[i:i + self.chunk_size] for i in range(0, len(codes), self.chunk_size)]
+        if len(chunks) <= 1:
+            # Lotes pequeños: no compensa levantar el pool
+            return encode_chunk(codes)
+
+        results: List[Optional[List[EncodedQR]]] = [None] * len(chunks)
+
+        async def run_chunk(index: int, chunk: List[str]):
+            results[index] = await process_executor.run(encode_chunk, chunk)
+            done = sum(1 for r in results if r is not None)
+            progress(int(done * 50 / len(chunks)), f"Codificando {done} de {len(chunks)} bloques")
+
+        await asyncio.gather(*(run_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+        return [encoded for chunk in results for encoded in chunk]
+
+    def _draw_qr(self, c: canvas.Canvas, encoded: EncodedQR, x: float, y: float):
+        """Dibuja un QR como un único path de rectángulos"""
+        modules, runs = encoded
+        module = self.layout.qr_size / modules
+        top = y + self.layout.qr_size
+        path = c.beginPath()
+        for row, col, length in runs:
+            path.rect(x + col * module, top - (row + 1) * module, length * module, module)
+        c.drawPath(path, stroke=0, fill=1)
+
+    def render(self, codes: List[str], output, set_progress: Optional[Callable] = None):
+        """
+        Escribe el PDF en output (ruta o archivo binario)
+
+        Usa asyncio.run para el pool, por lo que se llama desde código síncrono
+        (background callbacks, rutas Flask)
+
+        Args:
+            codes: Códigos a imprimir
+            output: Ruta o archivo donde se escribe el PDF
+            set_progress: Función de progreso (porcentaje, texto), opcional
+        """
+        def progress(value: int, label: str):
+            if set_progress is not None:
+                set_progress((value, label))
+
+        encoded = asyncio.run(self._encode(codes, progress))
+
+        layout = self.layout
+        c = canvas.Canvas(output, pagesize=layout.pagesize, pageCompression=1)
+        c.setFillColorRGB(0, 0, 0)
+        total_pages = (len(codes) + layout.per_page - 1) // layout.per_page
+
+        for i, (code, qr_runs) in enumerate(zip(codes, encoded)):
+            center_x, center_y = layout.cell_center(i)
+            qr_x = center_x - layout.qr_size / 2
+            qr_y = center_y - layout.qr_size / 2 + layout.label_offset
+
+            self._draw_qr(c, qr_runs, qr_x, qr_y)
+            c.setFont("Helvetica", layout.font_size)
+            c.drawCentredString(center_x, qr_y - layout.label_offset, code)
+
+            if (i + 1) % layout.per_page == 0 or (i + 1) == len(codes):
+                c.showPage()
+                page = (i + 1 + layout.per_page - 1) // layout.per_page
+                if page % 10 == 0 or page == total_pages:
+                    progress(50 + int(page * 50 / total_pages), f"Página {page} de {total_pages}")
+
+        c.save()
+
+    def render_bytes(self, codes: List[str], set_progress: Optional[Callable] = None) -> bytes:
+        """PDF completo en memoria"""
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as buffer:
+            self.render(codes, buffer, set_progress)
+            buffer.seek(0)
+            return buffer.read()
+
+
+def generate_qr_sheet(codes: List[str], grid: str = "3x3", set_progress: Optional[Callable] = None) -> bytes:
+    """Función principal: PDF de etiquetas QR con la grilla indicada"""
+    return QRSheetRenderer(QRSheetLayout.from_preset(grid)).render_bytes(codes, set_progress)
@@ -90,3 +90,17 @@ def agrupador_costos_transform(df):
     df["AGRUPADOR"] = df["AGRUPADOR"].str.upper()
     df["SUB AGRUPADOR"] = df["SUB AGRUPADOR"].str.upper()
     return df
+
+
+def mayor_analitico_agrupado_transform(df):
+    df["Fecha"] = pd.to_datetime(df["Fecha"], errors='coerce')
+    df["Año"] = df["Fecha"].dt.year
+    df["Mes"] = df["Fecha"].dt.month
+    df["Semana"] = df["Fecha"].dt.isocalendar().week
+    df = df.groupby(['Año','Mes','Semana','Fecha','Cod. Proyecto', 'Descripción Proyecto','Descripción Actividad','AGRUPADOR', 'SUB AGRUPADOR',])[["Dólares Cargo"]].sum().reset_index()
+    return df
+
+
+def mayor_analitico_opex_agrupado_transform(df, agrupador_costos_df):
+    df = mayor_analitico_opex_transform(df, agrupador_costos_df)
+    return mayor_analitico_agrupado_transform(df)
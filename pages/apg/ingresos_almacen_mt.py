@@ -3,17 +3,18 @@ import dash
 import pandas as pd
 import dash_mantine_components as dmc
 from dash_iconify import DashIconify
-from dash import html, dcc, callback, Input, Output, State
+from dash import html, dcc, callback, Input, Output
 from components.grid import Row, Column
 from constants import PAGE_TITLE_PREFIX
 from helpers.helpers import generate_list_month
-from dash_ag_grid import AgGrid
 from helpers.get_sheets import read_sheet
-import time
 from datetime import datetime, timedelta
 from helpers.pdf_generator import generate_boleta_pdf
 import base64
 from helpers.files import *
+from core.dataset_store import dataset_store
+from core.exports import export_registry
+from core.grid_backend import grid_backend
 
 
 # 🚀 Configuraciones de rendimiento optimizadas
@@ -26,6 +27,7 @@ dash.register_page(__name__, "/apg/transform-materia-prima", title=PAGE_TITLE_PR
 app = dash.get_app()
 PAGE_ID = "transform-materia-prima-"
 DATA_SOURCE = "transform_materia_prima"
+CACHE_DURATION = 300  # 5 minutos
 
 
 
@@ -78,16 +80,32 @@ def create_custom_layout():
                         html.Div(id=f"{PAGE_ID}main-table"),
                     ]),
                     
+                    # Descargas directas desde /export (sin pasar por el JSON de Dash)
                     dmc.Group([
-                        dmc.Button(
-                            "DESCARGAR CSV", 
-                            id=f"{PAGE_ID}btn-csv", 
-                            color="blue", 
-                            variant="filled", 
-                            leftSection=DashIconify(icon="fluent:document_print"),
+                        dmc.Anchor(
+                            dmc.Button(
+                                "DESCARGAR CSV", 
+                                id=f"{PAGE_ID}btn-csv", 
+                                color="blue", 
+                                variant="filled", 
+                                leftSection=DashIconify(icon="fluent:document_print"),
+                            ),
+                            id=f"{PAGE_ID}link-csv",
+                            href=export_registry.url(DATA_SOURCE, "csv"),
+                            target="_blank",
+                        ),
+                        dmc.Anchor(
+                            dmc.Button(
+                                "DESCARGAR PARQUET", 
+                                id=f"{PAGE_ID}btn-parquet", 
+                                color="blue", 
+                                variant="outline", 
+                            ),
+                            id=f"{PAGE_ID}link-parquet",
+                            href=export_registry.url(DATA_SOURCE, "parquet"),
+                            target="_blank",
                         ),
                     ]),
-                    dcc.Download(id=f"{PAGE_ID}download-csv"),
                     
                     # Modal de Previsualización
                     dmc.Modal(
@@ -118,13 +136,68 @@ def create_custom_layout():
 
 layout = create_custom_layout()
 
+
+def load_ingresos_dataset() -> pd.DataFrame:
+    """
+    Dataset de cosecha en caché del servidor (compartido entre workers)
+
+    Se recarga desde OneDrive cuando la versión publicada tiene más de
+    CACHE_DURATION segundos
+    """
+    shared = dataset_store.open_fresh(DATA_SOURCE, CACHE_DURATION)
+    if shared is not None:
+        return shared["cosecha"]
+
+    df = load_data_cosecha_campo()
+    if not df.empty:
+        try:
+            dataset_store.publish(DATA_SOURCE, {"cosecha": df})
+        except Exception as e:
+            print(f"⚠️ No se pudo publicar el dataset compartido: {e}")
+    return df
+
+
+def filter_ingresos(df: pd.DataFrame, fecha=None, subsidiaria=None) -> pd.DataFrame:
+    """
+    Filtros de la tabla y de las descargas
+
+    Args:
+        df: Dataset de cosecha (FECHA como texto dd/mm/yyyy)
+        fecha: Fecha seleccionada (YYYY-MM-DD)
+        subsidiaria: Subsidiaria seleccionada
+    """
+    mask = pd.Series(True, index=df.index)
+    if fecha and "FECHA" in df.columns:
+        try:
+            mask &= df["FECHA"] == pd.to_datetime(fecha).strftime('%d/%m/%Y')
+        except (ValueError, TypeError) as e:
+            print(f"Error filtering date: {e}")
+    if subsidiaria and "SUBSIDIARIA" in df.columns:
+        mask &= df["SUBSIDIARIA"] == subsidiaria
+    return df[mask]
+
+
+# /export/transform_materia_prima.csv?fecha=...&subsidiaria=...
+export_registry.register(
+    DATA_SOURCE,
+    load_ingresos_dataset,
+    filters=lambda df, params: filter_ingresos(df, params.get("fecha"), params.get("subsidiaria")),
+    filename="ingresos_almacen",
+    version=lambda: dataset_store.current_version(DATA_SOURCE),
+)
+
+
 @callback(
     Output(f"{PAGE_ID}dates-store", "data"),
     Input(f"{PAGE_ID}loading-trigger", "data")
 )
 def load_data_to_store(_):
-    df = load_data_cosecha_campo()
-    return df.to_dict('records')
+    # Sólo versión y opciones de filtro: las filas quedan en el servidor
+    df = load_ingresos_dataset()
+    if df.empty:
+        return {}
+    subsidiarias = sorted(df["SUBSIDIARIA"].dropna().unique().astype(str)) if "SUBSIDIARIA" in df.columns else []
+    return {"version": dataset_store.current_version(DATA_SOURCE), "subsidiarias": subsidiarias}
 
 @callback(
     Output(f"{PAGE_ID}loading-indicator", "style"),
@@ -142,11 +215,7 @@ def toggle_loading_indicator(data):
 def update_subsidiaria_options(data):
     if not data:
         return []
-    df = pd.DataFrame(data)
-    if "SUBSIDIARIA" in df.columns:
-        unique_vals = sorted(df["SUBSIDIARIA"].dropna().unique().astype(str))
-        return [{"label": val, "value": val} for val in unique_vals]
-    return []
+    return [{"label": val, "value": val} for val in data.get("subsidiarias", [])]
 
 @callback(
     Output(f"{PAGE_ID}main-table", "children"),
@@ -158,28 +227,13 @@ def update_table(data, start_date, subsidiarias):
     if not data:
         return html.Div()
     
-    df = pd.DataFrame(data)
-    
-    # Filtrar por fecha
-    if start_date and "FECHA" in df.columns:
-        try:
-            df_temp = df.copy()
-            df_temp["FECHA_DT"] = pd.to_datetime(df_temp["FECHA"], format='%d/%m/%Y', errors='coerce')
-            start_date_dt = pd.to_datetime(start_date)
-            
-            if start_date_dt is not None:
-                 df = df[df_temp["FECHA_DT"] == start_date_dt]
-        except Exception as e:
-            print(f"Error filtering date: {e}")
-            
-    # Filtrar por destinatario
-    if subsidiarias and "SUBSIDIARIA" in df.columns:
-        df = df[df["SUBSIDIARIA"] == subsidiarias]
-
-    return AgGrid(
-            id=f"{PAGE_ID}main-ag-grid",
-            rowData=df.to_dict('records'),
-            columnDefs=[{"field": x} for x in df.columns],
+    df = filter_ingresos(load_ingresos_dataset(), start_date, subsidiarias)
+
+    # Filas servidas por bloques desde el servidor (infinite row model)
+    return grid_backend.create_grid(
+            f"{PAGE_ID}main-ag-grid",
+            df,
+            column_defs=[{"field": x} for x in df.columns],
             columnSize="sizeToFit",
             
             dashGridOptions={
@@ -194,34 +248,17 @@ def update_table(data, start_date, subsidiarias):
             className="ag-theme-quartz compact", 
         )
 
+grid_backend.register_callback(f"{PAGE_ID}main-ag-grid")
+
 @callback(
-    Output(f"{PAGE_ID}download-csv", "data"),
-    Input(f"{PAGE_ID}btn-csv", "n_clicks"),
-    State(f"{PAGE_ID}dates-store", "data"),
-    State(f"{PAGE_ID}date-filter", "value"),
-    State(f"{PAGE_ID}subsidiaria-filter", "value"),
-    prevent_initial_call=True
+    Output(f"{PAGE_ID}link-csv", "href"),
+    Output(f"{PAGE_ID}link-parquet", "href"),
+    Input(f"{PAGE_ID}date-filter", "value"),
+    Input(f"{PAGE_ID}subsidiaria-filter", "value"),
 )
-def download_csv(n_clicks, data, start_date, subsidiaria):
-    if not n_clicks or not data:
-        return None
-    
-    df = pd.DataFrame(data)
-    
-    # Aplicar mismos filtros que la tabla
-    if start_date and "FECHA" in df.columns:
-        try:
-            df_temp = df.copy()
-            df_temp["FECHA_DT"] = pd.to_datetime(df_temp["FECHA"], format='%d/%m/%Y', errors='coerce')
-            start_date_dt = pd.to_datetime(start_date)
-            
-            if start_date_dt is not None:
-                 df = df[df_temp["FECHA_DT"] == start_date_dt]
-        except Exception as e:
-            print(f"Error filtering date in download: {e}")
-            
-    if subsidiaria and "SUBSIDIARIA" in df.columns:
-        df = df[df["SUBSIDIARIA"] == subsidiaria]
-
-    return dcc.send_data_frame(df.to_csv, f"ingresos_almacen_{int(time.time())}.csv", sep=";", index=False)
-
+def update_download_links(start_date, subsidiaria):
+    """Enlaces de descarga con los mismos filtros que la tabla"""
+    return (
+        export_registry.url(DATA_SOURCE, "csv", fecha=start_date, subsidiaria=subsidiaria),
+        export_registry.url(DATA_SOURCE, "parquet", fecha=start_date, subsidiaria=subsidiaria),
+    )
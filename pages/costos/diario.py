@@ -1,21 +1,29 @@
 from types import NoneType
 import asyncio
 import dash
+from datetime import datetime
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import dash_mantine_components as dmc
-from dash import html, dcc, callback, Input, Output, State, ClientsideFunction
+from dash import html, dcc, callback, clientside_callback, Input, Output, State, ClientsideFunction
 from components.grid import Row, Column
 from components.simple_components import create_page_header
 from constants import PAGE_TITLE_PREFIX
 from helpers.helpers import generate_list_month,get_download_url_by_name,dataframe_filtro
 from helpers.get_api import listar_archivos_en_carpeta_compartida
 from helpers.get_token import get_access_token_packing
-from dash_ag_grid import AgGrid
 from helpers.transform.costos import mayor_analitico_opex_transform,presupuesto_packing_transform,agrupador_costos_transform
 from helpers.get_sheets import read_sheet
+from helpers.excel_export import write_excel
 from helpers.transform.procesos_packing import reporte_produccion_costos_transform
+from core.dtypes import read_excel, to_records
+from core.executor import process_executor
+from core.grid_backend import grid_backend
+from core.figure_cache import figure_cache, cached_figure, frames_version, build_view, VERSION_KEY, VIEW_KEY
+from core.snapshots import dataset_snapshots
+from core.dataset_store import dataset_store
+from core.background import background_jobs, background_manager, stage_progress
 
 # 🚀 Configuraciones de rendimiento
 pd.options.mode.chained_assignment = None  # Evitar warnings de SettingWithCopyWarning
@@ -51,22 +59,15 @@ DATA_SOURCE = "costos_diarios"
 # Configuración para generate_list_month
 START_YEAR = 2025  # Año desde cuando generar opciones
 START_MONTH = 1    # Mes desde cuando generar opciones
-
-# 🗄️ Cache global para datos
-_data_cache = {
-    "data": None,
-    "last_loaded": None,
-    "cache_duration": 300  # 5 minutos en segundos
+# Filtrado en el navegador hasta este número de filas; por encima se filtra en el servidor
+CLIENTSIDE_FILTER_CONFIG = {
+    "max_rows": 50000,
+    "keys": ["Mayor Analitico", "Reporte Produccion", "Presupuesto Packing"],
 }
 
-def is_cache_valid():
-    """Verificar si el caché es válido"""
-    if _data_cache["data"] is None or _data_cache["last_loaded"] is None:
-        return False
-    
-    from datetime import datetime, timedelta
-    cache_age = datetime.now() - _data_cache["last_loaded"]
-    return cache_age.total_seconds() < _data_cache["cache_duration"]
+# 🗄️ Vigencia del dataset compartido (segundos); los datos viven en dataset_store
+CACHE_DURATION = 300  # 5 minutos
+FRAME_NAMES = ("Mayor Analitico", "Presupuesto Packing", "Reporte Produccion")
 
 def create_custom_layout():
     """Layout personalizado con stores para filtros dependientes"""
@@ -77,10 +78,22 @@ def create_custom_layout():
             dcc.Store(id=f"{PAGE_ID}dates-store"),      # Para datos de fechas generados
             dcc.Store(id=f"{PAGE_ID}raw-data-store"),   # Para datos crudos (carga única)
             dcc.Store(id=f"{PAGE_ID}filtered-data-store"), # Para datos filtrados
+            dcc.Store(id=f"{PAGE_ID}filter-request-store"), # Solicitud de filtrado en servidor (datos grandes)
+            dcc.Store(id=f"{PAGE_ID}filter-config-store", data=CLIENTSIDE_FILTER_CONFIG),
             dcc.Store(id=f"{PAGE_ID}cache-store"),      # Para cache de archivos cargados
             dcc.Store(id=f"{PAGE_ID}loading-trigger", data="init"),   # Para trigger de carga inicial
             dcc.Store(id=f"{PAGE_ID}modal-data-store"), # Para datos del modal
         ]),
+        # ⏳ Progreso de la carga en segundo plano
+        html.Div(
+            id=f"{PAGE_ID}load-progress-container",
+            style={"display": "none"},
+            children=dmc.Group([
+                dmc.Progress(id=f"{PAGE_ID}load-progress", value=0, striped=True, animated=True, style={"flex": 1}),
+                dmc.Text(id=f"{PAGE_ID}load-progress-label", size="sm", c="dimmed"),
+                dmc.Button("Cancelar", id=f"{PAGE_ID}cancel-load-btn", size="xs", variant="subtle", color="red"),
+            ], gap="sm", my="sm"),
+        ),
         
         # 📊 Header personalizado
         dmc.Container([
@@ -281,32 +294,58 @@ layout = create_custom_layout()
 # CALLBACKS OPTIMIZADOS PARA EFICIENCIA
 # ============================================================
 
-# 1. 🔄 Callback para carga inicial única de TODOS los archivos
-@callback(
-    [
-        Output(f"{PAGE_ID}raw-data-store", "data"),
-        Output(f"{PAGE_ID}cache-store", "data"),
-    ],
-    Input(f"{PAGE_ID}loading-trigger", "id"),  # Se dispara una sola vez al cargar
-    prevent_initial_call=False
-)
-async def load_all_data_once(_):
-  
+def build_raw_data():
+    """
+    Payload del raw-data-store construido en cada solicitud desde el dataset
+    compartido (mmap); no se guarda en el proceso
+    """
+    with dataset_store.reading(DATA_SOURCE) as (version, frames):
+        if frames is None:
+            return {}
+        all_data = {name: to_records(frames[name]) for name in FRAME_NAMES}
+    
+    # 🔖 Versión de contenido (invalida las figuras cacheadas si cambian los datos)
+    content_version = (dataset_store.get_meta(DATA_SOURCE, version) or {}).get("content_version", version)
+    all_data[VERSION_KEY] = {"dataset": DATA_SOURCE, "version": content_version}
+    figure_cache.set_dataset_version(DATA_SOURCE, content_version)
+    return all_data
+
+
+def dataset_info(version, from_cache):
+    """Contenido del cache-store: puntero a la versión publicada"""
+    meta = dataset_store.get_meta(DATA_SOURCE, version) or {}
+    loaded_at = datetime.fromtimestamp(meta.get("published_at", 0)).isoformat()
+    return {"version": version, "loaded_at": loaded_at, "files": [], "from_cache": from_cache}
+
+
+# 1. 🔄 Carga inicial única de TODOS los archivos
+async def load_all_data(set_progress=None):
+    """
+    Carga, transforma y publica todos los archivos en dataset_store
+    (token → listado → descarga → lectura → transformación)
+
+    Returns:
+        Puntero a la versión publicada (ver dataset_info) o {"error": ...}
+    """
+    progress = stage_progress(set_progress)
     try:
         print("🚀 Iniciando carga única de datos...")
         
-        # 🗄️ Verificar caché primero
-        if is_cache_valid():
-            print("✅ Usando datos del caché")
-            cache_info = {"loaded_at": _data_cache["last_loaded"].isoformat(), "files": [], "from_cache": True}
-            return _data_cache["data"], cache_info
+        # 📦 Dataset vigente publicado por otro worker (Arrow mmap, sin descargar)
+        version = dataset_store.fresh_version(DATA_SOURCE, CACHE_DURATION)
+        if version is not None:
+            print("✅ Usando dataset compartido")
+            progress("done")
+            return dataset_info(version, from_cache=True)
         
-        print("🔄 Caché expirado o no disponible, cargando datos frescos...")
+        print("🔄 Dataset expirado o no disponible, cargando datos frescos...")
         
         # 🔑 Obtener token una sola vez
+        progress("token")
         access_token = await asyncio.to_thread(get_access_token_packing)
         
         # 📁 Listar archivos una sola vez
+        progress("listing")
         files_data = await asyncio.to_thread(
             listar_archivos_en_carpeta_compartida,
             access_token,
@@ -316,14 +355,15 @@ async def load_all_data_once(_):
         
         # 📊 Cargar todos los archivos en paralelo (MUY EFICIENTE)
         print("📥 Iniciando carga paralela de archivos...")
+        progress("download")
         
         # Crear tareas para carga paralela
         async def load_excel_file(filename, sheet_name=None):
             url = await asyncio.to_thread(get_download_url_by_name, files_data, filename)
             if sheet_name:
-                return await asyncio.to_thread(pd.read_excel, url, sheet_name=sheet_name)
+                return await process_executor.run(read_excel, url, sheet_name=sheet_name)
             else:
-                return await asyncio.to_thread(pd.read_excel, url)
+                return await process_executor.run(read_excel, url)
         
         # Cargar archivos Excel en paralelo
         mayor_analitico_task = load_excel_file("Mayor Analitico.xlsx")
@@ -338,6 +378,7 @@ async def load_all_data_once(_):
         )
         
         print("✅ Archivos Excel cargados en paralelo")
+        progress("parse")
         
         # 📊 Cargar Google Sheets (esto es más rápido)
         print("📊 Cargando datos de Google Sheets...")
@@ -347,11 +388,12 @@ async def load_all_data_once(_):
         
         # 🔄 Transformar datos en paralelo
         print("🔄 Transformando datos...")
+        progress("transform")
         
-        # Ejecutar transformaciones en paralelo
-        presupuesto_task = asyncio.to_thread(presupuesto_packing_transform, presupuesto_packing_df)
-        ma_task = asyncio.to_thread(mayor_analitico_opex_transform, mayor_analitico_df, agrupador_costos_df)
-        agrupador_task = asyncio.to_thread(agrupador_costos_transform, agrupador_costos_df)
+        # Ejecutar transformaciones en paralelo (pool de procesos, fallback a hilos)
+        presupuesto_task = process_executor.run(presupuesto_packing_transform, presupuesto_packing_df)
+        ma_task = process_executor.run(mayor_analitico_opex_transform, mayor_analitico_df, agrupador_costos_df)
+        agrupador_task = process_executor.run(agrupador_costos_transform, agrupador_costos_df)
         
         presupuesto_packing_df, ma_df, agrupador_costos_df = await asyncio.gather(
             presupuesto_task, ma_task, agrupador_task
@@ -379,44 +421,85 @@ async def load_all_data_once(_):
         
         print(f"📊 Datos cargados - Reporte Producción: {len(df_rp)} filas")
         
-        # 📦 Preparar datos para retorno
-        all_data = {
-            "Mayor Analitico": ma_df.to_dict('records'),
-            "Presupuesto Packing": presupuesto_packing_df.to_dict('records'),
-            "Reporte Produccion": df_rp.to_dict('records')
-        }
-        
-        # 🗄️ Actualizar caché
-        from datetime import datetime
-        _data_cache["data"] = all_data
-        _data_cache["last_loaded"] = datetime.now()
+        # 📦 Publicar para todos los workers (única copia en el servidor)
+        frames = dict(zip(FRAME_NAMES, (ma_df, presupuesto_packing_df, df_rp)))
+        version = await asyncio.to_thread(
+            dataset_store.publish, DATA_SOURCE, frames,
+            {"content_version": frames_version(*frames.values())}
+        )
         
         # 🧹 Limpiar memoria
-        del ma_df, mayor_analitico_df, agrupador_costos_df, presupuesto_packing_df
+        del frames, ma_df, mayor_analitico_df, agrupador_costos_df, presupuesto_packing_df
         
-        cache_info = {"loaded_at": _data_cache["last_loaded"].isoformat(), "files": [], "from_cache": False}
         print("✅ Carga de datos completada exitosamente")
-        
-        return all_data, cache_info
+        progress("done")
+        return dataset_info(version, from_cache=False)
         
     except Exception as e:
         print(f"🚨 Error en carga inicial: {e}")
-        return {}, {"error": str(e)}
+        return {"error": str(e)}
 
 
-# 2. 🎯 Callback para filtrado LOCAL eficiente (sin llamadas API)
+# Carga en segundo plano: no ocupa el worker web, reporta progreso y se puede cancelar
 @callback(
-    Output(f"{PAGE_ID}filtered-data-store", "data"),
+    [
+        Output(f"{PAGE_ID}raw-data-store", "data"),
+        Output(f"{PAGE_ID}cache-store", "data"),
+    ],
+    Input(f"{PAGE_ID}loading-trigger", "id"),  # Se dispara una sola vez al cargar
+    background=True,
+    manager=background_manager,
+    progress=[
+        Output(f"{PAGE_ID}load-progress", "value"),
+        Output(f"{PAGE_ID}load-progress-label", "children"),
+    ],
+    running=[
+        (Output(f"{PAGE_ID}load-progress-container", "style"), {"display": "block"}, {"display": "none"}),
+    ],
+    cancel=[Input(f"{PAGE_ID}cancel-load-btn", "n_clicks")],
+    prevent_initial_call=False
+)
+def load_all_data_once(set_progress, _):
+    # Usuarios simultáneos comparten una sola descarga; sólo se comparte el puntero
+    cache_info = background_jobs.single_flight(
+        f"{DATA_SOURCE}:load", load_all_data,
+        set_progress=set_progress,
+        ttl=CACHE_DURATION,
+        should_cache=lambda info: "error" not in info
+    )
+    if "error" in cache_info:
+        return {}, cache_info
+    return build_raw_data(), cache_info
+
+# Precarga antes del fork de los workers (ver core/snapshots.py)
+dataset_snapshots.register(DATA_SOURCE, load_all_data)
+
+
+# 2. 🎯 Filtrado en el navegador; si los datos superan max_rows se delega al servidor
+clientside_callback(
+    ClientsideFunction(namespace="filters", function_name="filter_period"),
+    [
+        Output(f"{PAGE_ID}filtered-data-store", "data"),
+        Output(f"{PAGE_ID}filter-request-store", "data"),
+    ],
     [
         Input(f"{PAGE_ID}year", "value"),
         Input(f"{PAGE_ID}month", "value"),
         Input(f"{PAGE_ID}raw-data-store", "data")
-        #Input(f"{PAGE_ID}week", "value")
     ],
-    #State(f"{PAGE_ID}raw-data-store", "data"),
-    #prevent_initial_call=False  # Cargar datos inicialmente sin filtros
+    State(f"{PAGE_ID}filter-config-store", "data"),
 )
-def filter_data_locally(year, month, raw_data):
+
+# Fallback en servidor para datos grandes (sin llamadas API)
+@callback(
+    Output(f"{PAGE_ID}filtered-data-store", "data", allow_duplicate=True),
+    Input(f"{PAGE_ID}filter-request-store", "data"),
+    State(f"{PAGE_ID}raw-data-store", "data"),
+    prevent_initial_call=True
+)
+def filter_data_locally(filter_request, raw_data):
+        year = (filter_request or {}).get("year")
+        month = (filter_request or {}).get("month")
         print(f"🔍 Filtros recibidos - Año: {year} (tipo: {type(year)}), Mes: {month} (tipo: {type(month)})")
         
         if not raw_data:
@@ -498,6 +581,9 @@ def filter_data_locally(year, month, raw_data):
             "Reporte Produccion": reporte_produccion_df.to_dict('records') if not reporte_produccion_df.empty else [],
             "Presupuesto Packing": presupuesto_packing_df.to_dict('records') if not presupuesto_packing_df.empty else []
         }
+        view = build_view(raw_data, year, month)
+        if view:
+            all_data_dict[VIEW_KEY] = view
         
         # 🧹 Limpiar memoria
         del mayor_analitico_df, reporte_produccion_df, presupuesto_packing_df
@@ -514,6 +600,7 @@ def filter_data_locally(year, month, raw_data):
     Input(f"{PAGE_ID}filtered-data-store", "data"),
     prevent_initial_call=False
 )
+@cached_figure(f"{DATA_SOURCE}.update_graph")
 def update_graph(data_dict):
     print(f"📊 Actualizando gráfico 1 con datos: {len(data_dict) if data_dict else 0} datasets")
     
@@ -633,6 +720,7 @@ def update_graph(data_dict):
     Input(f"{PAGE_ID}filtered-data-store", "data"),
     prevent_initial_call=False
 )
+@cached_figure(f"{DATA_SOURCE}.update_graph2")
 def update_graph2(data_dict):
     print(f"📊 Actualizando gráfico 2 con datos: {len(data_dict) if data_dict else 0} datasets")
     
@@ -926,7 +1014,7 @@ def export_modal_data(n_clicks, modal_data):
                 filename = f"detalles_{clicked_value.replace(' ', '_')}_{timestamp}.xlsx"
                 
                 # Exportar a Excel
-                export_data.to_excel(filename, index=False, engine='openpyxl')
+                write_excel(export_data, filename, sheet_name='Detalle')
                 
                 print(f"✅ Datos exportados a: {filename}")
                 
@@ -1126,13 +1214,12 @@ def update_main_table(filtered_data):
             }
         ]
         
-        # Crear AG Grid
-        return AgGrid(
-            id=f"{PAGE_ID}main-ag-grid",
-            rowData=table_data.to_dict('records'),
-            columnDefs=column_defs,
+        # Crear AG Grid (filas servidas por bloques desde el servidor)
+        return grid_backend.create_grid(
+            f"{PAGE_ID}main-ag-grid",
+            table_data,
+            column_defs=column_defs,
             dashGridOptions={
-                "domLayout": "autoHeight",
                 "rowSelection": "single",
                 "animateRows": True,
                 "pagination": True,
@@ -1242,6 +1329,7 @@ def handle_table_actions(refresh_clicks, export_clicks, stats_clicks):
     
     return "", "", "green", "hide"
 
+@cached_figure(f"{DATA_SOURCE}.modal_graph", as_figure=True)
 def create_modal_graph(clicked_value, filtered_data, graph_id):
     """Crea un gráfico detallado para el modal"""
     try:
@@ -1377,8 +1465,6 @@ def create_modal_table(clicked_value, filtered_data, graph_id):
                     summary_data = summary_data.sort_values('Total', ascending=False)
                     
                     # Crear tabla con Dash AG Grid
-                    from dash_ag_grid import AgGrid
-                    
                     column_defs = [
                         {"headerName": "Proyecto", "field": "Proyecto", "sortable": True, "filter": True, "resizable": True},
                         {"headerName": "Mes", "field": "Mes", "sortable": True, "filter": True, "resizable": True},
@@ -1387,11 +1473,10 @@ def create_modal_table(clicked_value, filtered_data, graph_id):
                         {"headerName": "Registros", "field": "Cantidad_Registros", "sortable": True, "filter": True, "resizable": True}
                     ]
                     
-                    return AgGrid(
-                        id=f"{PAGE_ID}modal-ag-grid",
-                        rowData=summary_data.to_dict('records'),
-                        columnDefs=column_defs,
-                        dashGridOptions={"domLayout": "autoHeight"},
+                    return grid_backend.create_grid(
+                        f"{PAGE_ID}modal-ag-grid",
+                        summary_data,
+                        column_defs=column_defs,
                         style={"height": "300px", "width": "100%"}
                     )
         
@@ -1409,8 +1494,6 @@ def create_modal_table(clicked_value, filtered_data, graph_id):
                     detail_data = detail_data.sort_values('Dólares Cargo', ascending=False)
                     
                     # Crear tabla con Dash AG Grid
-                    from dash_ag_grid import AgGrid
-                    
                     column_defs = [
                         {"headerName": "Proyecto", "field": "Descripción Proyecto", "sortable": True, "filter": True, "resizable": True},
                         {"headerName": "Actividad", "field": "Descripción Actividad", "sortable": True, "filter": True, "resizable": True},
@@ -1419,11 +1502,11 @@ def create_modal_table(clicked_value, filtered_data, graph_id):
                         {"headerName": "Fecha", "field": "Fecha", "sortable": True, "filter": True, "resizable": True}
                     ]
                     
-                    return AgGrid(
-                        id=f"{PAGE_ID}modal-ag-grid",
-                        rowData=detail_data.to_dict('records'),
-                        columnDefs=column_defs,
-                        dashGridOptions={"domLayout": "autoHeight"},
+                    # Detalle del libro: filas servidas por bloques desde el servidor
+                    return grid_backend.create_grid(
+                        f"{PAGE_ID}modal-detail-ag-grid",
+                        detail_data,
+                        column_defs=column_defs,
                         style={"height": "300px", "width": "100%"}
                     )
         
@@ -1432,4 +1515,9 @@ def create_modal_table(clicked_value, filtered_data, graph_id):
         
     except Exception as e:
         print(f"❌ Error creando tabla del modal: {e}")
-        return dmc.Text("Error al crear tabla de datos", c="red", ta="center")
\ No newline at end of file
+        return dmc.Text("Error al crear tabla de datos", c="red", ta="center")
+
+
+grid_backend.register_callback(f"{PAGE_ID}main-ag-grid")
+grid_backend.register_callback(f"{PAGE_ID}modal-ag-grid")
+grid_backend.register_callback(f"{PAGE_ID}modal-detail-ag-grid")
@@ -1,23 +1,36 @@
 import asyncio
 import dash
+from datetime import datetime
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import dash_mantine_components as dmc
 from dash_iconify import DashIconify
-from dash import html, dcc, callback, Input, Output, State, ClientsideFunction, Patch, ALL, no_update
+from dash import html, dcc, callback, clientside_callback, ctx, Input, Output, State, ClientsideFunction, Patch, ALL, no_update
 from components.grid import Row, Column
 from components.simple_components import create_page_header
 from constants import PAGE_TITLE_PREFIX
 from helpers.helpers import generate_list_month,get_download_url_by_name,dataframe_filtro
 from helpers.get_api import listar_archivos_en_carpeta_compartida
 from helpers.get_token import get_access_token
-from dash_ag_grid import AgGrid
-from helpers.transform.costos import mayor_analitico_opex_transform,presupuesto_packing_transform,agrupador_costos_transform
+from helpers.transform.costos import presupuesto_packing_transform,agrupador_costos_transform
 from helpers.get_sheets import read_sheet
 from helpers.transform.procesos_packing import *
-from helpers.prediction_models import predict_kg_values, format_predictions_for_display, create_prediction_chart
+from helpers.prediction_models import cached_model_predictions, create_prediction_chart
 from helpers.pdf_generator import create_pdf_from_dashboard_data
+from helpers.pdf_tables import build_table_flowables
+from core.dtypes import read_excel, to_numpy_frame
+from core.executor import process_executor
+from core.incremental_ledger import mayor_analitico_ledger, source_tag
+from core.payload import encode_frame, decode_frame
+from core.figure_patch import frame_traces_patch
+from core.figure_cache import figure_cache, cached_figure, frames_version, build_view, VERSION_KEY, VIEW_KEY
+from core.snapshots import dataset_snapshots
+from core.dataset_store import dataset_store
+from core.background import background_jobs, background_manager, stage_progress
+from core.artifacts import artifact_store, artifact_key
+from core.chart_renderer import chart_renderer
+from core.grid_backend import grid_backend
 
 # 🚀 Configuraciones de rendimiento
 pd.options.mode.chained_assignment = None  # Evitar warnings de SettingWithCopyWarning
@@ -39,25 +52,19 @@ dash.register_page(__name__, "/costos-comparativo", title=PAGE_TITLE_PREFIX + "C
 app = dash.get_app()
 PAGE_ID = "costos-comparativo-"
 DATA_SOURCE = "costos_comparativo"
+REPORT_TEMPLATE_VERSION = "1"  # Cambiar al modificar el diseño del reporte PDF
 # Configuración para generate_list_month
 START_YEAR = 2025  # Año desde cuando generar opciones
 START_MONTH = 1  
-
-# 🗄️ Cache global para datos
-_data_cache = {
-    "data": None,
-    "last_loaded": None,
-    "cache_duration": 300  # 5 minutos en segundos
+# Filtrado en el navegador hasta este número de filas; por encima se filtra en el servidor
+CLIENTSIDE_FILTER_CONFIG = {
+    "max_rows": 50000,
+    "keys": ["Mayor Analitico", "Reporte Produccion", "Presupuesto Packing"],
 }
 
-def is_cache_valid():
-    """Verificar si el caché es válido"""
-    if _data_cache["data"] is None or _data_cache["last_loaded"] is None:
-        return False
-    
-    from datetime import datetime, timedelta
-    cache_age = datetime.now() - _data_cache["last_loaded"]
-    return cache_age.total_seconds() < _data_cache["cache_duration"]
+# 🗄️ Vigencia del dataset compartido (segundos); los datos viven en dataset_store
+CACHE_DURATION = 300  # 5 minutos
+FRAME_NAMES = ("Mayor Analitico", "Presupuesto Packing", "Reporte Produccion", "KG Presupuesto Packing")
 
 def costos_comparativo_layout():
     return dmc.Container(
@@ -66,10 +73,23 @@ def costos_comparativo_layout():
             dcc.Store(id=f"{PAGE_ID}dates-store"),      # Para datos de fechas generados
             dcc.Store(id=f"{PAGE_ID}raw-data-store"),   # Para datos crudos (carga única)
             dcc.Store(id=f"{PAGE_ID}filtered-data-store"), # Para datos filtrados
+            dcc.Store(id=f"{PAGE_ID}filter-request-store"), # Solicitud de filtrado en servidor (datos grandes)
+            dcc.Store(id=f"{PAGE_ID}filter-config-store", data=CLIENTSIDE_FILTER_CONFIG),
             dcc.Store(id=f"{PAGE_ID}cache-store"),      # Para cache de archivos cargados
             dcc.Store(id=f"{PAGE_ID}loading-trigger", data="init"),   # Para trigger de carga inicial
             dcc.Store(id=f"{PAGE_ID}modal-data-store"), # Para datos del modal
+            dcc.Store(id=f"{PAGE_ID}bar-comparativo-state"), # Estructura del gráfico ya enviada (para Patch)
         ]),
+        # ⏳ Progreso de la carga en segundo plano
+        html.Div(
+            id=f"{PAGE_ID}load-progress-container",
+            style={"display": "none"},
+            children=dmc.Group([
+                dmc.Progress(id=f"{PAGE_ID}load-progress", value=0, striped=True, animated=True, style={"flex": 1}),
+                dmc.Text(id=f"{PAGE_ID}load-progress-label", size="sm", c="dimmed"),
+                dmc.Button("Cancelar", id=f"{PAGE_ID}cancel-load-btn", size="xs", variant="subtle", color="red"),
+            ], gap="sm", my="sm"),
+        ),
             dmc.Container([
                 Row([
                     Column([
@@ -156,6 +176,32 @@ def costos_comparativo_layout():
                         ],withBorder=True,shadow="sm",radius="md",p=0,style={"position": "static"})
                     ],size=6),
                     
+                ]),
+                # 🔮 Pronósticos por semana (caché del reajuste nocturno)
+                Row([
+                    Column([
+                        dmc.Card([
+                            dmc.Group([
+                                dmc.SegmentedControl(
+                                    id=f"{PAGE_ID}segmented-prediction-target",
+                                    value="KG_PROCESADOS",
+                                    data=[
+                                        {"value": "KG_PROCESADOS", "label": "Kg Procesados"},
+                                        {"value": "KG_EXPORTABLES", "label": "Kg Exportables"},
+                                    ],
+                                ),
+                                dmc.SegmentedControl(
+                                    id=f"{PAGE_ID}segmented-prediction-model",
+                                    value="prophet",
+                                    data=[
+                                        {"value": "prophet", "label": "Prophet"},
+                                        {"value": "ets", "label": "ETS"},
+                                    ],
+                                ),
+                            ], mb=10),
+                            dcc.Graph(id=f"{PAGE_ID}prediction-chart")
+                        ],withBorder=True,shadow="sm",radius="md",p="sm",mt="md")
+                    ],size=12),
                 ])
             
         ],fluid=True),
@@ -349,31 +395,58 @@ def costos_comparativo_layout():
 
 layout = costos_comparativo_layout()
 
-@callback(
-    [
-        Output(f"{PAGE_ID}raw-data-store", "data"),
-        Output(f"{PAGE_ID}cache-store", "data"),
-    ],
-    Input(f"{PAGE_ID}loading-trigger", "id"),  # Se dispara una sola vez al cargar
-    prevent_initial_call=False
-)
-async def load_all_data_once(_):
-  
+
+def build_raw_data():
+    """
+    Payload del raw-data-store construido en cada solicitud desde el dataset
+    compartido (mmap); no se guarda en el proceso
+    """
+    with dataset_store.reading(DATA_SOURCE) as (version, frames):
+        if frames is None:
+            return {}
+        all_data = {name: encode_frame(frames[name]) for name in FRAME_NAMES}
+    
+    # 🔖 Versión de contenido (invalida las figuras cacheadas si cambian los datos)
+    content_version = (dataset_store.get_meta(DATA_SOURCE, version) or {}).get("content_version", version)
+    all_data[VERSION_KEY] = {"dataset": DATA_SOURCE, "version": content_version}
+    figure_cache.set_dataset_version(DATA_SOURCE, content_version)
+    return all_data
+
+
+def dataset_info(version, from_cache):
+    """Contenido del cache-store: puntero a la versión publicada"""
+    meta = dataset_store.get_meta(DATA_SOURCE, version) or {}
+    loaded_at = datetime.fromtimestamp(meta.get("published_at", 0)).isoformat()
+    return {"version": version, "loaded_at": loaded_at, "files": [], "from_cache": from_cache}
+
+
+async def load_all_data(set_progress=None):
+    """
+    Carga, transforma y publica todos los archivos en dataset_store
+    (token → listado → descarga → lectura → transformación)
+
+    Returns:
+        Puntero a la versión publicada (ver dataset_info) o {"error": ...}
+    """
+    progress = stage_progress(set_progress)
     try:
         print("🚀 Iniciando carga única de datos...")
         
-        # 🗄️ Verificar caché primero
-        if is_cache_valid():
-            print("✅ Usando datos del caché")
-            cache_info = {"loaded_at": _data_cache["last_loaded"].isoformat(), "files": [], "from_cache": True}
-            return _data_cache["data"], cache_info
+        # 📦 Dataset vigente publicado por otro worker (Arrow mmap, sin descargar)
+        version = dataset_store.fresh_version(DATA_SOURCE, CACHE_DURATION)
+        if version is not None:
+            print("✅ Usando dataset compartido")
+            progress("done")
+            return dataset_info(version, from_cache=True)
         
-        print("🔄 Caché expirado o no disponible, cargando datos frescos...")
+        print("🔄 Dataset expirado o no disponible, cargando datos frescos...")
         
         # 🔑 Obtener token una sola vez
+        progress("token")
         access_token = await asyncio.to_thread(get_access_token)
         
         # 📁 Listar archivos una sola vez
+        progress("listing")
         files_data = await asyncio.to_thread(
             listar_archivos_en_carpeta_compartida,
             access_token,
@@ -383,18 +456,24 @@ async def load_all_data_once(_):
         
         # 📊 Cargar todos los archivos en paralelo (MUY EFICIENTE)
         print("📥 Iniciando carga paralela de archivos...")
+        progress("download")
         
         # Crear tareas para carga paralela
         async def load_excel_file(filename, sheet_name=None,skiprows=None):
             url = await asyncio.to_thread(get_download_url_by_name, files_data, filename)
             if sheet_name:
-                return await asyncio.to_thread(pd.read_excel, url, sheet_name=sheet_name,skiprows=skiprows)
+                return await process_executor.run(read_excel, url, sheet_name=sheet_name,skiprows=skiprows)
             else:
-                return await asyncio.to_thread(pd.read_excel, url,skiprows=skiprows)
+                return await process_executor.run(read_excel, url,skiprows=skiprows)
             
         
         # Cargar archivos Excel en paralelo
-        mayor_analitico_task = load_excel_file("Mayor Analitico.xlsx")
+        # Mayor Analítico: si sus archivos de origen no cambiaron se usan las particiones guardadas
+        ma_tag = source_tag(files_data, "Mayor Analitico.xlsx", "AGRUPADOR_COSTOS.xlsx")
+        if mayor_analitico_ledger.has_source(ma_tag):
+            mayor_analitico_task = asyncio.sleep(0, result=None)
+        else:
+            mayor_analitico_task = load_excel_file("Mayor Analitico.xlsx")
         agrupador_costos_task = load_excel_file("AGRUPADOR_COSTOS.xlsx")
         presupuesto_packing_task = load_excel_file("PPTO PACKING.xlsx", "PRESUPUESTADO")
         kg_presupuesto_packing_task = load_excel_file("KG PPTO.xlsx",skiprows=1)
@@ -409,6 +488,7 @@ async def load_all_data_once(_):
         )
         
         print("✅ Archivos Excel cargados en paralelo")
+        progress("parse")
         
         # 📊 Cargar Google Sheets (esto es más rápido)
         print("📊 Cargando datos de Google Sheets...")
@@ -418,25 +498,18 @@ async def load_all_data_once(_):
         
         # 🔄 Transformar datos en paralelo
         print("🔄 Transformando datos...")
-        
-        # Ejecutar transformaciones en paralelo
-        presupuesto_task = asyncio.to_thread(presupuesto_packing_transform, presupuesto_packing_df)
-        ma_task = asyncio.to_thread(mayor_analitico_opex_transform, mayor_analitico_df, agrupador_costos_df)
-        agrupador_task = asyncio.to_thread(agrupador_costos_transform, agrupador_costos_df)
-        kg_presupuesto_packing_task = asyncio.to_thread(kg_presupuesto_packing_transform, kg_presupuesto_packing_df)
+        progress("transform")
+        
+        # Ejecutar transformaciones en paralelo (pool de procesos, fallback a hilos)
+        presupuesto_task = process_executor.run(presupuesto_packing_transform, presupuesto_packing_df)
+        # Mayor Analítico: sólo se re-transforman los periodos (Año, Mes) modificados
+        ma_task = mayor_analitico_ledger.refresh(mayor_analitico_df, agrupador_costos_df, tag=ma_tag)
+        agrupador_task = process_executor.run(agrupador_costos_transform, agrupador_costos_df)
+        kg_presupuesto_packing_task = process_executor.run(kg_presupuesto_packing_transform, kg_presupuesto_packing_df)
         presupuesto_packing_df, ma_df, agrupador_costos_df, kg_presupuesto_packing_df = await asyncio.gather(
             presupuesto_task, ma_task, agrupador_task, kg_presupuesto_packing_task
         )
         
-        # 📅 Procesar fechas
-        ma_df["Fecha"] = pd.to_datetime(ma_df["Fecha"], errors='coerce')
-        ma_df["Año"] = ma_df["Fecha"].dt.year
-        ma_df["Mes"] = ma_df["Fecha"].dt.month
-        ma_df["Semana"] = ma_df["Fecha"].dt.isocalendar().week
-        
-        # 🎯 Agrupar datos
-        ma_df = ma_df.groupby(['Año','Mes','Semana','Fecha','Cod. Proyecto', 'Descripción Proyecto','Descripción Actividad','AGRUPADOR', 'SUB AGRUPADOR',])[["Dólares Cargo"]].sum().reset_index()
-        
         # Debug: mostrar información de los datos cargados
         print(f"📊 Datos cargados - Mayor Analítico: {len(ma_df)} filas")
         if len(ma_df) > 0:
@@ -450,44 +523,84 @@ async def load_all_data_once(_):
         
         print(f"📊 Datos cargados - Reporte Producción: {len(df_rp)} filas")
         
-        # 📦 Preparar datos para retorno
-        all_data = {
-            "Mayor Analitico": ma_df.to_dict('records'),
-            "Presupuesto Packing": presupuesto_packing_df.to_dict('records'),
-            "Reporte Produccion": df_rp.to_dict('records'),
-            "KG Presupuesto Packing": kg_presupuesto_packing_df.to_dict('records')
-        }
-        
-        # 🗄️ Actualizar caché
-        from datetime import datetime
-        _data_cache["data"] = all_data
-        _data_cache["last_loaded"] = datetime.now()
+        # 📦 Publicar para todos los workers (única copia en el servidor)
+        frames = dict(zip(FRAME_NAMES, (ma_df, presupuesto_packing_df, df_rp, kg_presupuesto_packing_df)))
+        version = await asyncio.to_thread(
+            dataset_store.publish, DATA_SOURCE, frames,
+            {"content_version": frames_version(*frames.values())}
+        )
         
         # 🧹 Limpiar memoria
-        del ma_df, mayor_analitico_df, agrupador_costos_df, presupuesto_packing_df
+        del frames, ma_df, mayor_analitico_df, agrupador_costos_df, presupuesto_packing_df
         
-        cache_info = {"loaded_at": _data_cache["last_loaded"].isoformat(), "files": [], "from_cache": False}
         print("✅ Carga de datos completada exitosamente")
-        
-        return all_data, cache_info
+        progress("done")
+        return dataset_info(version, from_cache=False)
         
     except Exception as e:
         print(f"🚨 Error en carga inicial: {e}")
-        return {}, {"error": str(e)}
+        return {"error": str(e)}
+
 
-# 2. 🎯 Callback para filtrado LOCAL eficiente (sin llamadas API)
+# Carga en segundo plano: no ocupa el worker web, reporta progreso y se puede cancelar
 @callback(
-    Output(f"{PAGE_ID}filtered-data-store", "data"),
+    [
+        Output(f"{PAGE_ID}raw-data-store", "data"),
+        Output(f"{PAGE_ID}cache-store", "data"),
+    ],
+    Input(f"{PAGE_ID}loading-trigger", "id"),  # Se dispara una sola vez al cargar
+    background=True,
+    manager=background_manager,
+    progress=[
+        Output(f"{PAGE_ID}load-progress", "value"),
+        Output(f"{PAGE_ID}load-progress-label", "children"),
+    ],
+    running=[
+        (Output(f"{PAGE_ID}load-progress-container", "style"), {"display": "block"}, {"display": "none"}),
+    ],
+    cancel=[Input(f"{PAGE_ID}cancel-load-btn", "n_clicks")],
+    prevent_initial_call=False
+)
+def load_all_data_once(set_progress, _):
+    # Usuarios simultáneos comparten una sola descarga; sólo se comparte el puntero
+    cache_info = background_jobs.single_flight(
+        f"{DATA_SOURCE}:load", load_all_data,
+        set_progress=set_progress,
+        ttl=CACHE_DURATION,
+        should_cache=lambda info: "error" not in info
+    )
+    if "error" in cache_info:
+        return {}, cache_info
+    return build_raw_data(), cache_info
+
+# Precarga antes del fork de los workers (ver core/snapshots.py)
+dataset_snapshots.register(DATA_SOURCE, load_all_data)
+
+# 2. 🎯 Filtrado en el navegador; si los datos superan max_rows se delega al servidor
+clientside_callback(
+    ClientsideFunction(namespace="filters", function_name="filter_period"),
+    [
+        Output(f"{PAGE_ID}filtered-data-store", "data"),
+        Output(f"{PAGE_ID}filter-request-store", "data"),
+    ],
     [
         Input(f"{PAGE_ID}year", "value"),
         Input(f"{PAGE_ID}month", "value"),
         Input(f"{PAGE_ID}raw-data-store", "data")
-        #Input(f"{PAGE_ID}week", "value")
     ],
-    #State(f"{PAGE_ID}raw-data-store", "data"),
-    #prevent_initial_call=False  # Cargar datos inicialmente sin filtros
+    State(f"{PAGE_ID}filter-config-store", "data"),
+)
+
+# Fallback en servidor para datos grandes (sin llamadas API)
+@callback(
+    Output(f"{PAGE_ID}filtered-data-store", "data", allow_duplicate=True),
+    Input(f"{PAGE_ID}filter-request-store", "data"),
+    State(f"{PAGE_ID}raw-data-store", "data"),
+    prevent_initial_call=True
 )
-def filter_data_locally(year, month, raw_data):
+def filter_data_locally(filter_request, raw_data):
+        year = (filter_request or {}).get("year")
+        month = (filter_request or {}).get("month")
         
         
         if not raw_data:
@@ -507,10 +620,10 @@ def filter_data_locally(year, month, raw_data):
         print(f"🔍 Valores procesados - Año: {year_int}, Mes: {month_ints}")
         
         # 🚀 Crear DataFrames de manera más eficiente
-        mayor_analitico_df = pd.DataFrame(raw_data.get("Mayor Analitico", []))
-        reporte_produccion_df = pd.DataFrame(raw_data.get("Reporte Produccion", []))
-        presupuesto_packing_df = pd.DataFrame(raw_data.get("Presupuesto Packing", []))
-        kg_presupuesto_packing_df = pd.DataFrame(raw_data.get("KG Presupuesto Packing", []))
+        mayor_analitico_df = decode_frame(raw_data.get("Mayor Analitico", []))
+        reporte_produccion_df = decode_frame(raw_data.get("Reporte Produccion", []))
+        presupuesto_packing_df = decode_frame(raw_data.get("Presupuesto Packing", []))
+        kg_presupuesto_packing_df = decode_frame(raw_data.get("KG Presupuesto Packing", []))
         
         # Verificar si hay datos
         if len(mayor_analitico_df) == 0 and len(reporte_produccion_df) == 0 and len(presupuesto_packing_df) == 0:
@@ -566,10 +679,13 @@ def filter_data_locally(year, month, raw_data):
         
         # 📦 Preparar datos para retorno de manera más eficiente
         all_data_dict = {
-            "Mayor Analitico": mayor_analitico_df.to_dict('records') if len(mayor_analitico_df) > 0 else [],
-            "Reporte Produccion": reporte_produccion_df.to_dict('records') if len(reporte_produccion_df) > 0 else [],
-            "Presupuesto Packing": presupuesto_packing_df.to_dict('records') if len(presupuesto_packing_df) > 0 else []
+            "Mayor Analitico": encode_frame(mayor_analitico_df) if len(mayor_analitico_df) > 0 else [],
+            "Reporte Produccion": encode_frame(reporte_produccion_df) if len(reporte_produccion_df) > 0 else [],
+            "Presupuesto Packing": encode_frame(presupuesto_packing_df) if len(presupuesto_packing_df) > 0 else []
         }
+        view = build_view(raw_data, year, month)
+        if view:
+            all_data_dict[VIEW_KEY] = view
         
         # 🧹 Limpiar memoria
         del mayor_analitico_df, reporte_produccion_df, presupuesto_packing_df
@@ -581,15 +697,17 @@ def filter_data_locally(year, month, raw_data):
     Output(f"{PAGE_ID}main-table", "children"),
     Output(f"{PAGE_ID}bar-comparativo", "figure"),
     Output("loading-overlay", "visible", allow_duplicate=True),
+    Output(f"{PAGE_ID}bar-comparativo-state", "data"),
     Input(f"{PAGE_ID}filtered-data-store", "data"),
     Input(f"{PAGE_ID}segmented-bar-comparativo", "value"),
+    State(f"{PAGE_ID}bar-comparativo-state", "data"),
     prevent_initial_call=True
 )
-def update_main_table(filtered_data,segmented_bar_comparativo):
-        df = pd.DataFrame(filtered_data.get("Presupuesto Packing", []))
-        df_rp = pd.DataFrame(filtered_data.get("Reporte Produccion", []))
-        df_ma = pd.DataFrame(filtered_data.get("Mayor Analitico", []))
-        df_kg = pd.DataFrame(filtered_data.get("KG Presupuesto Packing", []))
+def update_main_table(filtered_data,segmented_bar_comparativo,chart_state):
+        df = decode_frame(filtered_data.get("Presupuesto Packing", []))
+        df_rp = decode_frame(filtered_data.get("Reporte Produccion", []))
+        df_ma = decode_frame(filtered_data.get("Mayor Analitico", []))
+        df_kg = decode_frame(filtered_data.get("KG Presupuesto Packing", []))
         
         
         
@@ -610,6 +728,14 @@ def update_main_table(filtered_data,segmented_bar_comparativo):
         if segmented_bar_comparativo == "Mes":
             
             df_grafico = df_grafico[df_grafico["IMPORTE MAYOR ANALITICO"]>0]
+        
+        # Figura ya construida: sólo se reemplazan los arrays x/y (Patch)
+        fig_patch = None
+        if chart_state and chart_state.get("traces") == 2:
+            fig_patch = frame_traces_patch(df_grafico, segmented_bar_comparativo, ["IMPORTE PRESUPUESTO", "IMPORTE MAYOR ANALITICO"])
+            if ctx.triggered_id == f"{PAGE_ID}segmented-bar-comparativo":
+                # La tabla no depende de la dimensión del gráfico
+                return no_update, fig_patch, False, no_update
         # Calcular totales antes de formatear
         total_presupuesto = comparativo_ejec_presupuesto_table["IMPORTE PRESUPUESTO"].sum()
         total_ejecutado = comparativo_ejec_presupuesto_table["IMPORTE MAYOR ANALITICO"].sum()
@@ -655,12 +781,12 @@ def update_main_table(filtered_data,segmented_bar_comparativo):
                     "type": "textColumn",
                     "width": 250
                 })
-        table_out = AgGrid(
-                    id=f"{PAGE_ID}main-ag-grid",
-                    rowData=comparativo_ejec_presupuesto_table.to_dict('records'),
-                    columnDefs=column_defs,
+        # Filas servidas por bloques desde el servidor (infinite row model)
+        table_out = grid_backend.create_grid(
+                    f"{PAGE_ID}main-ag-grid",
+                    comparativo_ejec_presupuesto_table,
+                    column_defs=column_defs,
                     dashGridOptions={
-                        "domLayout": "autoHeight",
                         "rowSelection": "single",
                         "animateRows": True,
                         #"pagination": True,
@@ -672,83 +798,123 @@ def update_main_table(filtered_data,segmented_bar_comparativo):
                             "minWidth": 100
                         }
                     },
-                    #style={"height": "400px", "width": "100%"},
+                    style={"height": "400px", "width": "100%"},
                     className="ag-theme-balham compac compact", 
                     #className="ag-theme-alpine"
                 )
-        # Crear el gráfico con los valores numéricos originales
-        fig = px.bar(
-            df_grafico, 
-            x=segmented_bar_comparativo, 
-            y=["IMPORTE PRESUPUESTO", "IMPORTE MAYOR ANALITICO"], 
-            title="Comparativo PPTO vs Ejecutado",
-            template="mantine_light",
-            barmode="group",
-            height=250,
-            color_discrete_map={
-                "IMPORTE PRESUPUESTO": "#094782",  # Azul para presupuesto
-                "IMPORTE MAYOR ANALITICO": "#0b72d7"  # Naranja para ejecutado
-            },
-            
-        )
-        fig.update_traces(cliponaxis=False, selector=dict(type='bar'))
-        # Personalizar el gráfico
-        fig.update_layout(
-            margin=dict(t=40, b=0, l=0, r=0),
-            xaxis_title="",
-            yaxis_title="Importe ($)",
-            legend_title="",
-            hovermode="x unified",
-            title=dict(
-                text="Comparativo PPTO vs Ejecutado",
-                font=dict(size=16, color="black", weight="bold")
-            ),
-            font=dict(
-                size=9,
-                color="black"
-            ),
-            # Mejorar el hoverlabel
-            hoverlabel=dict(
-                bgcolor="white",
-                #bordercolor="black",
-                #borderwidth=1,
-                font_size=12,
-                font_family="Arial, sans-serif"
-            )
+        fig = fig_patch if fig_patch is not None else create_comparativo_chart(df_grafico, segmented_bar_comparativo)
+        return (table_out, fig, False, {"traces": 2})
+
+grid_backend.register_callback(f"{PAGE_ID}main-ag-grid")
+
+@callback(
+    Output(f"{PAGE_ID}prediction-chart", "figure"),
+    Input(f"{PAGE_ID}cache-store", "data"),
+    Input(f"{PAGE_ID}segmented-prediction-target", "value"),
+    Input(f"{PAGE_ID}segmented-prediction-model", "value"),
+    prevent_initial_call=True
+)
+def update_prediction_chart(cache_info, target_column, model):
+    """
+    Pronósticos de la caché (scripts/manage.py forecast-refit); el panel no
+    ajusta modelos. Se usa el Reporte Produccion completo publicado, el mismo
+    que el reajuste, para que los hashes de las series coincidan
+    """
+    if not cache_info or "error" in cache_info:
+        return no_update
+    with dataset_store.reading(DATA_SOURCE) as (_, frames):
+        if frames is None:
+            return no_update
+        historical, predictions = cached_model_predictions(
+            to_numpy_frame(frames["Reporte Produccion"]), target_column, model=model, week_column="SEMANA"
         )
-        
-        # Configurar el eje Y para mostrar valores completos sin abreviación
-        fig.update_yaxes(
-            tickformat=",",
-            tickmode="auto",
-            nticks=10
+
+    fig = create_prediction_chart(historical, predictions, target_column) if predictions else None
+    if fig is None:
+        fig = go.Figure()
+        fig.add_annotation(
+            text="Sin pronósticos vigentes: ejecutar scripts/manage.py forecast-refit",
+            showarrow=False, xref="paper", yref="paper", x=0.5, y=0.5,
         )
+        fig.update_layout(height=400, xaxis_visible=False, yaxis_visible=False)
+    return fig
+
+def create_comparativo_chart(df_grafico, segmented_bar_comparativo):
+    """Crea el gráfico comparativo PPTO vs Ejecutado"""
+    # Crear el gráfico con los valores numéricos originales
+    fig = px.bar(
+        df_grafico, 
+        x=segmented_bar_comparativo, 
+        y=["IMPORTE PRESUPUESTO", "IMPORTE MAYOR ANALITICO"], 
+        title="Comparativo PPTO vs Ejecutado",
+        template="mantine_light",
+        barmode="group",
+        height=250,
+        color_discrete_map={
+            "IMPORTE PRESUPUESTO": "#094782",  # Azul para presupuesto
+            "IMPORTE MAYOR ANALITICO": "#0b72d7"  # Naranja para ejecutado
+        },
         
-        # Configurar leyenda
-        fig.update_layout(legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1,
-        ))
-        
-        # Agregar etiquetas de datos en las barras
-        fig.update_traces(
-            texttemplate='%{y:,.0f}',
-            textposition='outside',
-            textfont=dict(size=8, color="black"),
-            hovertemplate='<b>%{fullData.name}</b><br>' +
-                         'Categoría: %{x}<br>' +
-                         'Importe: $%{y:,.2f}<br>' +
-                         '<extra></extra>'
+    )
+    fig.update_traces(cliponaxis=False, selector=dict(type='bar'))
+    # Personalizar el gráfico
+    fig.update_layout(
+        margin=dict(t=40, b=0, l=0, r=0),
+        xaxis_title="",
+        yaxis_title="Importe ($)",
+        legend_title="",
+        hovermode="x unified",
+        title=dict(
+            text="Comparativo PPTO vs Ejecutado",
+            font=dict(size=16, color="black", weight="bold")
+        ),
+        font=dict(
+            size=9,
+            color="black"
+        ),
+        # Mejorar el hoverlabel
+        hoverlabel=dict(
+            bgcolor="white",
+            #bordercolor="black",
+            #borderwidth=1,
+            font_size=12,
+            font_family="Arial, sans-serif"
         )
-        
-        # Actualizar las etiquetas de la leyenda
-        fig.data[0].name = "Presupuesto"
-        fig.data[1].name = "Ejecutado"
-        return (table_out,fig,False)
+    )
+    
+    # Configurar el eje Y para mostrar valores completos sin abreviación
+    fig.update_yaxes(
+        tickformat=",",
+        tickmode="auto",
+        nticks=10
+    )
+    
+    # Configurar leyenda
+    fig.update_layout(legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=1.02,
+        xanchor="right",
+        x=1,
+    ))
+    
+    # Agregar etiquetas de datos en las barras
+    fig.update_traces(
+        texttemplate='%{y:,.0f}',
+        textposition='outside',
+        textfont=dict(size=8, color="black"),
+        hovertemplate='<b>%{fullData.name}</b><br>' +
+                     'Categoría: %{x}<br>' +
+                     'Importe: $%{y:,.2f}<br>' +
+                     '<extra></extra>'
+    )
+    
+    # Actualizar las etiquetas de la leyenda
+    fig.data[0].name = "Presupuesto"
+    fig.data[1].name = "Ejecutado"
+    return fig
 
+@cached_figure(f"{DATA_SOURCE}.expanded_chart", as_figure=True)
 def create_expanded_chart(df_grafico):
     """Crear versión expandida del gráfico para el modal"""
     fig = px.bar(
@@ -838,16 +1004,16 @@ def create_expanded_chart(df_grafico):
 # Callback para actualizar la fila de totales dinámicamente 
 @callback(
     Output(f"{PAGE_ID}main-ag-grid", "dashGridOptions"),
-    Input(f"{PAGE_ID}main-ag-grid", "virtualRowData"),
-    prevent_initial_call=False
+    Input(f"{PAGE_ID}main-ag-grid", "filterModel"),
+    State(f"{PAGE_ID}main-ag-grid-frame-key", "data"),
+    prevent_initial_call=True
 )
-def update_totals_row(data):
-    if not data:
+def update_totals_row(filter_model, frame_key):
+    # Las filas viven en el servidor: los totales se calculan sobre el filtro de la grilla
+    df_virtual = grid_backend.filtered_frame(frame_key, filter_model) if frame_key else None
+    if df_virtual is None or df_virtual.empty:
         return Patch()
     
-    # Convertir los datos virtuales a DataFrame
-    df_virtual = pd.DataFrame(data)
-    
     # Extraer valores numéricos de las columnas formateadas
     def extract_numeric(value):
         if isinstance(value, str) and value.startswith('$'):
@@ -892,8 +1058,8 @@ def prepare_pdf_data(filtered_data, main_chart):
     
     try:
         # Preparar datos de resumen
-        df = pd.DataFrame(filtered_data.get("Presupuesto Packing", []))
-        df_ma = pd.DataFrame(filtered_data.get("Mayor Analitico", []))
+        df = decode_frame(filtered_data.get("Presupuesto Packing", []))
+        df_ma = decode_frame(filtered_data.get("Mayor Analitico", []))
         
         if len(df) > 0 and len(df_ma) > 0:
             presupuesto_group = df.groupby(["Año", "Mes", "ITEM_CORREGIDO", "MES"])[["IMPORTE"]].sum().reset_index()
@@ -961,7 +1127,7 @@ def prepare_pdf_data(filtered_data, main_chart):
             
             print("Debug - Gráfico PDF generado exitosamente")
             
-            return {
+            pdf_data = {
                 'charts': {
                     'main_chart': fig_pdf.to_dict()  # Usar el gráfico regenerado
                 },
@@ -975,6 +1141,10 @@ def prepare_pdf_data(filtered_data, main_chart):
                     'num_categorias': len(comparativo_ejec_presupuesto_table)
                 }
             }
+            # Versión + filtros de la vista: clave del PDF en la caché de artefactos
+            if filtered_data.get(VIEW_KEY):
+                pdf_data[VIEW_KEY] = filtered_data[VIEW_KEY]
+            return pdf_data
     except Exception as e:
         print(f"Error preparando datos PDF: {e}")
         return {}
@@ -1017,12 +1187,23 @@ def handle_pdf_preview(preview_clicks, close_clicks, pdf_data, modal_opened):
     
     return modal_opened, dash.no_update, False
 
-# Callback para descargar PDF
+def build_pdf_bytes(pdf_data):
+    """Bytes del reporte PDF (reutilizables entre trabajos idénticos)"""
+    return generate_simple_pdf_report(pdf_data).getvalue()
+
+# Callback para descargar PDF (en segundo plano, cancelable al cerrar la vista previa)
 @callback(
     Output(f"{PAGE_ID}pdf-download", "data"),
     Input(f"{PAGE_ID}download-pdf-btn", "n_clicks"),
     Input(f"{PAGE_ID}download-from-preview-btn", "n_clicks"),
     State(f"{PAGE_ID}pdf-data-store", "data"),
+    background=True,
+    manager=background_manager,
+    running=[
+        (Output(f"{PAGE_ID}download-pdf-btn", "loading"), True, False),
+        (Output(f"{PAGE_ID}download-from-preview-btn", "loading"), True, False),
+    ],
+    cancel=[Input(f"{PAGE_ID}close-preview-btn", "n_clicks")],
     prevent_initial_call=True
 )
 def download_pdf(download_clicks, preview_download_clicks, pdf_data):
@@ -1034,9 +1215,10 @@ def download_pdf(download_clicks, preview_download_clicks, pdf_data):
         from datetime import datetime
         
         filename = f"reporte_financiero_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf_buffer = generate_simple_pdf_report(pdf_data)
+        key = artifact_key("costos-pdf", filters=pdf_data, template=REPORT_TEMPLATE_VERSION)
+        pdf_bytes = artifact_store.get_or_build(key, build_pdf_bytes, pdf_data)
         
-        return dcc.send_bytes(pdf_buffer.getvalue(), filename)
+        return dcc.send_bytes(pdf_bytes, filename)
         
     except Exception as e:
         print(f"Error generando PDF: {e}")
@@ -1121,11 +1303,10 @@ def generate_simple_pdf_report(pdf_data):
     from reportlab.lib.pagesizes import A4
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
     from reportlab.lib import colors
     from reportlab.lib.enums import TA_CENTER, TA_LEFT
     import plotly.graph_objects as go
-    import plotly.io as pio
     from reportlab.platypus import Image
     
     try:
@@ -1211,15 +1392,8 @@ def generate_simple_pdf_report(pdf_data):
                     )
                     
                     print("Debug - Convirtiendo figura a imagen...")
-                    # Convertir a imagen con kaleido
-                    img_bytes = pio.to_image(
-                        fig, 
-                        format="png", 
-                        width=600, 
-                        height=400, 
-                        scale=2,
-                        engine="kaleido"
-                    )
+                    # Servicio de gráficos (kaleido abierto + caché por hash de la figura)
+                    img_bytes = chart_renderer.render(fig, format="png", width=600, height=400, scale=2)
                     print(f"Debug - Imagen generada, tamaño: {len(img_bytes)} bytes")
                     
                     if len(img_bytes) > 0:
@@ -1259,34 +1433,9 @@ def generate_simple_pdf_report(pdf_data):
             try:
                 story.append(Paragraph("📋 Detalle por Categorías", styles['CustomSubtitle']))
                 
-                # Preparar datos para tabla
-                if len(table_data) > 0:
-                    # Headers
-                    first_row = table_data[0]
-                    headers = list(first_row.keys())
-                    
-                    # Datos
-                    table_rows = [headers]
-                    for row in table_data:
-                        table_rows.append([str(row.get(header, '')) for header in headers])
-                    
-                    # Crear tabla
-                    table = Table(table_rows, repeatRows=1)
-                    table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#094782')),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, 0), 10),
-                        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                        ('FONTSIZE', (0, 1), (-1, -1), 9),
-                        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                    ]))
-                    
-                    story.append(table)
-                    story.append(Spacer(1, 20))
+                # Matriz vectorizada + LongTables paginadas (ver helpers/pdf_tables.py)
+                story.extend(build_table_flowables(table_data, available_width=doc.width))
+                story.append(Spacer(1, 20))
                     
             except Exception as e:
                 print(f"Error procesando tabla: {e}")
@@ -1384,8 +1533,8 @@ def update_expanded_chart_content(modal_opened, filtered_data, segmented_bar_com
     
     try:
         # Obtener datos
-        df = pd.DataFrame(filtered_data.get("Presupuesto Packing", []))
-        df_ma = pd.DataFrame(filtered_data.get("Mayor Analitico", []))
+        df = decode_frame(filtered_data.get("Presupuesto Packing", []))
+        df_ma = decode_frame(filtered_data.get("Mayor Analitico", []))
         
         if len(df) == 0 or len(df_ma) == 0:
             return {}, "$0.00", "$0.00", "0.0%", "0", False
@@ -5,11 +5,11 @@ Ejemplo de cómo implementar los filtros usando tu estructura original
 import asyncio
 import dash
 import dash_mantine_components as dmc
-from dash import html, dcc, callback, Input, Output, State
+from dash import html, dcc, callback, clientside_callback, ClientsideFunction, Input, Output, State
 from components.grid import Row, Column
 from components.simple_components import create_page_header
 from constants import PAGE_TITLE_PREFIX
-from helpers.helpers import generate_list_month
+from helpers.helpers import generate_date_options_tree
 
 dash.register_page(__name__, "/costos-manual", title=PAGE_TITLE_PREFIX + "Costos Manual")
 
@@ -91,127 +91,48 @@ layout = create_custom_layout()
 # CALLBACKS MANUALES
 # ============================================================
 
-# 1. Callback para cargar datos iniciales usando generate_list_month
+# 1. Callback para generar el árbol de opciones (única llamada al servidor)
 @callback(
     Output(f"{PAGE_ID}dates-store", "data"),
     Input(f"{PAGE_ID}year", "id"),  # Trigger inicial
     prevent_initial_call=False
 )
 async def load_dates_data(_):
-    """Carga datos de fechas usando generate_list_month"""
+    """Genera el árbol de opciones año -> mes -> semana"""
     try:
-        print(f"🗓️ Generando datos desde {START_YEAR}/{START_MONTH}")
+        print(f"🗓️ Generando opciones desde {START_YEAR}/{START_MONTH}")
         
-        # Llamar generate_list_month de forma asíncrona
-        df_dates = await asyncio.to_thread(generate_list_month, START_YEAR, START_MONTH)
-        
-        if df_dates is not None and not df_dates.empty:
-            print(f"✅ Datos de fechas generados: {len(df_dates)} registros")
-            return df_dates.to_dict('records')
-        return []
+        tree = await asyncio.to_thread(generate_date_options_tree, START_YEAR, START_MONTH)
+        print(f"✅ Árbol de fechas generado: {len(tree['years'])} años")
+        return tree
         
     except Exception as e:
         print(f"❌ Error generando datos: {e}")
-        return []
+        return {}
 
-# 2. Callback para opciones de año
-@callback(
+# 2-4. Opciones dependientes resueltas en el navegador (assets/clientside.js)
+clientside_callback(
+    ClientsideFunction(namespace="filters", function_name="year_options"),
     Output(f"{PAGE_ID}year", "data"),
     Input(f"{PAGE_ID}dates-store", "data"),
     prevent_initial_call=False
 )
-async def update_year_options(dates_data):
-    """Actualiza opciones de año"""
-    if not dates_data:
-        return []
-    
-    try:
-        # Extraer años únicos
-        years = list(set([record['YEAR'] for record in dates_data]))
-        years.sort(reverse=True)  # Más recientes primero
-        
-        return [{'label': str(year), 'value': str(year)} for year in years]
-        
-    except Exception as e:
-        print(f"❌ Error actualizando años: {e}")
-        return []
 
-# 3. Callback para opciones de mes (dependiente del año)
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace="filters", function_name="month_options"),
     Output(f"{PAGE_ID}month", "data"),
     Input(f"{PAGE_ID}year", "value"),
     State(f"{PAGE_ID}dates-store", "data"),
     prevent_initial_call=False
 )
-async def update_month_options(selected_year, dates_data):
-    """Actualiza opciones de mes basado en el año seleccionado"""
-    if not dates_data or selected_year is None:
-        return []
-    
-    try:
-        # Filtrar meses para el año seleccionado
-        months_for_year = [
-            record for record in dates_data 
-            if record['YEAR'] == selected_year
-        ]
-        
-        # Crear diccionario para evitar duplicados
-        month_dict = {}
-        for record in months_for_year:
-            month_num = record['MES']
-            month_text = record['MES_TEXT']
-            month_dict[month_num] = month_text
-        
-        # Ordenar por número de mes
-        sorted_months = sorted(month_dict.items())
-        
-        return [
-            {'label': month_text, 'value': str(month_num)}
-            for month_num, month_text in sorted_months
-        ]
-        
-    except Exception as e:
-        print(f"❌ Error actualizando meses: {e}")
-        return []
 
-# 4. Callback para opciones de semana (dependiente del año y mes)
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace="filters", function_name="week_options"),
     Output(f"{PAGE_ID}week", "data"),
     [Input(f"{PAGE_ID}year", "value"), Input(f"{PAGE_ID}month", "value")],
     State(f"{PAGE_ID}dates-store", "data"),
     prevent_initial_call=False
 )
-async def update_week_options(selected_year, selected_month, dates_data):
-    """Actualiza opciones de semana basado en año y mes seleccionados"""
-    if not dates_data or selected_year is None:
-        return []
-    
-    try:
-        # Filtrar por año
-        filtered_data = [
-            record for record in dates_data 
-            if record['YEAR'] == selected_year
-        ]
-        
-        # Si hay mes seleccionado, filtrar también por mes
-        if selected_month is not None:
-            filtered_data = [
-                record for record in filtered_data
-                if record['MES'] == selected_month
-            ]
-        
-        # Extraer semanas únicas
-        weeks = list(set([record['SEMANA'] for record in filtered_data]))
-        weeks.sort()
-        
-        return [
-            {'label': f'Semana {week}', 'value': str(week)}
-            for week in weeks
-        ]
-        
-    except Exception as e:
-        print(f"❌ Error actualizando semanas: {e}")
-        return []
 
 # 5. Callback para mostrar filtros actuales
 @callback(
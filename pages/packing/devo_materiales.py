@@ -7,12 +7,13 @@ from dash import html, dcc, callback, Input, Output, State
 from components.grid import Row, Column
 from constants import PAGE_TITLE_PREFIX
 from helpers.helpers import generate_list_month
-from dash_ag_grid import AgGrid
 from helpers.get_sheets import read_sheet
 import time
 from datetime import datetime
-from helpers.pdf_generator import generate_boleta_pdf
-import base64
+from helpers.pdf_generator import generate_boleta_pdf, BOLETA_TEMPLATE_VERSION
+from core.artifacts import artifact_store, artifact_key
+from dash_ag_grid import AgGrid
+from core.dataset_store import dataset_store
 
 # 🚀 Configuraciones de rendimiento optimizadas
 pd.options.mode.chained_assignment = None  # Evitar warnings de SettingWithCopyWarning
@@ -24,6 +25,22 @@ dash.register_page(__name__, "/devolucion-materiales", title=PAGE_TITLE_PREFIX +
 app = dash.get_app()
 PAGE_ID = "devolucion-materiales-"
 DATA_SOURCE = "devolucion_materiales"
+CACHE_DURATION = 300  # 5 minutos
+
+
+def publish_boletas_pdf(selected_rows) -> str:
+    """
+    Genera (o reutiliza) el PDF de boletas de las filas seleccionadas
+
+    Returns:
+        URL temporal del PDF (/artifacts/<token>)
+    """
+    key = artifact_key("boletas-pdf", filters=selected_rows, template=BOLETA_TEMPLATE_VERSION)
+    def write_pdf(output):
+        output.write(generate_boleta_pdf(selected_rows).getvalue())
+
+    artifact_store.open_or_build(key, write_pdf).close()
+    return artifact_store.share(key, f"boletas_despacho_{int(time.time())}.pdf", "application/pdf")
 
 def load_data_devolucion_materiales():
     print("📊 Cargando datos de Google Sheets...")
@@ -98,7 +115,6 @@ def create_custom_layout():
             dcc.Store(id=f"{PAGE_ID}filtered-data-store"), # Para datos filtrados
             dcc.Store(id=f"{PAGE_ID}cache-store"),      # Para cache de archivos cargados
             dcc.Store(id=f"{PAGE_ID}loading-trigger", data="init"),   # Para trigger de carga inicial
-            dcc.Store(id=f"{PAGE_ID}modal-data-store"), # Para datos del modal
         ]),
         dmc.Container([
             Row([
@@ -152,7 +168,6 @@ def create_custom_layout():
                             
                         ),
                     ]),
-                    dcc.Download(id=f"{PAGE_ID}download-pdf"),
                     
                     # Modal de Previsualización
                     dmc.Modal(
@@ -166,14 +181,20 @@ def create_custom_layout():
                                 style={"width": "100%", "height": "600px", "border": "none"}
                             ),
                             dmc.Group([
-                                dmc.Button(
-                                    "Descargar PDF",
-                                    id=f"{PAGE_ID}btn-confirm-download",
-                                    color="blue",
-                                    
-                                    #variant="filled",
-                                    #leftIcon=html.I(className="fas fa-download")
-                                )
+                                # Descarga directa del mismo PDF de la previsualización
+                                dmc.Anchor(
+                                    dmc.Button(
+                                        "Descargar PDF",
+                                        id=f"{PAGE_ID}btn-confirm-download",
+                                        color="blue",
+                                        fullWidth=True,
+                                        
+                                        #variant="filled",
+                                        #leftIcon=html.I(className="fas fa-download")
+                                    ),
+                                    id=f"{PAGE_ID}link-download-pdf",
+                                    href="",
+                                ),
                             ], grow=True)
                         ]
                     )
@@ -185,13 +206,55 @@ def create_custom_layout():
 
 layout = create_custom_layout()
 
+
+def load_devolucion_dataset() -> pd.DataFrame:
+    """
+    Dataset de devoluciones en caché del servidor (compartido entre workers)
+
+    Se recarga desde Google Sheets cuando la versión publicada tiene más de
+    CACHE_DURATION segundos
+    """
+    shared = dataset_store.open_fresh(DATA_SOURCE, CACHE_DURATION)
+    if shared is not None:
+        return shared["devoluciones"]
+
+    df = load_data_devolucion_materiales()
+    if not df.empty:
+        try:
+            dataset_store.publish(DATA_SOURCE, {"devoluciones": df})
+        except Exception as e:
+            print(f"⚠️ No se pudo publicar el dataset compartido: {e}")
+    return df
+
+
+def filter_devoluciones(df: pd.DataFrame, fecha=None, destinatarios=None) -> pd.DataFrame:
+    """
+    Filtros de la tabla (sin modificar el DataFrame compartido)
+
+    Args:
+        df: Dataset de devoluciones (FECHA como texto dd/mm/yyyy)
+        fecha: Fecha mínima seleccionada (YYYY-MM-DD)
+        destinatarios: Destinatarios seleccionados
+    """
+    mask = pd.Series(True, index=df.index)
+    if fecha and "FECHA" in df.columns:
+        mask &= pd.to_datetime(df["FECHA"], errors='coerce', format='%d/%m/%Y') >= fecha
+    if destinatarios and "DESTINATARIO" in df.columns:
+        mask &= df["DESTINATARIO"].isin(destinatarios)
+    return df[mask]
+
+
 @callback(
     Output(f"{PAGE_ID}dates-store", "data"),
     Input(f"{PAGE_ID}loading-trigger", "data")
 )
 def load_data_to_store(_):
-    df = load_data_devolucion_materiales()
-    return df.to_dict('records')
+    # Sólo versión y opciones de filtro: las filas quedan en el servidor
+    df = load_devolucion_dataset()
+    if df.empty:
+        return {}
+    destinatarios = sorted(df["DESTINATARIO"].dropna().unique().astype(str)) if "DESTINATARIO" in df.columns else []
+    return {"version": dataset_store.current_version(DATA_SOURCE), "destinatarios": destinatarios}
 
 @callback(
     Output(f"{PAGE_ID}loading-indicator", "style"),
@@ -209,11 +272,7 @@ def toggle_loading_indicator(data):
 def update_destinatario_options(data):
     if not data:
         return []
-    df = pd.DataFrame(data)
-    if "DESTINATARIO" in df.columns:
-        unique_vals = sorted(df["DESTINATARIO"].dropna().unique().astype(str))
-        return [{"label": val, "value": val} for val in unique_vals]
-    return []
+    return [{"label": val, "value": val} for val in data.get("destinatarios", [])]
 
 @callback(
     Output(f"{PAGE_ID}main-table", "children"),
@@ -225,20 +284,11 @@ def update_table(data, start_date, destinatarios):
     if not data:
         return html.Div()
     
-    df = pd.DataFrame(data)
-    
-    # Filtrar por fecha
-    if start_date and "FECHA" in df.columns:
-        df["FECHA"] = pd.to_datetime(df["FECHA"], errors='coerce')
-        # Asegurarse de que start_date y end_date sean datetime si no lo son
-        # dmc.DateRangePicker puede devolver strings
-        if start_date:
-            df = df[(df["FECHA"] >= start_date)]
-            
-    # Filtrar por destinatario
-    if destinatarios and "DESTINATARIO" in df.columns:
-        df = df[df["DESTINATARIO"].isin(destinatarios)]
+    df = filter_devoluciones(load_devolucion_dataset(), start_date, destinatarios)
 
+    # Modelo de filas en cliente: la selección múltiple (con seleccionar
+    # todo) alimenta el PDF de boletas y el infinite row model la pierde
+    # al ordenar, filtrar o descartar bloques
     return AgGrid(
             id=f"{PAGE_ID}main-ag-grid",
             rowData=df.to_dict('records'),
@@ -248,7 +298,7 @@ def update_table(data, start_date, destinatarios):
             
             dashGridOptions={
                 #"domLayout": "autoHeight",
-                "rowSelection": {'mode': 'multiRow'},
+                "rowSelection": {'mode': 'multiRow', 'headerCheckbox': True, 'selectAll': 'filtered'},
                 "animateRows": True,
                 #"pagination": True,
                 #"paginationPageSize": 20,
@@ -264,6 +314,7 @@ def update_table(data, start_date, destinatarios):
             className="ag-theme-quartz compact", 
             #className="ag-theme-alpine"
         )
+
 """
 @callback(
     Output(f"{PAGE_ID}main-tabl2", "children"),
@@ -306,7 +357,7 @@ def output_selected_rows(selected_rows, data):
 @callback(
     Output(f"{PAGE_ID}preview-modal", "opened"),
     Output(f"{PAGE_ID}pdf-preview-frame", "src"),
-    Output(f"{PAGE_ID}modal-data-store", "data"),
+    Output(f"{PAGE_ID}link-download-pdf", "href"),
    
     Input(f"{PAGE_ID}btn-pdf", "n_clicks"),
     State(f"{PAGE_ID}main-ag-grid", "selectedRows"),
@@ -317,33 +368,10 @@ def open_preview_modal(n_clicks, selected_rows):
         return False, dash.no_update, dash.no_update
         
     try:
-        # Generar PDF
-        pdf_buffer = generate_boleta_pdf(selected_rows)
-        
-        # Convertir a base64 para visualizar
-        pdf_base64 = base64.b64encode(pdf_buffer.getvalue()).decode('utf-8')
-        pdf_src = f"data:application/pdf;base64,{pdf_base64}"
+        # Generar PDF una sola vez; el visor y la descarga lo leen por URL
+        pdf_url = publish_boletas_pdf(selected_rows)
         
-        return True, pdf_src, selected_rows
+        return True, pdf_url, f"{pdf_url}?download=1"
     except Exception as e:
         print(f"Error generando previsualización: {e}")
         return False, dash.no_update, dash.no_update
-
-@callback(
-    Output(f"{PAGE_ID}download-pdf", "data"),
-    Input(f"{PAGE_ID}btn-confirm-download", "n_clicks"),
-    State(f"{PAGE_ID}modal-data-store", "data"),
-    prevent_initial_call=True
-)
-def confirm_download_pdf(n_clicks, selected_rows):
-    if not n_clicks or not selected_rows:
-        return None
-        
-    try:
-        # Regenerar PDF para descarga (más eficiente que pasar el base64 de vuelta)
-        pdf_buffer = generate_boleta_pdf(selected_rows)
-        
-        return dcc.send_bytes(pdf_buffer.getvalue(), filename=f"boletas_despacho_{int(time.time())}.pdf")
-    except Exception as e:
-        print(f"Error en descarga final: {e}")
-        return None
\ No newline at end of file
@@ -2,16 +2,14 @@
 import dash
 import pandas as pd
 import dash_mantine_components as dmc
-from dash import html, dcc, callback, Input, Output, State, no_update
+from dash import html, dcc, callback, clientside_callback, Input, Output, State, ClientsideFunction, no_update
 from components.grid import Row, Column
 from constants import PAGE_TITLE_PREFIX
 import base64
 import io
-import qrcode
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.lib.utils import ImageReader
+from helpers.qr_pdf import QRSheetLayout, QRSheetRenderer, GRID_PRESETS
+from core.background import background_manager
+from core.artifacts import artifact_store, artifact_key
 
 dash.register_page(__name__, "/packing/qr_generator", title=PAGE_TITLE_PREFIX + "Generador QR")
 
@@ -21,7 +19,7 @@ def create_custom_layout():
     return dmc.Container(children=[
         Row([
             Column([
-                dmc.Title("Generador PDF de QRs (3x3)", order=2, mb=20)
+                dmc.Title("Generador PDF de QRs", order=2, mb=20)
             ], size=12)
         ]),
         
@@ -62,24 +60,41 @@ def create_custom_layout():
             ], size=6),
             
             Column([
-                 dmc.Text("3. Generar:",  mb=5),
+                 dmc.Text("3. Etiquetas por página:", mb=5),
+                 dmc.Select(
+                    id="qr-grid-selector",
+                    data=[{"label": f"{cols} x {rows}", "value": name} for name, (cols, rows) in GRID_PRESETS.items()],
+                    value="3x3",
+                    allowDeselect=False,
+                    style={"width": "100%"}
+                ),
+            ], size=3),
+
+            Column([
+                 dmc.Text("4. Generar:",  mb=5),
                  dmc.Button(
                     "Generar PDF", 
                     id="btn-generate-pdf", 
                     disabled=True,
                     fullWidth=True
                 ),
-            ], size=6)
+            ], size=3)
         ]),
 
         Row([
             Column([
                 html.Div(id='output-status', style={'marginTop': '20px'}),
-                dcc.Loading(
-                    id="loading-pdf",
-                    type="default",
-                    children=dcc.Download(id="download-pdf-qr"),
+                html.Div(
+                    id="qr-progress-container",
+                    style={"display": "none"},
+                    children=dmc.Group([
+                        dmc.Progress(id="qr-progress", value=0, striped=True, animated=True, style={"flex": 1}),
+                        dmc.Text(id="qr-progress-label", size="sm", c="dimmed"),
+                        dmc.Button("Cancelar", id="btn-cancel-qr", size="xs", variant="subtle", color="red"),
+                    ], gap="sm", mt="md"),
                 ),
+                # URL temporal del PDF (/artifacts/<token>); el navegador la descarga
+                dcc.Store(id="qr-pdf-url"),
                 dcc.Store(id="stored-dataframe-json"),
             ], size=12)
         ])
@@ -133,14 +148,27 @@ def enable_button(value):
     return value is None
 
 
+# Generación en segundo plano: progreso por página y cancelable
 @callback(
-    Output("download-pdf-qr", "data"),
+    Output("qr-pdf-url", "data"),
     Input("btn-generate-pdf", "n_clicks"),
     State("stored-dataframe-json", "data"),
     State("column-selector", "value"),
+    State("qr-grid-selector", "value"),
+    background=True,
+    manager=background_manager,
+    progress=[
+        Output("qr-progress", "value"),
+        Output("qr-progress-label", "children"),
+    ],
+    running=[
+        (Output("btn-generate-pdf", "loading"), True, False),
+        (Output("qr-progress-container", "style"), {"display": "block"}, {"display": "none"}),
+    ],
+    cancel=[Input("btn-cancel-qr", "n_clicks")],
     prevent_initial_call=True
 )
-def generate_qr_pdf(n_clicks, json_data, selected_column):
+def generate_qr_pdf(set_progress, n_clicks, json_data, selected_column, grid):
     if not n_clicks or not json_data or not selected_column:
         return no_update
     
@@ -154,97 +182,28 @@ def generate_qr_pdf(n_clicks, json_data, selected_column):
         # Get codes, ensuring they are strings and dropping NaNs if any
         codes = df[selected_column].dropna().astype(str).tolist()
         
-        # Create PDF
-        buffer = io.BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-        
-        # 3x3 Grid Config
-        cols = 3
-        rows = 3
-        
-        # Grid dimensions
-        margin_x = 10 * mm
-        margin_y = 10 * mm
-        
-        available_width = width - (2 * margin_x)
-        available_height = height - (2 * margin_y)
-        
-        cell_width = available_width / cols
-        cell_height = available_height / rows
-        
-        items_per_page = cols * rows
-        
-        for i, code in enumerate(codes):
-            # Calculate position on current page
-            page_index = i % items_per_page
-            
-            col_idx = page_index % cols
-            # Top row is index 0 visually, but in reportlab y increases upwards.
-            # So row 0 (top) is actually at the highest y.
-            # Let's map row_idx 0 to top, row_idx 2 to bottom.
-            visual_row = page_index // cols
-            
-            # Start from top: height - margin_y - cell_height * (visual_row + 1)
-            y_pos = height - margin_y - (cell_height * (visual_row + 1))
-            x_pos = margin_x + (col_idx * cell_width)
-            
-            # Center of the cell
-            center_x = x_pos + (cell_width / 2)
-            center_y = y_pos + (cell_height / 2)
-            
-            # QR Code Generation
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=2,
-            )
-            qr.add_data(code)
-            qr.make(fit=True)
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convert PIL image to bytes
-            img_buffer = io.BytesIO()
-            img.save(img_buffer, format="PNG")
-            img_buffer.seek(0)
-            
-            # Image dimensions
-            qr_size = 50 * mm 
-            
-            # Draw QR Image (centered in cell, slightly moved up)
-            # Center of image should be at (center_x, center_y + offset)
-            # Bottom-left of image:
-            qr_bottom_left_x = center_x - (qr_size / 2)
-            qr_bottom_left_y = center_y - (qr_size / 2) + (5 * mm)
-            
-            c.drawImage(ImageReader(img_buffer), qr_bottom_left_x, qr_bottom_left_y, width=qr_size, height=qr_size)
-            
-            # Draw Text
-            c.setFont("Helvetica", 12)
-            # Text below image
-            c.drawCentredString(center_x, qr_bottom_left_y - (5 * mm), code)
-            
-            # Optional: Draw cell border for debugging/cutting guide
-            # c.setStrokeColorRGB(0.8, 0.8, 0.8)
-            # c.rect(x_pos, y_pos, cell_width, cell_height)
-            
-            # New Page if filled or last item
-            if (i + 1) % items_per_page == 0:
-                c.showPage()
-            elif (i + 1) == len(codes):
-                # Don't add a blank page if it fits exactly, but showPage() saves the current page.
-                # If we just finished the loop and didn't hit the modulo, we need to save the page.
-                c.showPage()
-                
-        c.save()
-        buffer.seek(0)
+        # Vector QRs, encoded in parallel chunks (see helpers/qr_pdf.py)
+        # Written straight to the artifact cache on disk: identical jobs share
+        # the file and the browser downloads it from /artifacts/<token>
+        grid = grid or "3x3"
+        renderer = QRSheetRenderer(QRSheetLayout.from_preset(grid))
+        key = artifact_key("qr-pdf", filters={"codes": codes, "grid": grid})
+        artifact_store.open_or_build(key, lambda output: renderer.render(codes, output, set_progress)).close()
         
-        return dcc.send_bytes(buffer.getvalue(), "codigos_qr.pdf")
+        return artifact_store.share(key, "codigos_qr.pdf", "application/pdf") + "?download=1"
 
     except Exception as e:
         # In case of error during generation, we can't easily return an alert to a dcc.Download component
         # But we could print it or handle it if we had a separate output.
         # For now, just fail silently or return nothing (files might be missing lib dependencies if not installed)
         print(f"Error creating PDF: {e}")
-        return no_update
\ No newline at end of file
+        return no_update
+
+
+# Descarga del PDF generado sin pasar el archivo por el callback
+clientside_callback(
+    ClientsideFunction(namespace="clientside", function_name="download_url"),
+    Output("qr-pdf-url", "clear_data"),
+    Input("qr-pdf-url", "data"),
+    prevent_initial_call=True
+)
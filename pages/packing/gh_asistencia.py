@@ -6,8 +6,10 @@ from components.grid import Row, Column
 from components.simple_components import create_page_header
 from constants import PAGE_TITLE_PREFIX
 from helpers.helpers import generate_list_month
-from dash_ag_grid import AgGrid
 from helpers.get_sheets import read_sheet
+from helpers.excel_export import excel_bytes, EXCEL_TEMPLATE_VERSION
+from core.artifacts import artifact_store, artifact_key
+from core.grid_backend import grid_backend
 import base64
 import io
 from datetime import datetime, timedelta, time
@@ -410,10 +412,11 @@ def update_output(list_of_contents, list_of_names):
         
     final_df = pd.concat(dfs, ignore_index=True)
     print(f"dataframe size: {final_df.shape}")
-    grid = AgGrid(
-            id=f"grid-final",
-            rowData=final_df.to_dict('records'),
-            columnDefs=[{"field": i} for i in final_df.columns],
+    # Filas servidas por bloques desde el servidor; el store sólo guarda la clave del DataFrame
+    grid = grid_backend.create_grid(
+            "grid-final",
+            final_df,
+            column_defs=[{"field": i} for i in final_df.columns],
             columnSize="sizeToFit",
             dashGridOptions={
                 "rowSelection": {'mode': 'multiRow'},
@@ -428,7 +431,9 @@ def update_output(list_of_contents, list_of_names):
             style={"height": "400px"},
             className="ag-theme-alpine-dark compact",
         )
-    return grid, final_df.to_dict('records')
+    return grid, grid_backend.register_frame(final_df)
+
+grid_backend.register_callback("grid-final")
 
 @callback(
     Output("download-dataframe-xlsx", "data"),
@@ -436,39 +441,13 @@ def update_output(list_of_contents, list_of_names):
     State("gh-asistencia-store", "data"),
     prevent_initial_call=True,
 )
-def download_excel(n_clicks, data):
-    if not data:
+def download_excel(n_clicks, frame_key):
+    entry = grid_backend.get_frame(frame_key) if frame_key else None
+    if entry is None:
         return None
     
-    df = pd.DataFrame(data)
-    
-    # Generate Excel in memory
-    output = io.BytesIO()
-    writer = pd.ExcelWriter(output, engine='xlsxwriter')
-    df.to_excel(writer, sheet_name='Sheet1', index=False)
-    
-    workbook = writer.book
-    worksheet = writer.sheets['Sheet1']
-    
-    # Add Table Style
-    (max_row, max_col) = df.shape
-    column_settings = [{'header': column} for column in df.columns]
-    
-    worksheet.add_table(0, 0, max_row, max_col - 1, {
-        'columns': column_settings,
-        'style': 'TableStyleLight9'
-    })
-    
-    # Auto-adjust columns width (approximate)
-    for i, col in enumerate(df.columns):
-        # find max len of column values
-        max_len = max(
-            df[col].astype(str).map(len).max(),
-            len(str(col))
-        ) + 2
-        worksheet.set_column(i, i, max_len)
-        
-    writer.close()
-    data = output.getvalue()
+    # Excel con memoria acotada (xlsxwriter constant_memory), reutilizado si los datos no cambiaron
+    key = artifact_key("asistencia-xlsx", filters=frame_key, template=EXCEL_TEMPLATE_VERSION)
+    excel_data = artifact_store.get_or_build(key, lambda: excel_bytes(entry["df"], sheet_name='Sheet1'))
     
-    return dcc.send_bytes(data, filename="asistencia_procesada.xlsx")
+    return dcc.send_bytes(excel_data, filename="asistencia_procesada.xlsx")
@@ -12,9 +12,11 @@ from constants import PAGE_TITLE_PREFIX
 from helpers.helpers import generate_list_month, get_download_url_by_name, dataframe_filtro
 from helpers.get_api import listar_archivos_en_carpeta_compartida
 from helpers.get_token import get_access_token
-from dash_ag_grid import AgGrid
 from helpers.get_sheets import read_sheet
-import time
+from core.dtypes import read_excel
+from core.grid_backend import grid_backend
+from core.snapshots import dataset_snapshots
+from core.dataset_store import dataset_store
 from datetime import datetime
 
 # 🚀 Configuraciones de rendimiento optimizadas
@@ -40,20 +42,7 @@ app = dash.get_app()
 PAGE_ID = "producto-terminado-"
 DATA_SOURCE = "producto_terminado"
 
-# 🗄️ Cache global optimizado para datos
-_data_cache = {
-    "data": None,
-    "last_loaded": None,
-    "cache_duration": 300  # 5 minutos en segundos
-}
-
-def is_cache_valid():
-    """Verificar si el caché es válido"""
-    if _data_cache["data"] is None or _data_cache["last_loaded"] is None:
-        return False
-    
-    # Verificar si el caché ha expirado
-    return time.time() - _data_cache["last_loaded"].timestamp() < _data_cache["cache_duration"]
+CACHE_DURATION = 300  # 5 minutos en segundos
 
 
 def cleanup_memory():
@@ -142,6 +131,93 @@ def create_custom_layout():
 
 layout = create_custom_layout()
 
+async def load_phl_pt_dataset():
+    """
+    Publica el dataset PHL PT en el almacén compartido si la versión vigente expiró
+
+    Returns:
+        (versión publicada, si se reutilizó la versión vigente)
+    """
+    # 📦 Dataset publicado por otro worker (Arrow mmap, sin descargar)
+    version = dataset_store.fresh_version(DATA_SOURCE, CACHE_DURATION)
+    if version is not None:
+        print("✅ Usando dataset compartido")
+        return version, True
+    
+    print("🔄 Caché expirado o no disponible, cargando datos frescos...")
+    
+    # 🔑 Obtener token una sola vez
+    access_token = await asyncio.to_thread(get_access_token)
+    
+    # 📁 Listar archivos una sola vez
+    files_data = await asyncio.to_thread(
+        listar_archivos_en_carpeta_compartida,
+        access_token,
+        DRIVE_ID_CARPETA_STORAGE,
+        FOLDER_ID_CARPETA_STORAGE
+    )
+    
+    # 📊 Cargar todos los archivos en paralelo (MUY EFICIENTE)
+    print("📥 Iniciando carga paralela de archivos...")
+    
+    # Crear tareas para carga paralela
+    async def load_excel_file(filename, sheet_name=None):
+        url = await asyncio.to_thread(get_download_url_by_name, files_data, filename)
+        if sheet_name:
+            return await asyncio.to_thread(read_excel, url, sheet_name=sheet_name)
+        else:
+            return await asyncio.to_thread(read_excel, url)
+    
+    # Cargar archivos Excel en paralelo
+    phl_pt_task = load_excel_file("REGISTRO DE PHL - PRODUCTO TERMINADO.xlsm", "TD-DATOS PT")
+    
+    # Ejecutar todas las tareas en paralelo
+    phl_pt_df = await asyncio.gather(phl_pt_task)
+    phl_pt_df = phl_pt_df[0]  # Extraer el DataFrame del resultado de gather
+    
+    print(f"📊 Datos cargados: {len(phl_pt_df)} filas")
+    print(f"📋 Columnas disponibles: {list(phl_pt_df.columns)}")
+    
+    # Verificar si la columna existe antes de usarla
+    if "F. PRODUCCION" in phl_pt_df.columns:
+        print(f"📅 Fechas de producción únicas: {phl_pt_df['F. PRODUCCION'].unique()}")
+        phl_pt_df = phl_pt_df[phl_pt_df["F. PRODUCCION"].notna()]
+        print(f"📊 Datos después del filtro: {len(phl_pt_df)} filas")
+    else:
+        print("⚠️ Columna 'F. PRODUCCION' no encontrada en los datos")
+    
+    # Procesar columnas de fecha para AgGrid
+    date_columns = [col for col in phl_pt_df.columns if "FECHA" in col.upper() or "F." in col]
+    for col in date_columns:
+        try:
+            # Convertir a datetime y luego a string en formato ISO para AgGrid
+            phl_pt_df[col] = pd.to_datetime(phl_pt_df[col], errors='coerce')
+            phl_pt_df[col] = phl_pt_df[col].dt.strftime('%Y-%m-%d')
+            print(f"✅ Columna {col} procesada como fecha")
+        except Exception as e:
+            print(f"⚠️ Error procesando columna de fecha {col}: {e}")
+    
+    # Aplicar transformación si es necesaria
+    try:
+        from helpers.transform.procesos_packing import phl_pt_transform
+        phl_pt_df = await asyncio.to_thread(phl_pt_transform, phl_pt_df)
+        print("✅ Transformación aplicada exitosamente")
+    except Exception as e:
+        print(f"⚠️ Error en transformación: {e}")
+        # Continuar sin transformación si falla
+    
+    # 📦 Publicar para todos los workers: el almacén es la única copia en el servidor
+    version = await asyncio.to_thread(dataset_store.publish, DATA_SOURCE, {"PHL PT": phl_pt_df})
+    
+    # 🧹 Limpiar memoria
+    del phl_pt_df
+    cleanup_memory()
+    return version, False
+
+# Precarga antes del fork de los workers (ver core/snapshots.py)
+dataset_snapshots.register(DATA_SOURCE, load_phl_pt_dataset)
+
+
 @callback(
     [
         Output(f"{PAGE_ID}raw-data-store", "data"),
@@ -153,91 +229,12 @@ layout = create_custom_layout()
 async def load_all_data_once(_):
     try:
         print("🚀 Iniciando carga única de datos...")
-        
-        # 🗄️ Verificar caché primero
-        if is_cache_valid():
-            print("✅ Usando datos del caché")
-            cache_info = {"loaded_at": _data_cache["last_loaded"].isoformat(), "files": [], "from_cache": True}
-            return _data_cache["data"], cache_info
-        
-        print("🔄 Caché expirado o no disponible, cargando datos frescos...")
-        
-        # 🔑 Obtener token una sola vez
-        access_token = await asyncio.to_thread(get_access_token)
-        
-        # 📁 Listar archivos una sola vez
-        files_data = await asyncio.to_thread(
-            listar_archivos_en_carpeta_compartida,
-            access_token,
-            DRIVE_ID_CARPETA_STORAGE,
-            FOLDER_ID_CARPETA_STORAGE
-        )
-        
-        # 📊 Cargar todos los archivos en paralelo (MUY EFICIENTE)
-        print("📥 Iniciando carga paralela de archivos...")
-        
-        # Crear tareas para carga paralela
-        async def load_excel_file(filename, sheet_name=None):
-            url = await asyncio.to_thread(get_download_url_by_name, files_data, filename)
-            if sheet_name:
-                return await asyncio.to_thread(pd.read_excel, url, sheet_name=sheet_name)
-            else:
-                return await asyncio.to_thread(pd.read_excel, url)
-        
-        # Cargar archivos Excel en paralelo
-        phl_pt_task = load_excel_file("REGISTRO DE PHL - PRODUCTO TERMINADO.xlsm", "TD-DATOS PT")
-        
-        # Ejecutar todas las tareas en paralelo
-        phl_pt_df = await asyncio.gather(phl_pt_task)
-        phl_pt_df = phl_pt_df[0]  # Extraer el DataFrame del resultado de gather
-        
-        print(f"📊 Datos cargados: {len(phl_pt_df)} filas")
-        print(f"📋 Columnas disponibles: {list(phl_pt_df.columns)}")
-        
-        # Verificar si la columna existe antes de usarla
-        if "F. PRODUCCION" in phl_pt_df.columns:
-            print(f"📅 Fechas de producción únicas: {phl_pt_df['F. PRODUCCION'].unique()}")
-            phl_pt_df = phl_pt_df[phl_pt_df["F. PRODUCCION"].notna()]
-            print(f"📊 Datos después del filtro: {len(phl_pt_df)} filas")
-        else:
-            print("⚠️ Columna 'F. PRODUCCION' no encontrada en los datos")
-        
-        # Procesar columnas de fecha para AgGrid
-        date_columns = [col for col in phl_pt_df.columns if "FECHA" in col.upper() or "F." in col]
-        for col in date_columns:
-            try:
-                # Convertir a datetime y luego a string en formato ISO para AgGrid
-                phl_pt_df[col] = pd.to_datetime(phl_pt_df[col], errors='coerce')
-                phl_pt_df[col] = phl_pt_df[col].dt.strftime('%Y-%m-%d')
-                print(f"✅ Columna {col} procesada como fecha")
-            except Exception as e:
-                print(f"⚠️ Error procesando columna de fecha {col}: {e}")
-        
-        # Aplicar transformación si es necesaria
-        try:
-            from helpers.transform.procesos_packing import phl_pt_transform
-            phl_pt_df = await asyncio.to_thread(phl_pt_transform, phl_pt_df)
-            print("✅ Transformación aplicada exitosamente")
-        except Exception as e:
-            print(f"⚠️ Error en transformación: {e}")
-            # Continuar sin transformación si falla
-        
-        all_data = {
-            "PHL PT": phl_pt_df.to_dict('records'),
-        }
-        
-        # 🗄️ Actualizar caché
-        _data_cache["data"] = all_data
-        _data_cache["last_loaded"] = datetime.now()
-        
-        # 🧹 Limpiar memoria
-        del phl_pt_df
-        cleanup_memory()
-        
-        cache_info = {"loaded_at": _data_cache["last_loaded"].isoformat(), "files": [], "from_cache": False}
+        version, from_cache = await load_phl_pt_dataset()
+        cache_info = {"loaded_at": datetime.now().isoformat(), "files": [], "from_cache": from_cache}
         print("✅ Carga de datos completada exitosamente")
         
-        return all_data, cache_info
+        # Sólo la versión del dataset: las filas se sirven por bloques desde el servidor
+        return {"dataset": DATA_SOURCE, "version": version}, cache_info
         
     except Exception as e:
         print(f"❌ Error en carga de datos: {e}")
@@ -252,7 +249,7 @@ async def load_all_data_once(_):
     prevent_initial_call=False
 )
 def update_main_table(raw_data):
-    if not raw_data or "PHL PT" not in raw_data:
+    if not raw_data or not raw_data.get("version"):
         return dmc.Alert(
             "No hay datos disponibles para mostrar",
             title="Sin datos",
@@ -261,9 +258,15 @@ def update_main_table(raw_data):
         )
     
     try:
-        df = pd.DataFrame(raw_data.get("PHL PT", []))
-        df["F. PRODUCCION"] = df["F. PRODUCCION"].astype(str)
-        df["F. COSECHA"] = df["F. COSECHA"].str.strip()
+        with dataset_store.reading(DATA_SOURCE) as (_, frames):
+            if frames is None:
+                raise FileNotFoundError(f"Dataset '{DATA_SOURCE}' no publicado")
+            shared = frames["PHL PT"]
+            # assign devuelve un DataFrame nuevo: el frame compartido no se modifica
+            df = shared.assign(**{
+                "F. PRODUCCION": shared["F. PRODUCCION"].astype(str),
+                "F. COSECHA": shared["F. COSECHA"].str.strip(),
+            })
         df = df.rename(columns={
             "F. PRODUCCION": "FECHA PRODUCCION",
             "F. COSECHA": "FECHA COSECHA",
@@ -289,13 +292,14 @@ def update_main_table(raw_data):
         
         print(f"📊 Mostrando tabla con {len(df)} filas y {len(df.columns)} columnas")
         
-        return AgGrid(
-            id=f"{PAGE_ID}main-ag-grid",
-            rowData=df.to_dict("records"),
-            columnDefs=[{"field": "CONTENERDOR", "pinned": True}, {"field": "SEMANA"}] +
-                [{"field": i, 'type': 'rightAligned'} for i in df.columns if i != "CONTENERDOR"],
+        # Modelo de filas en servidor: la grilla pide bloques ya filtrados/ordenados
+        return grid_backend.create_grid(
+            f"{PAGE_ID}main-ag-grid",
+            df,
+            column_defs=[{"field": "CONTENERDOR", "pinned": True}, {"field": "SEMANA"}] +
+                [{"field": i, 'type': 'rightAligned'} for i in df.columns if i not in ("CONTENERDOR", "SEMANA")],
             columnSize="autoSize",
-            defaultColDef={"filter": True},
+            defaultColDef={"filter": True, "sortable": True},
             dashGridOptions={"animateRows": False, "rowSelection":'single'},
             #style={"height": "400px", "width": "100%"},
             
@@ -314,6 +318,8 @@ def update_main_table(raw_data):
             variant="light"
         )
 
+grid_backend.register_callback(f"{PAGE_ID}main-ag-grid")
+
 clientside_callback(
     ClientsideFunction(
         namespace="clientside",
@@ -3,6 +3,7 @@
 Script de gestión para APG BI Dashboard
 """
 import os
+import json
 import sys
 import subprocess
 import argparse
@@ -242,6 +243,80 @@ def clean_system():
     except subprocess.CalledProcessError as e:
         print(f"❌ Error limpiando sistema: {e}")
 
+def startup_benchmark(budget=None, runs=3, pages_budget=None):
+    """
+    Mide el arranque de la app (importar app.py) y la carga de todas las
+    páginas (page_registry.load_all); falla si alguno supera su presupuesto
+
+    Por defecto las páginas se importan con app.py, así que el arranque se
+    compara con la suma de ambos presupuestos; con APG_LAZY_PAGES=1 se miden
+    por separado
+    """
+    budget = float(budget or os.environ.get('APG_STARTUP_BUDGET', 3.0))
+    pages_budget = float(pages_budget or os.environ.get('APG_PAGES_BUDGET', 15.0))
+    if os.environ.get('APG_LAZY_PAGES', '0').lower() not in ('1', 'true', 'yes'):
+        budget += pages_budget
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, APG_STARTUP_PROFILE='1')
+    script = (
+        "import json, time\n"
+        "start = time.perf_counter()\n"
+        "import app\n"
+        "imported = time.perf_counter()\n"
+        "from core.page_registry import page_registry\n"
+        "errors = page_registry.load_all()\n"
+        "print('BENCH ' + json.dumps({'import': imported - start, "
+        "'pages': time.perf_counter() - imported, 'errors': errors}))\n"
+    )
+    print(f"⏱️ Benchmark de arranque ({runs} ejecuciones, presupuesto {budget:.2f}s + páginas {pages_budget:.2f}s)")
+    
+    import_timings, page_timings = [], []
+    for run in range(runs):
+        result = subprocess.run([sys.executable, '-c', script], cwd=project_root, env=env,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"❌ La app no pudo importarse:\n{result.stderr}")
+            return False
+        bench_line = next(line for line in result.stdout.splitlines() if line.startswith('BENCH '))
+        timing = json.loads(bench_line[len('BENCH '):])
+        if timing['errors']:
+            print(f"❌ Páginas con error: {', '.join(timing['errors'])}")
+            return False
+        import_timings.append(timing['import'])
+        page_timings.append(timing['pages'])
+        print(f"  Ejecución {run + 1}: import {timing['import']:.2f}s, páginas {timing['pages']:.2f}s")
+        if run == 0:
+            print(result.stdout.replace(bench_line, '').strip())
+    
+    median = sorted(import_timings)[len(import_timings) // 2]
+    pages_median = sorted(page_timings)[len(page_timings) // 2]
+    if median > budget:
+        print(f"❌ Arranque de {median:.2f}s supera el presupuesto de {budget:.2f}s")
+        return False
+    if pages_median > pages_budget:
+        print(f"❌ Carga de páginas de {pages_median:.2f}s supera el presupuesto de {pages_budget:.2f}s")
+        return False
+    print(f"✓ Arranque de {median:.2f}s y páginas en {pages_median:.2f}s dentro del presupuesto")
+    return True
+
+def forecast_refit(horizon=3, workers=None):
+    """Reajusta los pronósticos Prophet/ETS de todas las series (tarea nocturna)"""
+    from core.dataset_store import dataset_store
+    from core.dtypes import to_numpy_frame
+    from core.forecasting import forecast_service
+    from helpers.prediction_models import kg_series_long, SERIES_KEYS
+    
+    frames = dataset_store.open('costos_comparativo')
+    if not frames or 'Reporte Produccion' not in frames:
+        print("❌ No hay datos publicados de Reporte Producción (abrir la página de costos primero)")
+        return False
+    
+    long_df = kg_series_long(to_numpy_frame(frames['Reporte Produccion']), keys=SERIES_KEYS, week_column='SEMANA')
+    id_columns = [key for key in SERIES_KEYS if key in long_df.columns] + ['Serie']
+    forecast_service.refit_all(long_df, id_columns, horizon, workers=workers)
+    print(f"✓ Pronósticos actualizados: {forecast_service.get_stats()}")
+    return True
+
 def setup_project():
     """Configuración inicial completa del proyecto"""
     print("🚀 Configuración inicial de APG BI Dashboard")
@@ -315,6 +390,17 @@ def main():
     # Comando clean
     subparsers.add_parser('clean', help='Limpiar sistema')
     
+    # Comando startup-bench
+    bench_parser = subparsers.add_parser('startup-bench', help='Medir el tiempo de arranque de la app')
+    bench_parser.add_argument('--budget', type=float, help='Presupuesto en segundos (APG_STARTUP_BUDGET)')
+    bench_parser.add_argument('--runs', type=int, default=3, help='Número de ejecuciones')
+    bench_parser.add_argument('--pages-budget', type=float, help='Presupuesto de carga de páginas (APG_PAGES_BUDGET)')
+    
+    # Comando forecast-refit (programar cada noche, p. ej. cron 0 2 * * *)
+    refit_parser = subparsers.add_parser('forecast-refit', help='Reajustar pronósticos Prophet/ETS')
+    refit_parser.add_argument('--horizon', type=int, default=3, help='Semanas a pronosticar')
+    refit_parser.add_argument('--workers', type=int, help='Procesos (por defecto todos los núcleos)')
+    
     args = parser.parse_args()
     
     if args.command == 'setup':
@@ -335,6 +421,12 @@ def main():
         restore_database(args.backup_file)
     elif args.command == 'clean':
         clean_system()
+    elif args.command == 'startup-bench':
+        if not startup_benchmark(args.budget, args.runs, args.pages_budget):
+            sys.exit(1)
+    elif args.command == 'forecast-refit':
+        if not forecast_refit(args.horizon, args.workers):
+            sys.exit(1)
     else:
         parser.print_help()
 
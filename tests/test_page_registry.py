@@ -0,0 +1,54 @@
+"""
+Pruebas del registro diferido de páginas (core/page_registry.py) contra la
+app real mediante el cliente de pruebas de Flask
+"""
+import os
+
+# La carga diferida es opcional; se activa antes de importar la app
+os.environ["APG_LAZY_PAGES"] = "1"
+
+import pytest
+from dash import _callback
+
+from core.page_registry import page_registry
+
+ROUTER_OUTPUT = ".._pages_content.children..._pages_store.data.."
+
+
+@pytest.fixture(scope="module")
+def client():
+    import app as app_module
+    assert page_registry._ready.wait(timeout=300), "la precarga de páginas no terminó"
+    return app_module.app.server.test_client()
+
+
+def test_first_requests_succeed(client):
+    """Las dos primeras peticiones responden 200 (sin DuplicateCallback)"""
+    for _ in range(2):
+        response = client.get("/_dash-dependencies")
+        assert response.status_code == 200
+    assert not _callback.GLOBAL_CALLBACK_MAP
+
+
+def test_page_routing_callback(client):
+    """El router de páginas resuelve el layout diferido de la página de inicio"""
+    response = client.post("/_dash-update-component", json={
+        "output": ROUTER_OUTPUT,
+        "outputs": [{"id": "_pages_content", "property": "children"},
+                    {"id": "_pages_store", "property": "data"}],
+        "inputs": [{"id": "_pages_location", "property": "pathname", "value": "/"},
+                   {"id": "_pages_location", "property": "search", "value": ""}],
+        "changedPropIds": ["_pages_location.pathname"],
+        "state": [],
+    })
+    assert response.status_code == 200
+
+
+def test_background_cancel_inputs_wired(client):
+    """Los cancel_inputs de los callbacks en segundo plano tienen su callback de cancelación"""
+    dependencies = client.get("/_dash-dependencies").get_json()
+    cancel_outputs = {dep["output"] for dep in dependencies if dep["output"].endswith(".id")}
+    background = [entry for entry in page_registry.app.callback_map.values() if entry.get("background")]
+    assert background
+    assert all("cancel_inputs" not in entry["background"] for entry in background)
+    assert cancel_outputs
@@ -0,0 +1,28 @@
+"""
+Punto de entrada WSGI para producción
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+Con preload_app el proceso maestro importa la app, carga todas las páginas y
+los snapshots de datos, y los workers los heredan por copy-on-write
+"""
+import os
+
+os.environ.setdefault("APG_SERVING_MODE", "wsgi")
+
+from app import app
+from core.executor import process_executor
+from core.snapshots import dataset_snapshots
+from core.chart_renderer import chart_renderer
+
+if os.environ.get("APG_PRELOAD_SNAPSHOTS", "1") != "0":
+    dataset_snapshots.load_all()
+    # El pool usado durante la precarga no debe heredarse en los workers
+    process_executor.shutdown()
+else:
+    dataset_snapshots.mark_ready()
+
+# Navegador de kaleido listo antes del primer reporte PDF
+chart_renderer.warm_up()
+
+server = app.server